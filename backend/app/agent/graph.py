@@ -1,36 +1,85 @@
+from contextlib import nullcontext
 from typing import Literal
-from langgraph.graph import StateGraph, END
-from langgraph.graph import MessagesState
-from langgraph.prebuilt import ToolNode
-from langchain_core.messages import SystemMessage
+from ..core import deadline
 from ..core.config import settings
+from ..core.lazy import Lazy
+from ..core.metrics import span, record_tokens
+from .local_llm import PRIORITY_CONTINUE, PRIORITY_NEW, ollama_scheduler
 from .prompts import SYSTEM_PROMPT, USER_HINTS
-from .tools import TOOLS
-import os
-
-# Choose LLM
-try:
-    from langchain_openai import ChatOpenAI
-    _openai_ok = settings.OPENAI_API_KEY is not None
-except Exception:
-    _openai_ok = False
-
-if _openai_ok:
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
-else:
+
+# langchain/langgraph and the LLM client are imported and built on first use
+# (or in the lifespan warm-up), not when app.main is imported.
+
+
+def _make_llm():
+    # Choose LLM
+    try:
+        from langchain_openai import ChatOpenAI
+        _openai_ok = settings.OPENAI_API_KEY is not None
+    except Exception:
+        _openai_ok = False
+
+    if _openai_ok:
+        return ChatOpenAI(model="gpt-4o-mini", temperature=0.2, base_url=settings.OPENAI_BASE)
     from langchain_ollama import ChatOllama
-    llm = ChatOllama(model="llama3.1:8b-instruct", temperature=0.2)
+    # the client only takes a fixed timeout (no request outlives REQUEST_TIMEOUT_MAX_SECONDS);
+    # the request's own budget is enforced per streamed token by _budget_guard
+    return ChatOllama(model=settings.OLLAMA_MODEL, temperature=0.2, base_url=settings.OLLAMA_BASE,
+                      keep_alive=settings.OLLAMA_KEEP_ALIVE,
+                      client_kwargs={"timeout": settings.REQUEST_TIMEOUT_MAX_SECONDS})
+
+
+def _make_budget_guard():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class BudgetGuard(BaseCallbackHandler):
+        """Stops a streamed local generation once the request is out of time or its client left."""
+        raise_error = True  # langchain swallows handler errors otherwise
+
+        def on_llm_new_token(self, token, **kwargs) -> None:
+            deadline.check()
+
+    return BudgetGuard()
 
-llm_with_tools = llm.bind_tools(TOOLS)
 
-def call_model(state: MessagesState):
+def uses_local_model() -> bool:
+    return type(llm.get()).__name__ == "ChatOllama"
+
+
+def _bind_tools():
+    from .tools import TOOLS
+    return llm.get().bind_tools(TOOLS)
+
+
+llm = Lazy(_make_llm)
+llm_with_tools = Lazy(_bind_tools)
+_budget_guard = Lazy(_make_budget_guard)
+
+
+def call_model(state):
+    from langchain_core.messages import SystemMessage
+
+    deadline.check()  # stop between steps once the request is out of time or its client left
     msgs = [SystemMessage(content=f"{SYSTEM_PROMPT}\n\n{USER_HINTS}")] + state["messages"]
-    ai = llm_with_tools.invoke(msgs)
+    gate, kwargs = nullcontext(), {}
+    if uses_local_model():
+        # a local model only serves a few generations at once; conversations already past their tools go first
+        continuing = any(getattr(m, "type", None) == "tool" for m in state["messages"])
+        gate = ollama_scheduler.slot(PRIORITY_CONTINUE if continuing else PRIORITY_NEW)
+        # ChatOllama has no per-call timeout; checking the budget per token ends the stream (and frees the
+        # slot) as soon as the request is abandoned
+        kwargs["config"] = {"callbacks": [_budget_guard.get()]}
+    else:
+        kwargs["timeout"] = deadline.remaining(120)  # per-call timeout of the OpenAI client
+    with gate, span("call_model"):
+        ai = llm_with_tools.get().invoke(msgs, **kwargs)
+    model = llm.get()
+    usage = getattr(ai, "usage_metadata", None) or {}
+    record_tokens(type(model).__name__, getattr(model, "model_name", None) or getattr(model, "model", "unknown"),
+                  prompt=usage.get("input_tokens"), completion=usage.get("output_tokens"))
     return {"messages": [ai]}
 
-run_tools = ToolNode(TOOLS)
-
-def should_continue(state: MessagesState) -> Literal["tools", "end"]:
+def should_continue(state) -> Literal["tools", "end"]:
     if not state["messages"]:
         return "end"
     last = state["messages"][-1]
@@ -39,12 +88,16 @@ def should_continue(state: MessagesState) -> Literal["tools", "end"]:
     return "end"
 
 def build_graph():
+    from langgraph.graph import StateGraph, END, MessagesState
+    from langgraph.prebuilt import ToolNode
+    from .tools import TOOLS
+
     g = StateGraph(MessagesState)
     g.add_node("model", call_model)
-    g.add_node("tools", run_tools)
+    g.add_node("tools", ToolNode(TOOLS))
     g.set_entry_point("model")
     g.add_conditional_edges("model", should_continue, {"tools": "tools", "end": END})
     g.add_edge("tools", "model")
     return g.compile()
 
-app_graph = build_graph()
+app_graph = Lazy(build_graph)
@@ -0,0 +1,117 @@
+"""
+Scheduler for the local Ollama model used when no OpenAI key is configured.
+
+A local 8B model runs a couple of generations at a time at best; more
+in flight just thrash CPU and memory and make every request slower. Model
+calls therefore take a slot from `ollama_scheduler` first: at most
+OLLAMA_MAX_CONCURRENCY generations run, the rest wait in a priority queue
+(FIFO within a priority). Turns that follow tool results go ahead of new
+conversations, so requests already under way finish first. A caller that
+waits longer than OLLAMA_QUEUE_TIMEOUT_SECONDS gets 503, or 504 once its
+request budget runs out first; one whose client disconnects leaves the
+queue within CANCEL_POLL_SECONDS instead of holding a thread until then.
+
+The model is kept loaded between requests (OLLAMA_KEEP_ALIVE) and
+`warm_up()` loads it at startup, so no request pays the model load.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from ..core import deadline as budget
+from ..core import metrics
+from ..core.config import settings
+
+logger = logging.getLogger("app.agent.local_llm")
+
+LOCAL_LLM_WAIT = metrics.Histogram("local_llm_queue_wait_seconds", "Time model calls waited for a local generation slot")
+LOCAL_LLM_REJECTED = metrics.Counter("local_llm_rejected_total", "Model calls that gave up waiting for a local slot")
+
+PRIORITY_CONTINUE = 0  # a conversation that already has tool results
+PRIORITY_NEW = 1
+CANCEL_POLL_SECONDS = 0.5  # how soon a waiting caller notices its request was abandoned
+
+
+class LocalScheduler:
+    def __init__(self, limit: int, timeout: float):
+        self.limit = limit
+        self.timeout = timeout
+        self.active = 0
+        self._queue: List[Tuple[int, int]] = []  # (priority, seq) heap
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_NEW):
+        t0 = time.perf_counter()
+        deadline = time.monotonic() + budget.remaining(self.timeout)
+        ticket = (priority, next(self._seq))
+        b = budget.current()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            while self.active >= self.limit or self._queue[0] != ticket:
+                left = deadline - time.monotonic()
+                if left <= 0 or (b is not None and b.cancelled):
+                    self._leave(ticket)
+                    budget.check()
+                    LOCAL_LLM_REJECTED.inc()
+                    raise HTTPException(status_code=503, detail="Local model is busy; retry later.",
+                                        headers={"Retry-After": "30"})
+                # short slices: a client disconnect only sets the flag, nobody notifies us
+                self._cond.wait(min(left, CANCEL_POLL_SECONDS))
+            heapq.heappop(self._queue)
+            self.active += 1
+            self._cond.notify_all()  # the next ticket may fit in another free slot
+        LOCAL_LLM_WAIT.observe(time.perf_counter() - t0, priority=str(priority))
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def _leave(self, ticket: Tuple[int, int]) -> None:
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+        self._cond.notify_all()  # the ticket behind us may be at the head now
+
+    def stats(self):
+        return {"limit": self.limit, "active": self.active, "queued": self.queued}
+
+
+ollama_scheduler = LocalScheduler(settings.OLLAMA_MAX_CONCURRENCY, settings.OLLAMA_QUEUE_TIMEOUT_SECONDS)
+
+
+def warm_up() -> None:
+    """Load the model into Ollama's memory (an empty generate only loads it)."""
+    t0 = time.perf_counter()
+    try:
+        r = httpx.post(
+            f"{settings.OLLAMA_BASE}/api/generate",
+            json={"model": settings.OLLAMA_MODEL, "keep_alive": settings.OLLAMA_KEEP_ALIVE},
+            timeout=300,
+        )
+        r.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning("could not preload %s from %s: %s", settings.OLLAMA_MODEL, settings.OLLAMA_BASE, e)
+        return
+    logger.info("loaded %s in %.1f s", settings.OLLAMA_MODEL, time.perf_counter() - t0)
+
+
+def _samples():
+    yield {"state": "active"}, ollama_scheduler.active
+    yield {"state": "queued"}, ollama_scheduler.queued
+
+
+metrics.GaugeCallback("local_llm_requests", "Local model calls generating and waiting", _samples)
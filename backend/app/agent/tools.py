@@ -1,8 +1,12 @@
 # app/agent/tools.py
-from typing import TypedDict
+from typing import List, Optional, TypedDict
 import requests
 from langchain_core.tools import tool
+from ..core import deadline
 from ..core.config import settings
+from ..core.metrics import timed
+from ..core.upstream import JINA
+from ..dependencies.auth import forward_key_headers
 import json
 import re
 import os
@@ -11,12 +15,15 @@ class RAGResult(TypedDict):
     chunks: list
 
 @tool("rag_search", return_direct=False)
-def rag_search(question: str, city: str, k: int = 4, with_answer: bool = False) -> str:
+def rag_search(question: str, city: str = "", k: int = 4, with_answer: bool = False,
+               cities: Optional[List[str]] = None) -> str:
     """
     Query your RAG API. Returns JSON string with 'chunks' (and possibly 'answer').
+    For trips covering several cities pass them all in `cities` (one call, k chunks per city).
     """
-    payload = {"question": question, "city": city, "k": k, "with_answer": with_answer}
-    r = requests.post("http://127.0.0.1:8000/api/rag-search", json=payload, timeout=60)
+    payload = {"question": question, "city": city or None, "cities": cities or None, "k": k, "with_answer": with_answer}
+    r = requests.post(f"{settings.SELF_BASE_URL}/api/rag-search", json=payload,
+                      headers={**deadline.forward_headers(), **forward_key_headers()}, timeout=deadline.remaining(60))
     r.raise_for_status()
     return r.text
 
@@ -31,7 +38,8 @@ def city_weather(city: str, past_days: int = 0, include_marine: bool = True, inc
         "include_marine": str(include_marine).lower(),
         "include_elevation": str(include_elevation).lower(),
     }
-    r = requests.get("http://127.0.0.1:8000/api/weather", params=params, timeout=60)
+    r = requests.get(f"{settings.SELF_BASE_URL}/api/weather", params=params,
+                     headers={**deadline.forward_headers(), **forward_key_headers()}, timeout=deadline.remaining(60))
     r.raise_for_status()
     return r.text
 
@@ -85,9 +93,9 @@ def web_search(query: str, top_k: int = 5) -> str:
     """
     if not JINA_API_KEY:
         return "❌ Missing JINA_API_KEY env variable."
-    url = f"https://s.jina.ai/?q={requests.utils.quote(query)}"
+    url = f"{settings.JINA_SEARCH_BASE}/?q={requests.utils.quote(query)}"
     headers = _headers({"X-Respond-With": "no-content"})
-    r = requests.get(url, headers=headers, timeout=60)
+    r = JINA.request("GET", url, op="search", headers=headers, hedge=True)
     r.raise_for_status()
     try:
         data = r.json()
@@ -107,10 +115,10 @@ def web_read(url: str) -> str:
     if not JINA_API_KEY:
         return "❌ Missing JINA_API_KEY env variable."
     if url.startswith("http://") or url.startswith("https://"):
-        endpoint = f"https://r.jina.ai/{url}"
+        endpoint = f"{settings.JINA_READ_BASE}/{url}"
     else:
-        endpoint = f"https://r.jina.ai/https://{url}"
-    r = requests.get(endpoint, headers=_headers(), timeout=60)
+        endpoint = f"{settings.JINA_READ_BASE}/https://{url}"
+    r = JINA.request("GET", endpoint, op="read", headers=_headers(), hedge=True)
     r.raise_for_status()
     return r.text
 
@@ -121,3 +129,7 @@ def extract_urls_from_markdown(markdown_text: str) -> str:
     return json.dumps(urls)
 
 TOOLS = [rag_search, city_weather, web_search, extract_urls_from_markdown, web_read]
+
+# per-tool latency on /metrics and in Server-Timing
+for _t in TOOLS:
+    _t.func = timed(f"tool.{_t.name}")(_t.func)
@@ -0,0 +1,141 @@
+"""
+Admission control for slow, LLM-bound endpoints.
+
+Each lane caps how many requests run at once and how many may wait. Waiters
+are queued per client key (user id or client address) and served
+round-robin, so one busy client can't starve the others. A request is
+rejected up front (503 + Retry-After) when the estimated queue wait exceeds
+the lane's deadline or the queue is full, and with 429 when its client
+already has too many requests queued. Routes that don't enter a lane
+(auth, trips, cities, weather, ...) are never queued behind LLM work.
+
+    async with admit("agent", request_key(request)):
+        ...
+
+State is per worker process and per event loop.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Hashable, Optional
+
+from fastapi import HTTPException
+
+from . import metrics
+from .config import settings
+
+ADMISSION_WAIT = metrics.Histogram("admission_wait_seconds", "Time admitted requests spent queued per lane")
+ADMISSION_REJECTED = metrics.Counter("admission_rejected_total", "Requests turned away by admission control")
+
+
+def _reject(lane: str, status: int, reason: str, retry_after: float) -> HTTPException:
+    ADMISSION_REJECTED.inc(lane=lane, reason=reason)
+    return HTTPException(
+        status_code=status,
+        detail=f"Too many {lane} requests in flight ({reason}); retry later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class Lane:
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float, per_client: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.per_client = per_client
+        self.active = 0
+        self.queued = 0
+        self._waiting: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._service_s: Optional[float] = None  # EWMA of time a request holds its slot
+
+    def expected_wait(self) -> float:
+        service = self._service_s if self._service_s is not None else 1.0
+        return (self.queued + 1) / self.limit * service
+
+    async def acquire(self, key: Hashable) -> None:
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+        mine = self._waiting.get(key)
+        if mine is not None and len(mine) >= self.per_client:
+            raise _reject(self.name, 429, "per-client queue full", self.expected_wait())
+        if self.queued >= self.max_queue:
+            raise _reject(self.name, 503, "queue full", self.expected_wait())
+        est = self.expected_wait()
+        if est > self.max_wait:
+            raise _reject(self.name, 503, "deadline", est)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(key, deque()).append(fut)
+        self.queued += 1
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                self.release(0.0)  # slot was handed over just as we gave up
+            else:
+                self._drop(key, fut)
+            if isinstance(e, asyncio.CancelledError):
+                raise  # client went away
+            raise _reject(self.name, 503, "deadline", self.expected_wait())
+        ADMISSION_WAIT.observe(time.perf_counter() - t0, lane=self.name)
+
+    def _drop(self, key: Hashable, fut: asyncio.Future) -> None:
+        q = self._waiting.get(key)
+        if q is not None and fut in q:
+            q.remove(fut)
+            self.queued -= 1
+            if not q:
+                del self._waiting[key]
+
+    def release(self, held: float) -> None:
+        if held:
+            self._service_s = held if self._service_s is None else 0.8 * self._service_s + 0.2 * held
+        while self._waiting:
+            key, q = next(iter(self._waiting.items()))
+            fut = q.popleft()
+            self.queued -= 1
+            if q:
+                self._waiting.move_to_end(key)  # round-robin across clients
+            else:
+                del self._waiting[key]
+            if not fut.done():
+                fut.set_result(None)  # the slot passes straight to the next waiter
+                return
+        self.active -= 1
+
+
+LANES: Dict[str, Lane] = {
+    "agent": Lane(
+        "agent", settings.AGENT_MAX_CONCURRENCY, settings.AGENT_MAX_QUEUE,
+        settings.ADMISSION_MAX_WAIT_SECONDS, settings.ADMISSION_PER_CLIENT_QUEUE,
+    ),
+    "rag_answer": Lane(
+        "rag_answer", settings.RAG_ANSWER_MAX_CONCURRENCY, settings.RAG_ANSWER_MAX_QUEUE,
+        settings.ADMISSION_MAX_WAIT_SECONDS, settings.ADMISSION_PER_CLIENT_QUEUE,
+    ),
+}
+
+
+@asynccontextmanager
+async def admit(lane: str, key: Hashable):
+    l = LANES[lane]
+    await l.acquire(key)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        l.release(time.perf_counter() - t0)
+
+
+def _lane_samples():
+    for l in LANES.values():
+        yield {"lane": l.name, "state": "active"}, l.active
+        yield {"lane": l.name, "state": "queued"}, l.queued
+
+
+metrics.GaugeCallback("admission_requests", "Requests running and queued per admission lane", _lane_samples)
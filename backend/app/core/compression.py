@@ -0,0 +1,145 @@
+"""
+Response compression: brotli when the client accepts it and the optional
+`brotli` package is installed, gzip otherwise, for bodies of at least
+`minimum_size` bytes. Streamed responses (the NDJSON trip export) are
+compressed chunk by chunk with a flush after each one, so lines still
+arrive as they are produced. Server-sent events and responses that already
+carry a Content-Encoding pass through untouched.
+
+Levels are tuned for dynamic content: gzip 6 and brotli 4 get most of the
+size reduction of the maximum levels for a fraction of the CPU.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSION_BYTES = metrics.Counter("compression_bytes_total", "Response bytes before and after compression")
+SKIP_TYPES = ("text/event-stream",)
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self, level: int):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._c.compress(data) + self._c.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self, quality: int):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+def choose_encoding(accept: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding header ("br" > "gzip"), or None."""
+    offered = {}
+    for part in accept.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            offered[token.strip()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = None
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self, encoding)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, mw: CompressionMiddleware, encoding: str):
+        self.mw = mw
+        self.encoding = encoding
+        self.send: Optional[Send] = None
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.mw.app(scope, receive, self.send_compressed)
+
+    def _begin(self) -> None:
+        if self.encoding == "br":
+            self.compressor = _Brotli(self.mw.brotli_quality)
+        else:
+            self.compressor = _Gzip(self.mw.gzip_level)
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["Content-Length"]
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or headers.get("content-type", "").startswith(SKIP_TYPES)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.passthrough:
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.compressor is None:
+            if not more and len(body) < self.mw.minimum_size:
+                await self.send(self.start)  # small responses aren't worth the CPU
+                await self.send(message)
+                self.passthrough, self.start = True, None
+                return
+            self._begin()
+            out = self.compressor.compress(body, final=not more)
+            if not more:
+                MutableHeaders(raw=self.start["headers"])["Content-Length"] = str(len(out))
+            await self.send(self.start)
+            self.start = None
+        else:
+            out = self.compressor.compress(body, final=not more)
+        COMPRESSION_BYTES.inc(len(body), encoding=self.encoding, stage="raw")
+        COMPRESSION_BYTES.inc(len(out), encoding=self.encoding, stage="sent")
+        await self.send({"type": "http.response.body", "body": out, "more_body": more})
@@ -5,12 +5,119 @@ import os
 
 class Settings(BaseSettings):
     DATABASE_URL: str = Field(...)
+    # Each worker process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW ORM connections plus
+    # DB_VECTOR_POOL_SIZE + DB_VECTOR_MAX_OVERFLOW pgvector ones: 28 by default, 56 with --workers 2.
+    # Keep workers * that below Postgres max_connections (100 by default), leaving room for the CLIs.
+    DB_POOL_SIZE: int = Field(default=10)
+    DB_MAX_OVERFLOW: int = Field(default=10)
+    # pgvector pool: RAG searches hold a connection for milliseconds, ingest workers for a document
+    DB_VECTOR_POOL_SIZE: int = Field(default=2)  # kept open
+    DB_VECTOR_MAX_OVERFLOW: int = Field(default=6)  # opened on demand, closed when idle
+    DB_POOL_TIMEOUT: int = Field(default=30)
+    DB_POOL_RECYCLE: int = Field(default=1800)
+    DB_POOL_PRE_PING: bool = Field(default=True)
+    DB_STATEMENT_CACHE_SIZE: int = Field(default=100)  # 0 when running behind pgbouncer
+    DB_CREATE_SCHEMA_ON_STARTUP: bool = Field(default=False)
+    # Query/chunk embedding model; chunks.embedding is VECTOR(1536). Switch models with `python -m app.rag.reembed`
+    EMBED_MODEL: str = Field(default="text-embedding-3-small")
+    EMBED_MIGRATION_POLL_SECONDS: float = Field(default=10.0)  # how quickly workers see a cutover
+    EMBED_DUAL_READ_RATE: float = Field(default=0.05)  # share of searches repeated on the other model during a migration
+    # Compact first-stage vector search: "off" | "halfvec" | "binary" (see app/rag/compact.py)
+    EMBED_COMPACT_MODE: str = Field(default="off")
+    EMBED_COMPACT_DIMS: int = Field(default=512)  # must match chunks.embedding_short halfvec(N)
+    EMBED_SHORTLIST: int = Field(default=100)
+    # Prompt budget for RAG answers; neighbours=True pulls the chunks around each hit (one extra query)
+    RAG_CONTEXT_TOKENS: int = Field(default=1500)
+    RAG_CONTEXT_NEIGHBOURS: bool = Field(default=False)
+    # Per-section digests built at ingest and served for section-level questions (app/rag/digests.py)
+    DIGESTS_ENABLED: bool = Field(default=True)
+    DIGEST_MAX_WORDS: int = Field(default=120)
+    # Micro-batching of query embeddings across concurrent requests (0 ms disables)
+    EMBED_BATCH_WINDOW_MS: float = Field(default=5.0)
+    EMBED_BATCH_MAX: int = Field(default=64)
+    # Admission control for LLM-bound endpoints (app/core/admission.py)
+    AGENT_MAX_CONCURRENCY: int = Field(default=8)
+    AGENT_MAX_QUEUE: int = Field(default=32)
+    RAG_ANSWER_MAX_CONCURRENCY: int = Field(default=16)
+    RAG_ANSWER_MAX_QUEUE: int = Field(default=64)
+    ADMISSION_MAX_WAIT_SECONDS: float = Field(default=15.0)
+    ADMISSION_PER_CLIENT_QUEUE: int = Field(default=4)
+    # Threads shared by run_in_threadpool; keep it above the LLM lane limits so light routes always get one
+    THREADPOOL_SIZE: int = Field(default=64)
+    # Background PDF ingestion (app/rag/jobs.py)
+    INGEST_WORKERS: int = Field(default=2)
+    INGEST_QUEUE_SIZE: int = Field(default=100)
+    INGEST_JOB_TTL_SECONDS: int = Field(default=3600)
+    INGEST_MAX_UPLOAD_MB: int = Field(default=50)
+    INGEST_TMP_DIR: str | None = None  # defaults to the system temp dir
+    # Response caches for Open-Meteo and query embeddings
+    GEOCODE_CACHE_TTL_SECONDS: int = Field(default=86400)
+    WEATHER_CACHE_TTL_SECONDS: int = Field(default=900)
+    EMBED_CACHE_SIZE: int = Field(default=10000)
+    EMBED_CACHE_TTL_SECONDS: int = Field(default=86400)
+    # Cache tier shared by the workers on this host (app/core/shared_cache.py, SQLite in WAL mode) under the
+    # caches above; unset keeps a separate copy per process
+    SHARED_CACHE_PATH: str | None = None
+    SHARED_CACHE_LOCAL_SIZE: int = Field(default=256)  # per-process front for the hottest keys, 0 disables
+    SHARED_CACHE_LOCAL_TTL_SECONDS: float = Field(default=30.0)
+    # Background refresh of popular cities' caches (app/core/warmer.py); keep the interval below the weather TTL
+    WARMER_ENABLED: bool = Field(default=False)
+    WARMER_INTERVAL_SECONDS: int = Field(default=600)
+    WARMER_TOP_CITIES: int = Field(default=20)
+    WARMER_CONCURRENCY: int = Field(default=4)
+    WARMER_RATE_PER_SECOND: float = Field(default=5.0)  # upstream calls started per second, all APIs together
+    WARMER_QUERIES: list[str] = Field(default=[
+        "Things to do in {city}",
+        "Best neighborhoods to stay in {city}",
+        "How to get around {city}",
+        "What to eat in {city}",
+    ])
+    # Local Ollama fallback (no OPENAI_API_KEY): generations in flight, queue wait cap, model residency
+    OLLAMA_MODEL: str = Field(default="llama3.1:8b-instruct")
+    OLLAMA_MAX_CONCURRENCY: int = Field(default=2)
+    OLLAMA_QUEUE_TIMEOUT_SECONDS: float = Field(default=120.0)
+    OLLAMA_KEEP_ALIVE: str = Field(default="30m")
+    OLLAMA_WARMUP: bool = Field(default=True)
+    # Per-request time budget; callers may ask for less (or up to the max) with an X-Request-Timeout header
+    REQUEST_TIMEOUT_SECONDS: float = Field(default=120.0)
+    REQUEST_TIMEOUT_MAX_SECONDS: float = Field(default=300.0)
+    # Response compression (brotli needs the optional `brotli` package, gzip otherwise)
+    COMPRESSION_MIN_BYTES: int = Field(default=1024)
+    GZIP_LEVEL: int = Field(default=6)
+    BROTLI_QUALITY: int = Field(default=4)
+    # On-demand request profiling (app/core/profiling.py); off unless PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set.
+    # Send `X-Debug-Profile: <PROFILE_TOKEN>` to profile one request; the same header opens /api/debug/profiles
+    PROFILE_TOKEN: str | None = None
+    PROFILE_SAMPLE_RATE: float = Field(default=0.0)
+    PROFILE_PATHS: list[str] = Field(default=["/api/agent/query", "/api/weather"])
+    PROFILE_INTERVAL_MS: float = Field(default=5.0)
+    PROFILE_MAX_CONCURRENT: int = Field(default=2)
+    PROFILE_DIR: str = Field(default="/tmp/travel-planner-profiles")
+    PROFILE_KEEP: int = Field(default=200)
+    # Build the LLM client, agent graph and tokenizer during startup instead of on the first request
+    WARMUP_ON_STARTUP: bool = Field(default=False)
     JWT_SECRET: str = Field(...)
     JWT_ALGORITHM: str = Field(default="HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=60)
+    USER_CACHE_TTL_SECONDS: int = Field(default=30)
+    TOKEN_CACHE_SIZE: int = Field(default=4096)
+    CITY_CATALOGUE_MAX_AGE_SECONDS: int = Field(default=300)
     OPENAI_API_KEY: str | None = None
     JINA_API_KEY: str | None = None
 
+    # Upstream base URLs (point these at benchmarks/fakes.py for offline load tests)
+    OPENAI_BASE: str = "https://api.openai.com/v1"
+    OLLAMA_BASE: str = "http://localhost:11434"
+    JINA_SEARCH_BASE: str = "https://s.jina.ai"
+    JINA_READ_BASE: str = "https://r.jina.ai"
+    GEOCODING_BASE: str = "https://geocoding-api.open-meteo.com/v1"
+    FORECAST_BASE: str = "https://api.open-meteo.com/v1/forecast"
+    AIR_BASE: str = "https://air-quality-api.open-meteo.com/v1/air-quality"
+    MARINE_BASE: str = "https://marine-api.open-meteo.com/v1/marine"
+    ELEVATION_URL: str = "https://api.open-meteo.com/v1/elevation"
+    # Where the agent tools reach this API (loopback)
+    SELF_BASE_URL: str = "http://127.0.0.1:8000"
+
 
     class Config:
         env_file = ".env"
@@ -1,13 +1,127 @@
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+import psycopg
+from psycopg_pool import ConnectionPool
+from pgvector.psycopg import register_vector
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from .config import settings
+from .metrics import GaugeCallback
 
 
 Base = declarative_base()
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+
+# ORM side (asyncpg). statement_cache_size=0 is required behind pgbouncer in transaction mode.
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# pgvector side (sync psycopg, used from threadpool workers and the ingest CLI).
+# Same recycle/pre-ping policy as the ORM pool but its own, smaller size (DB_VECTOR_POOL_SIZE +
+# DB_VECTOR_MAX_OVERFLOW), so the two pools don't double each worker's connection count.
+_vector_pool: Optional[ConnectionPool] = None
+_vector_pool_lock = threading.Lock()
+
+
+def sync_dsn() -> str:
+    return settings.DATABASE_URL.replace("+asyncpg", "")
+
+
+def _configure_vector_conn(conn) -> None:
+    register_vector(conn)
+    conn.commit()  # register_vector opened a transaction; pooled connections must be returned idle
+
+
+def get_vector_pool() -> ConnectionPool:
+    """Return the shared psycopg pool, opening it on first use (e.g. from the CLI)."""
+    global _vector_pool
+    if _vector_pool is None:
+        with _vector_pool_lock:
+            if _vector_pool is None:
+                _vector_pool = ConnectionPool(
+                    sync_dsn(),
+                    min_size=settings.DB_VECTOR_POOL_SIZE,
+                    max_size=settings.DB_VECTOR_POOL_SIZE + settings.DB_VECTOR_MAX_OVERFLOW,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    max_lifetime=settings.DB_POOL_RECYCLE,
+                    configure=_configure_vector_conn,
+                    check=ConnectionPool.check_connection if settings.DB_POOL_PRE_PING else None,
+                    kwargs={"prepare_threshold": 5 if settings.DB_STATEMENT_CACHE_SIZE else None},
+                    open=True,
+                )
+    return _vector_pool
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection counts for both pools (exposed on /api/health)."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {
+        "orm": {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "idle": pool.checkedin(),
+        },
+    }
+    if _vector_pool is not None:
+        v = _vector_pool.get_stats()
+        stats["vector"] = {
+            "size": v.get("pool_size", 0),
+            "idle": v.get("pool_available", 0),
+            "waiting": v.get("requests_waiting", 0),
+        }
+    return stats
+
+
+def _pool_samples():
+    for pool, stats in pool_stats().items():
+        for stat, value in stats.items():
+            yield {"pool": pool, "stat": stat}, value
+
+
+GaugeCallback("db_pool_connections", "Connection counts of the ORM and pgvector pools", _pool_samples)
+
 
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def init_vector_schema():
+    # plain connection: pooled ones need the vector extension this script creates
+    sql = (Path(__file__).resolve().parent.parent / "rag" / "schema.sql").read_text()
+    with psycopg.connect(sync_dsn(), autocommit=True) as conn:
+        conn.execute(sql)
+
+
+async def close_db():
+    global _vector_pool
+    await engine.dispose()
+    if _vector_pool is not None:
+        _vector_pool.close()
+        _vector_pool = None
+
+
+if __name__ == "__main__":
+    # python -m app.core.db  → create ORM tables and the pgvector schema once, outside app startup
+    # (goes through the imported module so models register on the same Base)
+    async def _main():
+        from .. import models  # noqa: F401
+        from . import db
+        await db.init_db()
+        await asyncio.to_thread(db.init_vector_schema)
+        await db.close_db()
+        print("Schema ready.")
+
+    asyncio.run(_main())
@@ -0,0 +1,138 @@
+"""
+Per-request time budget.
+
+`DeadlineMiddleware` gives every HTTP request a deadline: the caller's
+`X-Request-Timeout` header (seconds, capped at REQUEST_TIMEOUT_MAX_SECONDS)
+or REQUEST_TIMEOUT_SECONDS. It lives in a contextvar, so it follows the
+request into run_in_threadpool, the agent graph's worker threads and the
+tools. Upstream calls (app/core/upstream.py) get only the time that is
+left, loopback tool calls forward it in the same header, and `check()`
+between steps stops work once the budget is spent or the client has
+disconnected (`until_disconnect`).
+
+    budget_left = deadline.remaining(60)   # min(60, time left); raises 504 when none
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import metrics
+from .config import settings
+
+HEADER = "X-Request-Timeout"
+REQUESTS_ABANDONED = metrics.Counter("requests_abandoned_total", "Requests stopped on deadline or client disconnect")
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self, reason: str = "deadline"):
+        super().__init__(status_code=504, detail=f"Request stopped ({reason}).")
+        self.reason = reason
+
+
+class Budget:
+    """Absolute `time.monotonic()` deadline plus a cancel flag, shared by every copy of the request context."""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+        self.cancelled: Optional[str] = None
+
+    def left(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+_budget: ContextVar[Optional[Budget]] = ContextVar("request_budget", default=None)
+
+
+def current() -> Optional[Budget]:
+    return _budget.get()
+
+
+def check() -> None:
+    """Raise DeadlineExceeded when the request was cancelled or its time is up."""
+    b = _budget.get()
+    if b is None:
+        return
+    if b.cancelled:
+        raise DeadlineExceeded(b.cancelled)
+    if b.left() <= 0:
+        b.cancelled = "deadline"
+        REQUESTS_ABANDONED.inc(reason="deadline")
+        raise DeadlineExceeded()
+
+
+def remaining(default: float) -> float:
+    """`default` capped by the time the current request has left."""
+    check()
+    b = _budget.get()
+    return default if b is None else min(default, b.left())
+
+
+def deadline_for(timeout: float) -> float:
+    """Absolute monotonic deadline for a call that would otherwise get `timeout` seconds."""
+    return time.monotonic() + remaining(timeout)
+
+
+def forward_headers() -> Dict[str, str]:
+    """Header that hands the remaining budget to a loopback call."""
+    b = _budget.get()
+    return {HEADER: f"{max(b.left(), 0.001):.3f}"} if b is not None else {}
+
+
+def _requested(headers: Headers) -> float:
+    try:
+        asked = float(headers.get(HEADER, ""))
+    except ValueError:
+        return settings.REQUEST_TIMEOUT_SECONDS
+    return min(max(asked, 0.001), settings.REQUEST_TIMEOUT_MAX_SECONDS)
+
+
+class DeadlineMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _budget.set(Budget(_requested(Headers(scope=scope))))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _budget.reset(token)
+
+
+async def until_disconnect(request: Request, work: Awaitable[T], poll: float = 0.5) -> T:
+    """
+    Await `work` within the request's budget; cancel it if the client goes
+    away or time runs out. Threads already running finish their current call
+    and stop at their next `check()` (the budget is marked cancelled).
+    """
+    task = asyncio.ensure_future(work)
+    b = _budget.get()
+    try:
+        while True:
+            timeout = poll if b is None else max(0.0, min(poll, b.left()))
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                reason = "client disconnected"
+                REQUESTS_ABANDONED.inc(reason="disconnect")
+            elif b is not None and b.left() <= 0:
+                reason = "deadline"
+                REQUESTS_ABANDONED.inc(reason="deadline")
+            else:
+                continue
+            if b is not None:
+                b.cancelled = reason
+            raise DeadlineExceeded(reason)
+    finally:
+        if not task.done():
+            task.cancel()
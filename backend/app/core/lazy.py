@@ -0,0 +1,30 @@
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    Build an expensive object on first use, exactly once, from any thread.
+    Used for the LLM client, the compiled agent graph and the tiktoken encoding
+    so importing the app stays cheap and workers start fast.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._value = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._value = self._factory()
+                    self._ready = True
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
@@ -0,0 +1,218 @@
+"""
+Minimal in-process metrics: Prometheus-style counters/histograms, timing spans
+and a per-request Server-Timing header. No external dependency; each worker
+process exposes its own numbers on /metrics.
+"""
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for k, v in sorted(self._values.items()):
+            yield f"{self.name}{_fmt_labels(k)} {v}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.buckets = name, help, tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        k = _key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(k)
+            if s is None:
+                s = self._series[k] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for k, s in sorted(self._series.items()):
+            cum = 0.0
+            for b, c in zip(self.buckets, s):
+                cum += c
+                yield f"{self.name}_bucket{_fmt_labels(k, ('le', repr(b)))} {cum}"
+            cum += s[len(self.buckets)]
+            yield f"{self.name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {cum}"
+            yield f"{self.name}_sum{_fmt_labels(k)} {s[-1]}"
+            yield f"{self.name}_count{_fmt_labels(k)} {cum}"
+
+
+class GaugeCallback:
+    """Gauge whose samples are produced on scrape, e.g. pool or cache sizes."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        self.name, self.help, self.fn = name, help, fn
+        REGISTRY.append(self)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self.fn():
+            yield f"{self.name}{_fmt_labels(_key(labels))} {value}"
+
+
+REGISTRY: List = []
+
+STAGE_SECONDS = Histogram("app_stage_duration_seconds", "Duration of internal stages (embedding, search, LLM, tools, upstream fetches)")
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route")
+UPSTREAM_TOKENS = Counter("upstream_tokens_total", "Tokens reported by upstream model APIs")
+
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache) -> None:
+    """Expose a TTLCache-like object's hits/misses/size on /metrics."""
+    _caches[name] = cache
+
+
+def _cache_samples():
+    for name, c in _caches.items():
+        yield {"cache": name, "stat": "hits"}, getattr(c, "hits", 0)
+        yield {"cache": name, "stat": "misses"}, getattr(c, "misses", 0)
+        yield {"cache": name, "stat": "size"}, len(c)
+
+
+GaugeCallback("cache_stats", "Hits, misses and current size of in-process caches", _cache_samples)
+
+
+def record_tokens(upstream: str, model: str, prompt: Optional[int] = None, completion: Optional[int] = None) -> None:
+    if prompt:
+        UPSTREAM_TOKENS.inc(prompt, upstream=upstream, model=model, kind="prompt")
+    if completion:
+        UPSTREAM_TOKENS.inc(completion, upstream=upstream, model=model, kind="completion")
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in REGISTRY:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- spans + Server-Timing
+
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timings", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block into app_stage_duration_seconds and the current request's Server-Timing."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, stage=stage)
+        acc = _timings.get()
+        if acc is not None:
+            acc.append((stage, dt))
+
+
+def timed(stage: str):
+    """Decorator form of `span` for sync and async callables."""
+    def deco(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def aw(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return aw
+
+        @functools.wraps(fn)
+        def w(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return w
+    return deco
+
+
+def _server_timing_header(items: List[Tuple[str, float]], total: float) -> str:
+    agg: Dict[str, List[float]] = {}
+    for name, dt in items:
+        a = agg.setdefault(name, [0.0, 0])
+        a[0] += dt
+        a[1] += 1
+    parts = [
+        f'{name.replace(" ", "_")};dur={a[0] * 1000:.1f}' + (f';desc="x{a[1]}"' if a[1] > 1 else "")
+        for name, a in agg.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (keeps contextvars intact for threadpool work) that
+    records request latency and adds a Server-Timing header with the spans
+    recorded while handling the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        items: List[Tuple[str, float]] = []
+        token = _timings.set(items)
+        t0 = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing_header(items, time.perf_counter() - t0).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - t0, method=scope["method"], route=path, status=status["code"])
@@ -0,0 +1,330 @@
+"""
+On-demand sampling profiler for single requests.
+
+A request is profiled when it carries `X-Debug-Profile: <PROFILE_TOKEN>`, or
+when its path starts with one of PROFILE_PATHS and it falls in the
+PROFILE_SAMPLE_RATE sample; at most PROFILE_MAX_CONCURRENT at a time. The
+middleware is only installed when one of the two is configured, so with the
+feature off requests do not pass through it at all.
+
+One background thread wakes every PROFILE_INTERVAL_MS and records, per
+profiled request, one wall-clock sample rooted at:
+
+- `loop`: one of the request's asyncio tasks is running on the event loop
+  (its Python stack);
+- `thread`: the request is waiting on a default-executor thread (the agent
+  graph's sync steps) -- that thread's stack, one sample per busy thread;
+- `await`: the request is suspended; the coroutine chain of its newest task
+  and what it awaits. Work sent through `run_in_threadpool` shows up here
+  as `[worker thread] <function>`.
+
+Tasks are attributed to a request by a task factory that tags every task
+created while it is being profiled. Profiles are written to PROFILE_DIR in
+the folded-stack format (flamegraph.pl, speedscope, inferno) with a small
+JSON sidecar; the newest PROFILE_KEEP are kept. The response carries the
+profile id in `X-Profile-Id`; list and download them from /api/debug/profiles.
+"""
+import asyncio
+import functools
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import metrics
+from .config import settings
+
+logger = logging.getLogger("app.profiling")
+
+HEADER = "X-Debug-Profile"
+PROFILES_TAKEN = metrics.Counter("profiles_taken_total", "Requests profiled by the sampling profiler")
+
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+def enabled() -> bool:
+    return bool(settings.PROFILE_TOKEN) or settings.PROFILE_SAMPLE_RATE > 0
+
+
+def authorized(value: Optional[str]) -> bool:
+    token = settings.PROFILE_TOKEN
+    return bool(token and value) and hmac.compare_digest(value.encode(), token.encode())
+
+
+# ---- stacks
+
+_PREFIXES = sorted({p for p in sys.path if p and os.path.isdir(p)} | {os.getcwd()}, key=len, reverse=True)
+
+
+@functools.lru_cache(maxsize=8192)
+def _label(code) -> str:
+    path = code.co_filename
+    for prefix in _PREFIXES:
+        if path.startswith(prefix):
+            path = path[len(prefix):].lstrip(os.sep)
+            break
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _frame_stack(frame, stop=None) -> List[str]:
+    """Root-first labels for `frame` and its callers, up to (not including) a `stop` frame."""
+    out = []
+    while frame is not None and not (stop and stop(frame)):
+        out.append(_label(frame.f_code))
+        frame = frame.f_back
+    out.reverse()
+    return out
+
+
+def _is_loop_frame(frame) -> bool:
+    # Handle._run is what calls a task's step: everything above it is the task
+    return frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith(os.path.join("asyncio", "events.py"))
+
+
+def _callable_name(fn) -> str:
+    while isinstance(fn, functools.partial):
+        fn = fn.func
+    return getattr(fn, "__qualname__", type(fn).__name__)
+
+
+def _coro_stack(task: asyncio.Task) -> List[str]:
+    """Root-first coroutine chain of a suspended task, ending in what it awaits."""
+    out = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            out.append(f"[await {type(coro).__name__}]")
+            break
+        out.append(_label(frame.f_code))
+        if frame.f_code.co_name == "run_sync_in_worker_thread":
+            out.append(f"[worker thread] {_callable_name(frame.f_locals.get('func'))}")
+            break
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return out
+
+
+# ---- profiles
+
+def _is_worker_frame(frame) -> bool:
+    return frame.f_code is RequestProfile.run_in_thread.__code__
+
+
+class RequestProfile:
+    def __init__(self, loop: asyncio.AbstractEventLoop, meta: Dict[str, object]):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.meta = meta
+        self.tasks: List[asyncio.Task] = []
+        self.threads: Set[int] = set()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def run_in_thread(self, fn, *args, **kwargs):
+        tid = threading.get_ident()
+        self.threads.add(tid)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.threads.discard(tid)
+
+    def sample(self, frames: Dict[int, object]) -> None:
+        self.samples += 1
+        current = asyncio.current_task(self.loop)
+        if current is not None and current in self.tasks:
+            frame = frames.get(self.loop_thread)
+            if frame is not None:
+                self._add("loop", _frame_stack(frame, stop=_is_loop_frame))
+                return
+        busy = [frames[t] for t in list(self.threads) if t in frames]
+        if busy:
+            for frame in busy:
+                self._add("thread", _frame_stack(frame, stop=_is_worker_frame))
+            return
+        waiting = next((t for t in reversed(self.tasks) if not t.done()), None)
+        if waiting is not None:
+            self._add("await", _coro_stack(waiting))
+
+    def _add(self, root: str, stack: List[str]) -> None:
+        self.stacks[";".join([root] + stack)] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class _Sampler:
+    """One thread samples every active profile; it exits when none are left."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: List[RequestProfile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> int:
+        return len(self._profiles)
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles.remove(profile)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for p in profiles:
+                try:
+                    p.sample(frames)
+                except Exception:  # a task finishing mid-walk; skip the sample
+                    pass
+            del frames
+
+
+sampler = _Sampler(settings.PROFILE_INTERVAL_MS / 1000)
+
+
+def _task_factory(loop, coro, **kwargs):
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    profile = _active.get()
+    if profile is not None:
+        profile.tasks.append(task)
+    return task
+
+
+class ProfiledExecutor(ThreadPoolExecutor):
+    """Default-executor pool that lets the profiler see which thread works for which request."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return super().submit(fn, *args, **kwargs)
+        return super().submit(profile.run_in_thread, fn, *args, **kwargs)
+
+
+# ---- storage
+
+class ProfileStore:
+    def __init__(self, directory: str, keep: int):
+        self.directory = directory
+        self.keep = keep
+
+    def path(self, profile_id: str, ext: str) -> Optional[str]:
+        if not profile_id.replace("-", "").isalnum():
+            return None
+        p = os.path.join(self.directory, f"{profile_id}.{ext}")
+        return p if os.path.exists(p) else None
+
+    def save(self, profile: RequestProfile) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.id)
+        with open(base + ".folded", "w") as f:
+            f.write(profile.folded())
+        with open(base + ".json", "w") as f:
+            json.dump({"id": profile.id, "samples": profile.samples, **profile.meta}, f)
+        self._prune()
+
+    def _prune(self) -> None:
+        metas = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        for name in metas[:-self.keep] if self.keep > 0 else metas:
+            for ext in (".json", ".folded"):
+                try:
+                    os.remove(os.path.join(self.directory, name[:-5] + ext))
+                except FileNotFoundError:
+                    pass
+
+    def recent(self, limit: int) -> List[Dict[str, object]]:
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in sorted((n for n in os.listdir(self.directory) if n.endswith(".json")), reverse=True)[:limit]:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    out.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return out
+
+
+store = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_KEEP)
+
+
+# ---- middleware
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _reason(self, scope: Scope) -> Optional[str]:
+        if sampler.active >= settings.PROFILE_MAX_CONCURRENT:
+            return None
+        if authorized(Headers(scope=scope).get(HEADER)):
+            return "header"
+        path = scope["path"]
+        if settings.PROFILE_SAMPLE_RATE > 0 and any(path.startswith(p) for p in settings.PROFILE_PATHS):
+            if random.random() < settings.PROFILE_SAMPLE_RATE:
+                return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        reason = self._reason(scope) if scope["type"] == "http" else None
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() is None:
+            loop.set_task_factory(_task_factory)
+        profile = RequestProfile(loop, {"method": scope["method"], "path": scope["path"], "reason": reason,
+                                        "started_at": time.time()})
+        status = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _active.set(profile)
+        profile.tasks.append(asyncio.current_task())
+        sampler.add(profile)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.remove(profile)
+            _active.reset(token)
+            profile.meta.update(status=status, duration_ms=round((time.perf_counter() - t0) * 1000, 1))
+            PROFILES_TAKEN.inc(reason=reason)
+            try:
+                await run_in_threadpool(store.save, profile)
+            except OSError:
+                logger.warning("could not write profile %s to %s", profile.id, store.directory, exc_info=True)
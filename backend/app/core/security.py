@@ -27,10 +27,13 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(
     subject: Union[str, int],
-    expires_minutes: Optional[int] = None
+    expires_minutes: Optional[int] = None,
+    claims: Optional[dict[str, Any]] = None,
 ) -> str:
     """
     Create a signed JWT access token with an expiration.
+    Extra `claims` (e.g. name/email) are signed into the token so routes
+    that only need them can skip the user lookup.
     """
     expires_delta = timedelta(
         minutes=expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -41,6 +44,8 @@ def create_access_token(
         "sub": str(subject),
         "exp": expire,
     }
+    if claims:
+        to_encode.update({k: v for k, v in claims.items() if k not in ("sub", "exp")})
 
     encoded_jwt = jwt.encode(
         to_encode,
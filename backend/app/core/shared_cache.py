@@ -0,0 +1,224 @@
+"""
+Cache tier shared by every worker process on one host.
+
+With several uvicorn workers each process would otherwise fetch, hold and
+warm its own copy of every geocode, forecast and query embedding. When
+SHARED_CACHE_PATH is set, `cache_for()` returns a `SharedCache`: entries
+live in one SQLite database in WAL mode (readers never block, writers queue
+on a short lock) with a per-entry TTL and a size bound per namespace
+(enforced every PRUNE_EVERY writes), evicting the entries closest to expiry
+first. A small in-process front
+(SHARED_CACHE_LOCAL_SIZE entries, at most SHARED_CACHE_LOCAL_TTL_SECONDS)
+keeps the hottest keys off SQLite altogether.
+
+Keys and values must be JSON-serializable (tuples come back as lists, so
+keys are compared in their serialized form). SQLite errors are logged and
+treated as a miss: the cache never fails a request. Without
+SHARED_CACHE_PATH `cache_for()` returns a plain per-process TTLCache.
+
+SQLite calls block (up to the 1 s busy timeout while another worker holds
+the write lock), so async code uses `aget`/`aset`: front hits are answered
+inline, everything else runs in the threadpool.
+
+`acquire_lease()` keeps a named, expiring lease in the same file, so one
+worker per host can own a job (the cache warmer) and another takes over
+once it stops renewing.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Hashable, Optional, Union
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+from .cache import TTLCache
+from .config import settings
+
+logger = logging.getLogger("app.shared_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+  ns       TEXT NOT NULL,
+  key      BLOB NOT NULL,
+  value    BLOB NOT NULL,
+  expires  REAL NOT NULL,
+  PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (ns, expires);
+CREATE TABLE IF NOT EXISTS leases (
+  name     TEXT PRIMARY KEY,
+  holder   TEXT NOT NULL,
+  expires  REAL NOT NULL
+);
+"""
+
+PRUNE_EVERY = 64  # sets per namespace between size checks
+
+
+_threads = threading.local()  # path -> sqlite3 connection, per thread (connections can't cross threads)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # opened lazily, so a worker never inherits a connection across fork
+    conns = _threads.__dict__.setdefault("conns", {})
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=1.0, isolation_level=None)  # short: callers may be on the event loop
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable enough for a cache; no fsync per commit
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.executescript(_SCHEMA)
+        conns[path] = conn
+    return conn
+
+
+class SharedCache:
+    """TTLCache-compatible view of one namespace of the shared SQLite cache."""
+
+    def __init__(self, path: str, namespace: str, maxsize: int, ttl: float,
+                 local_size: int = 256, local_ttl: float = 30.0):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._front = TTLCache(maxsize=local_size, ttl=min(local_ttl, ttl)) if local_size > 0 else None
+        self._sets = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        return _connect(self.path)
+
+    @staticmethod
+    def _key(key: Hashable) -> bytes:
+        return orjson.dumps(key)
+
+    # ---- TTLCache interface
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if self._front is not None:
+            hit = self._front.get(key)
+            if hit is not None:
+                self.hits += 1
+                return hit
+        now = time.time()
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires FROM cache WHERE ns = ? AND key = ? AND expires > ?",
+                (self.namespace, self._key(key), now),
+            ).fetchone()
+        except sqlite3.Error:
+            logger.warning("shared cache read failed (%s)", self.namespace, exc_info=True)
+            row = None
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        value = orjson.loads(row[0])
+        if self._front is not None:
+            self._front.set(key, value, ttl=min(self._front.ttl, row[1] - now))
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if self._front is not None:
+            self._front.set(key, value, ttl=min(self._front.ttl, ttl))
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                (self.namespace, self._key(key), orjson.dumps(value), time.time() + ttl),
+            )
+        except sqlite3.Error:
+            logger.warning("shared cache write failed (%s)", self.namespace, exc_info=True)
+            return
+        self._sets += 1
+        if self._sets % PRUNE_EVERY == 0:
+            self.prune()
+
+    def pop(self, key: Hashable) -> None:
+        if self._front is not None:
+            self._front.pop(key)
+        try:
+            self._conn().execute("DELETE FROM cache WHERE ns = ? AND key = ?", (self.namespace, self._key(key)))
+        except sqlite3.Error:
+            logger.warning("shared cache delete failed (%s)", self.namespace, exc_info=True)
+
+    def clear(self) -> None:
+        if self._front is not None:
+            self._front.clear()
+        try:
+            self._conn().execute("DELETE FROM cache WHERE ns = ?", (self.namespace,))
+        except sqlite3.Error:
+            logger.warning("shared cache clear failed (%s)", self.namespace, exc_info=True)
+
+    def prune(self) -> None:
+        """Drop expired entries, then the ones closest to expiry beyond `maxsize`."""
+        try:
+            conn = self._conn()
+            conn.execute("DELETE FROM cache WHERE ns = ? AND expires <= ?", (self.namespace, time.time()))
+            over = conn.execute("SELECT count(*) FROM cache WHERE ns = ?", (self.namespace,)).fetchone()[0] - self.maxsize
+            if over > 0:
+                conn.execute(
+                    "DELETE FROM cache WHERE ns = ? AND key IN "
+                    "(SELECT key FROM cache WHERE ns = ? ORDER BY expires LIMIT ?)",
+                    (self.namespace, self.namespace, over),
+                )
+        except sqlite3.Error:
+            logger.warning("shared cache prune failed (%s)", self.namespace, exc_info=True)
+
+    def __len__(self) -> int:
+        try:
+            return self._conn().execute(
+                "SELECT count(*) FROM cache WHERE ns = ? AND expires > ?", (self.namespace, time.time())
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+Cache = Union[TTLCache, SharedCache]
+
+
+async def aget(cache: Cache, key: Hashable, default: Any = None) -> Any:
+    """`cache.get` for event-loop callers."""
+    if isinstance(cache, SharedCache):
+        if cache._front is not None:
+            hit = cache._front.get(key)
+            if hit is not None:
+                cache.hits += 1
+                return hit
+        return await run_in_threadpool(cache.get, key, default)
+    return cache.get(key, default)
+
+
+async def aset(cache: Cache, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+    """`cache.set` for event-loop callers."""
+    if isinstance(cache, SharedCache):
+        await run_in_threadpool(cache.set, key, value, ttl)
+    else:
+        cache.set(key, value, ttl)
+
+
+def acquire_lease(path: str, name: str, holder: str, ttl: float) -> bool:
+    """Take or renew lease `name` for `ttl` seconds; False while another holder's lease is current."""
+    now = time.time()
+    cur = _connect(path).execute(
+        "INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires "
+        "WHERE leases.holder = excluded.holder OR leases.expires <= ?",
+        (name, holder, now + ttl, now),
+    )
+    return cur.rowcount == 1
+
+
+def release_lease(path: str, name: str, holder: str) -> None:
+    _connect(path).execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+
+def cache_for(namespace: str, maxsize: int, ttl: float) -> Cache:
+    """The shared tier when SHARED_CACHE_PATH is set, a per-process TTLCache otherwise."""
+    if not settings.SHARED_CACHE_PATH:
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    return SharedCache(settings.SHARED_CACHE_PATH, namespace, maxsize, ttl,
+                       local_size=settings.SHARED_CACHE_LOCAL_SIZE, local_ttl=settings.SHARED_CACHE_LOCAL_TTL_SECONDS)
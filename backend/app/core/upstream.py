@@ -0,0 +1,369 @@
+"""
+Shared client layer for third-party HTTP APIs (OpenAI, Jina, Open-Meteo).
+
+Per upstream it keeps:
+- a latency tracker per operation (the caller's `op`, e.g. "embeddings" vs
+  "responses") over recent successful attempts (p50/p95),
+- a circuit breaker: after `breaker_failures` consecutive retryable failures
+  calls fail fast with 503 for `breaker_cooldown` seconds, then one probe
+  is let through,
+- a retry budget: retries draw from a token bucket refilled by regular
+  calls (so retries can't multiply load during an outage), and are only
+  attempted while the caller's deadline leaves room for another p50,
+- hedging for idempotent calls: when an attempt hasn't answered after the
+  observed p95, a duplicate is sent and the first good answer wins.
+
+Retryable = transport errors, 429 and 5xx. Other responses are returned
+as-is so callers keep their own `raise_for_status()` handling. `deadline`
+is an absolute `time.monotonic()` value; without one the upstream's
+`timeout` applies. Either way a call never outlives the current request's
+budget (app/core/deadline.py): once that is spent it raises 504 without
+touching the upstream, and timeouts caused by it don't count against the
+breaker.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from . import deadline as budget
+from . import metrics
+
+UPSTREAM_SECONDS = metrics.Histogram("upstream_request_duration_seconds", "Latency of single upstream HTTP attempts")
+UPSTREAM_EVENTS = metrics.Counter("upstream_events_total", "Upstream retries, hedges, breaker trips and fast failures")
+
+MIN_SAMPLES_FOR_HEDGE = 20
+
+
+class UpstreamUnavailable(HTTPException):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"Upstream {name} is unavailable; retry later.",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+
+
+def _retryable(r: Optional[httpx.Response]) -> bool:
+    return r is None or r.status_code == 429 or r.status_code >= 500
+
+
+class LatencyTracker:
+    def __init__(self, size: int = 256):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES_FOR_HEDGE:
+                return None
+            xs = sorted(self._samples)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown: float):
+        self.failures, self.cooldown = failures, cooldown
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def before(self, name: str) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            left = self.cooldown - (time.monotonic() - self._opened_at)
+            if left > 0 or self._probing:
+                UPSTREAM_EVENTS.inc(upstream=name, event="fast_fail")
+                raise UpstreamUnavailable(name, max(left, 1.0))
+            self._probing = True  # half-open: exactly one caller probes
+
+    def abandon(self) -> None:
+        """The attempt ran out of request budget; say nothing about the upstream's health."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, name: str, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._consecutive, self._opened_at = 0, None
+                return
+            self._consecutive += 1
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                if self._opened_at is None:
+                    UPSTREAM_EVENTS.inc(upstream=name, event="breaker_open")
+                self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Token bucket: each call deposits `ratio` tokens, each retry spends one."""
+
+    def __init__(self, ratio: float = 0.2, cap: float = 10.0):
+        self.ratio, self.cap = ratio, cap
+        self._tokens = cap
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.cap, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class Upstream:
+    def __init__(self, name: str, timeout: float, max_attempts: int = 3,
+                 breaker_failures: int = 5, breaker_cooldown: float = 30.0):
+        self.name = name
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.breaker = CircuitBreaker(breaker_failures, breaker_cooldown)
+        self.budget = RetryBudget()
+        self._client: Optional[httpx.Client] = None
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._init_lock = threading.Lock()
+
+    # ---- shared pieces
+
+    def _sync_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    self._client = httpx.Client(limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+                    self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix=f"hedge-{self.name}")
+        return self._client
+
+    def latency(self, op: str) -> LatencyTracker:
+        tracker = self._latency.get(op)
+        if tracker is None:
+            with self._init_lock:
+                tracker = self._latency.setdefault(op, LatencyTracker())
+        return tracker
+
+    def _deadline(self, deadline: Optional[float]) -> float:
+        deadline = deadline or time.monotonic() + self.timeout
+        b = budget.current()
+        return min(deadline, b.deadline) if b is not None else deadline
+
+    def _start_attempt(self, deadline: float) -> None:
+        budget.check()
+        if deadline <= time.monotonic():
+            UPSTREAM_EVENTS.inc(upstream=self.name, event="deadline")
+            raise budget.DeadlineExceeded()
+        self.breaker.before(self.name)
+
+    def _settle(self, r: Optional[httpx.Response], err: Optional[Exception], deadline: float) -> bool:
+        ok = not _retryable(r)
+        if isinstance(err, httpx.TimeoutException):
+            b = budget.current()
+            # only the request's budget running out is the caller's doing; a hung upstream is a failure
+            if b is not None and b.deadline <= deadline and b.left() <= 0.01:
+                self.breaker.abandon()
+                raise budget.DeadlineExceeded() from err
+        self.breaker.record(self.name, ok)
+        return ok
+
+    def _remaining(self, deadline: float) -> float:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            UPSTREAM_EVENTS.inc(upstream=self.name, event="deadline")
+            raise httpx.TimeoutException(f"{self.name}: request deadline exceeded")
+        return left
+
+    def _hedge_delay(self, op: str, deadline: float) -> Optional[float]:
+        p95 = self.latency(op).quantile(0.95)
+        if p95 is None or deadline - time.monotonic() < 2 * p95:
+            return None
+        return p95
+
+    def _may_retry(self, op: str, attempt: int, deadline: float) -> bool:
+        if attempt >= self.max_attempts:
+            return False
+        p50 = self.latency(op).quantile(0.5) or 0.0
+        if deadline - time.monotonic() < p50 + self._backoff(attempt):
+            return False
+        if not self.budget.withdraw():
+            UPSTREAM_EVENTS.inc(upstream=self.name, event="retry_budget_exhausted")
+            return False
+        UPSTREAM_EVENTS.inc(upstream=self.name, event="retry")
+        return True
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(2.0, 0.1 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def _observe(self, op: str, t0: float, r: Optional[httpx.Response]) -> None:
+        dt = time.perf_counter() - t0
+        outcome = "error" if r is None else str(r.status_code)
+        UPSTREAM_SECONDS.observe(dt, upstream=self.name, outcome=outcome)
+        if not _retryable(r):
+            self.latency(op).observe(dt)
+
+    # ---- sync (threadpool callers)
+
+    def _once(self, op: str, method: str, url: str, deadline: float, **kw) -> httpx.Response:
+        t0 = time.perf_counter()
+        r = None
+        try:
+            r = self._sync_client().request(method, url, timeout=self._remaining(deadline), **kw)
+            return r
+        finally:
+            self._observe(op, t0, r)
+
+    def _hedged(self, op: str, method: str, url: str, deadline: float, **kw) -> httpx.Response:
+        delay = self._hedge_delay(op, deadline)
+        if delay is None:
+            return self._once(op, method, url, deadline, **kw)
+        self._sync_client()
+        first = self._hedge_pool.submit(self._once, op, method, url, deadline, **kw)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        UPSTREAM_EVENTS.inc(upstream=self.name, event="hedge")
+        pending = {first, self._hedge_pool.submit(self._once, op, method, url, deadline, **kw)}
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    result = f.result()
+                except httpx.HTTPError:
+                    if not pending and result is None:
+                        raise
+                    continue
+                if not _retryable(result):
+                    return result  # the slower duplicate finishes in the background and is dropped
+        return result
+
+    def request(self, method: str, url: str, *, op: str = "default", deadline: Optional[float] = None,
+                hedge: bool = False, **kw) -> httpx.Response:
+        deadline = self._deadline(deadline)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._start_attempt(deadline)
+            r, err = None, None
+            try:
+                r = (self._hedged if hedge else self._once)(op, method, url, deadline, **kw)
+            except httpx.HTTPError as e:
+                err = e
+            except BaseException:
+                self.breaker.abandon()  # a half-open probe must not stay claimed
+                raise
+            if self._settle(r, err, deadline):
+                return r
+            if not self._may_retry(op, attempt, deadline):
+                if r is not None:
+                    return r
+                raise err
+            time.sleep(self._backoff(attempt))
+
+    # ---- async (event-loop callers)
+
+    async def _aonce(self, client: httpx.AsyncClient, op: str, method: str, url: str, deadline: float,
+                     **kw) -> httpx.Response:
+        t0 = time.perf_counter()
+        r = None
+        try:
+            r = await client.request(method, url, timeout=self._remaining(deadline), **kw)
+            return r
+        finally:
+            self._observe(op, t0, r)
+
+    async def _ahedged(self, client, op, method, url, deadline, **kw) -> httpx.Response:
+        delay = self._hedge_delay(op, deadline)
+        if delay is None:
+            return await self._aonce(client, op, method, url, deadline, **kw)
+        first = asyncio.ensure_future(self._aonce(client, op, method, url, deadline, **kw))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        UPSTREAM_EVENTS.inc(upstream=self.name, event="hedge")
+        pending = {first, asyncio.ensure_future(self._aonce(client, op, method, url, deadline, **kw))}
+        result = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    try:
+                        result = t.result()
+                    except httpx.HTTPError:
+                        if not pending and result is None:
+                            raise
+                        continue
+                    if not _retryable(result):
+                        return result
+            return result
+        finally:
+            for t in pending:
+                t.cancel()
+
+    async def arequest(self, client: httpx.AsyncClient, method: str, url: str, *, op: str = "default",
+                       deadline: Optional[float] = None, hedge: bool = False, **kw) -> httpx.Response:
+        deadline = self._deadline(deadline)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._start_attempt(deadline)
+            r, err = None, None
+            try:
+                r = await (self._ahedged if hedge else self._aonce)(client, op, method, url, deadline, **kw)
+            except httpx.HTTPError as e:
+                err = e
+            except BaseException:  # cancelled mid-probe (client left, warmer stopped)
+                self.breaker.abandon()
+                raise
+            if self._settle(r, err, deadline):
+                return r
+            if not self._may_retry(op, attempt, deadline):
+                if r is not None:
+                    return r
+                raise err
+            await asyncio.sleep(self._backoff(attempt))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "breaker": self.breaker.state,
+            "latency": {op: {"p50_ms": round((t.quantile(0.5) or 0) * 1000, 1),
+                             "p95_ms": round((t.quantile(0.95) or 0) * 1000, 1)}
+                        for op, t in list(self._latency.items())},
+        }
+
+
+OPENAI = Upstream("openai", timeout=60.0)
+JINA = Upstream("jina", timeout=30.0)
+OPEN_METEO = Upstream("open_meteo", timeout=15.0)
+UPSTREAMS = {u.name: u for u in (OPENAI, JINA, OPEN_METEO)}
+
+
+def _breaker_samples():
+    for u in UPSTREAMS.values():
+        yield {"upstream": u.name}, 0 if u.breaker.state == "closed" else 1
+
+
+metrics.GaugeCallback("upstream_breaker_open", "1 while an upstream's circuit breaker is open or half-open", _breaker_samples)
@@ -0,0 +1,223 @@
+"""
+Background cache warmer for popular cities.
+
+`/api/weather` and `/api/rag-search` record the cities they are asked about;
+every WARMER_INTERVAL_SECONDS the warmer takes the top WARMER_TOP_CITIES
+(topped up from the ingested-guide catalogue) and, before the caches in
+app/routers/weather.py expire, re-fetches their forecast, air and marine
+data and their geocode once it is half-way to its TTL. It also embeds the
+WARMER_QUERIES templates for each city so the query embedding of those
+questions is a cache hit. At most WARMER_CONCURRENCY cities are refreshed
+at once and upstream calls are paced to WARMER_RATE_PER_SECOND.
+
+Counts decay by half each cycle so the ranking follows recent traffic.
+State is per worker process. With SHARED_CACHE_PATH the caches are shared,
+so only the worker holding the "cache-warmer" lease in the shared file
+warms them (ranking by its own share of the traffic); the others check the
+lease every cycle and take over within a few intervals if it stops
+renewing. Without a shared cache each worker warms its own caches, so
+divide the rate accordingly.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics
+from .config import settings
+from .shared_cache import acquire_lease, release_lease
+
+logger = logging.getLogger("app.warmer")
+
+WARMER_REFRESHES = metrics.Counter("warmer_refreshes_total", "Cache entries refreshed by the background warmer")
+
+_counts: Dict[str, float] = {}
+_counts_lock = threading.Lock()
+
+
+def record_city(city: Optional[str]) -> None:
+    """Count one request for `city`; cheap enough for the request path."""
+    city = (city or "").strip().lower()
+    if not city:
+        return
+    with _counts_lock:
+        _counts[city] = _counts.get(city, 0.0) + 1.0
+
+
+def top_cities(n: int) -> List[str]:
+    with _counts_lock:
+        ranked = sorted(_counts.items(), key=lambda kv: -kv[1])
+    return [city for city, _ in ranked[:n]]
+
+
+def _decay() -> None:
+    with _counts_lock:
+        for city in list(_counts):
+            _counts[city] *= 0.5
+            if _counts[city] < 0.5:
+                del _counts[city]
+
+
+class _Pacer:
+    """Spaces call starts at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class CacheWarmer:
+    def __init__(self, interval: float, top: int, concurrency: int, rate: float):
+        self.interval = interval
+        self.top = top
+        self.concurrency = concurrency
+        self.rate = rate
+        self._task: Optional[asyncio.Task] = None
+        self._geo_at: Dict[str, float] = {}
+        self._holder = uuid.uuid4().hex
+        self.leader = False
+        self.last_run: Optional[Dict[str, object]] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="cache-warmer")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.leader:
+            self.leader = False
+            try:
+                await run_in_threadpool(release_lease, settings.SHARED_CACHE_PATH, "cache-warmer", self._holder)
+            except sqlite3.Error:
+                pass  # it expires on its own
+
+    def _lead(self) -> bool:
+        """Whether this worker should warm: always without a shared cache, else while it holds the lease."""
+        if not settings.SHARED_CACHE_PATH:
+            return True
+        try:
+            leader = acquire_lease(settings.SHARED_CACHE_PATH, "cache-warmer", self._holder, 3 * self.interval)
+        except sqlite3.Error:
+            logger.warning("warmer lease unavailable; warming from this worker", exc_info=True)
+            leader = True
+        if leader != self.leader:
+            logger.info("cache warmer %s in this worker", "active" if leader else "standing by")
+        self.leader = leader
+        return leader
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if await run_in_threadpool(self._lead):
+                    await self.run_once()
+                    await run_in_threadpool(self._lead)  # renew: a long cycle must not let the lease lapse
+            except Exception:
+                logger.exception("cache warmer cycle failed")
+            await asyncio.sleep(self.interval)
+
+    async def _cities(self) -> List[str]:
+        cities = top_cities(self.top)
+        if len(cities) < self.top:
+            from ..rag.catalogue import city_catalogue
+            try:
+                snap = await city_catalogue.get()
+            except Exception:
+                logger.warning("city catalogue unavailable, warming request history only", exc_info=True)
+                return cities
+            for city, _title in snap.entries:
+                if len(cities) >= self.top:
+                    break
+                if city not in cities:
+                    cities.append(city)
+        return cities
+
+    async def run_once(self) -> Dict[str, object]:
+        t0 = time.perf_counter()
+        cities = await self._cities()
+        _decay()
+        pacer = _Pacer(self.rate)
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(client: httpx.AsyncClient, city: str) -> None:
+            async with sem:
+                await self._weather(client, pacer, city)
+                await self._queries(pacer, city)
+
+        async with httpx.AsyncClient() as client:
+            await asyncio.gather(*(one(client, c) for c in cities))
+        self.last_run = {"cities": len(cities), "seconds": round(time.perf_counter() - t0, 2), "at": time.time()}
+        return self.last_run
+
+    async def _weather(self, client: httpx.AsyncClient, pacer: _Pacer, city: str) -> None:
+        from ..routers import weather
+        try:
+            stale = time.monotonic() - self._geo_at.get(city, 0.0) > settings.GEOCODE_CACHE_TTL_SECONDS / 2
+            await pacer.wait()
+            place = await weather.geocode_city(client, city, refresh=stale)
+            if stale:
+                self._geo_at[city] = time.monotonic()
+                WARMER_REFRESHES.inc(kind="geocode", outcome="ok")
+        except Exception:
+            WARMER_REFRESHES.inc(kind="geocode", outcome="error")
+            logger.info("warmer: geocode failed for %s", city, exc_info=True)
+            return
+        lat, lon, tz = place["latitude"], place["longitude"], place.get("timezone", "auto")
+        days = 7  # the /api/weather default
+        for kind, call in (
+            ("forecast", lambda: weather.fetch_forecast(client, lat, lon, tz, days, refresh=True)),
+            ("air", lambda: weather.fetch_air(client, lat, lon, tz, refresh=True)),
+            ("marine", lambda: weather.fetch_marine(client, lat, lon, tz, days, refresh=True)),
+        ):
+            await pacer.wait()
+            try:
+                await call()
+                WARMER_REFRESHES.inc(kind=kind, outcome="ok")
+            except Exception:
+                WARMER_REFRESHES.inc(kind=kind, outcome="error")  # inland cities have no marine data
+
+    async def _queries(self, pacer: _Pacer, city: str) -> None:
+        if not settings.WARMER_QUERIES or not settings.OPENAI_API_KEY:
+            return
+        from ..rag.embedder import prime_queries
+        from ..rag.reembed import serving
+        texts = [q.format(city=city.title()) for q in settings.WARMER_QUERIES]
+        await pacer.wait()
+        try:
+            srv = await run_in_threadpool(serving)
+            n = await run_in_threadpool(prime_queries, texts, srv.model, srv.dims)
+            WARMER_REFRESHES.inc(n, kind="query_embedding", outcome="ok")
+        except Exception:
+            WARMER_REFRESHES.inc(kind="query_embedding", outcome="error")
+            logger.info("warmer: query embeddings failed for %s", city, exc_info=True)
+
+    def stats(self) -> Dict[str, object]:
+        return {"enabled": self._task is not None, "leader": self.leader, "tracked_cities": len(_counts),
+                "last_run": self.last_run}
+
+
+warmer = CacheWarmer(
+    interval=settings.WARMER_INTERVAL_SECONDS,
+    top=settings.WARMER_TOP_CITIES,
+    concurrency=settings.WARMER_CONCURRENCY,
+    rate=settings.WARMER_RATE_PER_SECOND,
+)
@@ -1,38 +1,151 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import hmac
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event, select
+from ..core.cache import TTLCache
 from ..core.config import settings
 from ..core.db import SessionLocal
+from ..core.metrics import register_cache
 from ..models import User
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# token -> decoded payload, kept until the token itself expires
+_token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# user id -> detached User row; ORM updates and deletes invalidate it (below), the short TTL
+# covers other workers and changes made outside this process
+_user_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+register_cache("auth_tokens", _token_cache)
+register_cache("auth_users", _user_cache)
 
-async def get_db() -> AsyncSession:
-    async with SessionLocal() as session:
-        yield session
+
+@dataclass(frozen=True)
+class TokenClaims:
+    """Identity carried by a signed access token; no database round trip needed."""
+    id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_db() -> AsyncSession:
+    async with SessionLocal() as session:
+        yield session
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify and decode a JWT, memoizing the result per token string.
+    Entries expire together with the token so an expired token is never served from cache.
+    """
+    payload = _token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    ttl = float(payload.get("exp", 0)) - time.time()
+    if ttl > 0:
+        _token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> TokenClaims:
+    """
+    Fast auth path for routes that only need the caller's id (and name/email).
+    Relies solely on the token signature; a deleted user keeps access until the token expires.
+    """
+    payload = decode_token(token)
+    try:
+        user_id = int(payload["sub"])
+    except (TypeError, ValueError):
+        raise _credentials_exception()
+    return TokenClaims(id=user_id, name=payload.get("name"), email=payload.get("email"))
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a cached user row; call after changing `users` without the ORM (bulk UPDATE, raw SQL)."""
+    _user_cache.pop(int(user_id))
 
 
-    result = await db.execute(select(User).where(User.id == int(user_id)))
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+
+
+async def get_current_user(claims: TokenClaims = Depends(get_token_claims), db: AsyncSession = Depends(get_db)) -> User:
+    """Full user row for routes that need more than the token claims (cached for USER_CACHE_TTL_SECONDS)."""
+    user = _user_cache.get(claims.id)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.id == claims.id))
     user = result.scalar_one_or_none()
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _credentials_exception()
+    db.expunge(user)
+    _user_cache.set(claims.id, user)
+    return user
+
+
+# Loopback tool calls (app/agent/tools.py) carry the key of the request they work for, signed with
+# JWT_SECRET, so admission control queues them under the real caller rather than 127.0.0.1
+CLIENT_KEY_HEADER = "X-Client-Key"
+_client_key: ContextVar[Optional[str]] = ContextVar("client_key", default=None)
+
+
+def _sign_key(key: str) -> str:
+    return hmac.new(settings.JWT_SECRET.encode(), key.encode(), hashlib.sha256).hexdigest()
+
+
+def request_key(request: Request) -> str:
+    """
+    Who a request belongs to, for fair queuing: the key forwarded by a loopback
+    call, else the token subject when a valid bearer token is sent, otherwise
+    the client address. The key is remembered for `forward_key_headers()`.
+    """
+    key = _forwarded_key(request) or _own_key(request)
+    _client_key.set(key)
+    return key
+
+
+def _forwarded_key(request: Request) -> Optional[str]:
+    key, _, sig = request.headers.get(CLIENT_KEY_HEADER, "").rpartition(".")
+    if key and hmac.compare_digest(sig.encode(), _sign_key(key).encode()):
+        return key
+    return None
+
+
+def _own_key(request: Request) -> str:
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() == "bearer ":
+        try:
+            return f"user:{decode_token(auth[7:].strip())['sub']}"
+        except HTTPException:
+            pass
+    return f"addr:{request.client.host if request.client else 'unknown'}"
+
+
+def forward_key_headers() -> Dict[str, str]:
+    """Header that tells a loopback call which client it is made for."""
+    key = _client_key.get()
+    return {CLIENT_KEY_HEADER: f"{key}.{_sign_key(key)}"} if key else {}
@@ -1,15 +1,69 @@
-import uvicorn
+import asyncio
+import anyio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .core.db import init_db
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from .core import metrics, profiling
+from .core.compression import CompressionMiddleware
+from .core.config import settings
+from .core.deadline import DeadlineMiddleware
+from .core.db import init_db, close_db, get_vector_pool, pool_stats
+from .core.upstream import UPSTREAMS
+from .core.warmer import warmer
+from .rag import reembed
+from .rag.jobs import ingest_queue
 from .routers import auth as auth_router
 from .routers import trips as trips_router
 from .routers import weather as weather_router
 from .routers import rag as rag_router
 from .routers import agent as agent_router
 from .routers import cities as cities_router
+from .routers import profiles as profiles_router
 
-app = FastAPI(title="AI Travel Planner API")
+logger = logging.getLogger("app")
+
+
+def _warm_up() -> None:
+    """Build the lazily-initialized heavy objects ahead of the first request."""
+    import pypdf  # noqa: F401
+    from .agent.graph import app_graph
+    from .rag.splitter import encoding
+    encoding.get()
+    app_graph.get()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    t0 = time.perf_counter()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    # the agent graph's sync steps run on the loop's default executor (ainvoke); size it the same
+    executor = profiling.ProfiledExecutor if profiling.enabled() else ThreadPoolExecutor
+    asyncio.get_running_loop().set_default_executor(executor(settings.THREADPOOL_SIZE, thread_name_prefix="graph"))
+    # Schema creation lives in `python -m app.core.db`; opt back in for local dev only.
+    if settings.DB_CREATE_SCHEMA_ON_STARTUP:
+        await init_db()
+    get_vector_pool()
+    if settings.WARMUP_ON_STARTUP:
+        await asyncio.to_thread(_warm_up)
+    ingest_queue.start()
+    if settings.OLLAMA_WARMUP and not settings.OPENAI_API_KEY:
+        from .agent.local_llm import warm_up
+        app.state.ollama_warmup = asyncio.create_task(asyncio.to_thread(warm_up))  # model load can take a while
+    if settings.WARMER_ENABLED:
+        warmer.start()
+    app.state.startup_ms = round((time.perf_counter() - t0) * 1000, 1)
+    logger.info("startup finished in %.1f ms", app.state.startup_ms)
+    yield
+    await warmer.stop()
+    await ingest_queue.stop()
+    await close_db()
+
+
+app = FastAPI(title="AI Travel Planner API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,11 +71,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
-
-@app.on_event("startup")
-async def on_startup():
-    await init_db()
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(
+    CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.GZIP_LEVEL, brotli_quality=settings.BROTLI_QUALITY,
+)
+if profiling.enabled():
+    app.add_middleware(profiling.ProfilingMiddleware)
 
 app.include_router(auth_router.router)
 app.include_router(trips_router.router)
@@ -29,6 +88,22 @@ app.include_router(weather_router.router)
 app.include_router(rag_router.router)
 app.include_router(agent_router.router)
 app.include_router(cities_router.router)
+app.include_router(profiles_router.router)
+
+
+@app.get("/api/health", tags=["health"])
+async def health():
+    return {"status": "ok", "startup_ms": getattr(app.state, "startup_ms", None), "db_pools": pool_stats(),
+            "ingest_queue": ingest_queue.stats(), "warmer": warmer.stats(),
+            "upstreams": {name: u.stats() for name, u in UPSTREAMS.items()},
+            "embeddings": reembed.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,14 +1,28 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, func
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, func
 from ..core.db import Base
+from .types import CompressedText
+
+PREVIEW_CHARS = 160
 
 
 class SavedTrip(Base):
     __tablename__ = "saved_trips"
+    # keyset pagination: WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+    __table_args__ = (
+        Index("ix_saved_trips_user_created_id", "user_id", "created_at", "id"),
+    )
 
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     city: Mapped[str] = mapped_column(String(120))
-    recommendation: Mapped[str] = mapped_column(Text)
-    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    preview: Mapped[str] = mapped_column(String(PREVIEW_CHARS + 1), server_default="")
+    # full agent JSON, zstd-compressed and only loaded when explicitly requested
+    recommendation: Mapped[str] = mapped_column(CompressedText, deferred=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+def make_preview(recommendation: str) -> str:
+    text = (recommendation or "").strip()
+    return text[:PREVIEW_CHARS] + "…" if len(text) > PREVIEW_CHARS else text
@@ -0,0 +1,38 @@
+import zstandard
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored as a zstd-compressed BYTEA.
+    Short values are kept as plain UTF-8; rows written before compression
+    (converted from TEXT) decode the same way, so no backfill is needed.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, min_size: int = 256, level: int = 3, **kw):
+        super().__init__(**kw)
+        self.min_size = min_size
+        self.level = level
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        raw = value.encode("utf-8")
+        if len(raw) < self.min_size:
+            return raw
+        # compressor objects are not thread-safe; they are cheap to create
+        return zstandard.ZstdCompressor(level=self.level).compress(raw)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        value = bytes(value)
+        if value.startswith(_ZSTD_MAGIC):
+            value = zstandard.ZstdDecompressor().decompress(value)
+        return value.decode("utf-8")
@@ -1,37 +1,50 @@
-import json, requests
+import json, time
 from ..core.config import settings
+from ..core.metrics import timed, record_tokens
+from ..core.upstream import OPENAI
+from .context import pack_context
 
-OPENAI_BASE = "https://api.openai.com/v1"
+OPENAI_BASE = settings.OPENAI_BASE
 SYSTEM = (
     "You are a helpful travel assistant. Answer with concise, practical guidance. "
     "Cite neighborhoods, transit tips, and seasonal/weather caveats when relevant."
 )
 
-def synthesize_answer(question: str, city: str | None, contexts):
-    headers = {
-        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+def build_prompt(question: str, city: str | None, contexts) -> str:
     context_text = "\n\n".join(
         f"[{i+1}] Section: {c['section']}\n{c['content']}"
         for i, c in enumerate(contexts)
     )
-    prompt = (
+    return (
         f"City: {city or 'Unknown'}\n"
         f"User question: {question}\n\n"
         f"Use ONLY the following sources:\n{context_text}\n\n"
         f"Answer briefly. If unsure, say so."
     )
+
+
+def complete(system: str, prompt: str, max_output_tokens: int | None = None, timeout: float = 120) -> str:
+    """One Responses API call; returns the output text."""
+    headers = {
+        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+        "Content-Type": "application/json",
+    }
     payload = {
         "model": "gpt-4o-mini",
         "input": [
-            {"role": "system", "content": SYSTEM},
+            {"role": "system", "content": system},
             {"role": "user", "content": prompt}
         ]
     }
-    r = requests.post(f"{OPENAI_BASE}/responses", headers=headers, data=json.dumps(payload), timeout=120)
+    if max_output_tokens:
+        payload["max_output_tokens"] = max_output_tokens
+    # not hedged: a duplicate generation would double the token bill
+    r = OPENAI.request("POST", f"{OPENAI_BASE}/responses", op="responses", headers=headers, content=json.dumps(payload),
+                       deadline=time.monotonic() + timeout)
     r.raise_for_status()
     data = r.json()
+    usage = data.get("usage") or {}
+    record_tokens("openai", payload["model"], prompt=usage.get("input_tokens"), completion=usage.get("output_tokens"))
     for out in data.get("output", []):
         if out.get("type") == "message":
             parts = out.get("content", [])
@@ -43,3 +56,15 @@ def synthesize_answer(question: str, city: str | None, contexts):
                     texts.append(p["text"])
             return "".join(texts).strip()
     return data.get("output_text") or "[No text]"
+
+
+@timed("synthesize_answer")
+def synthesize_answer(question: str, city: str | None, contexts):
+    """
+    `contexts` are retrieved chunks in relevance order. Full rows (with id and
+    chunk_idx) are packed first: neighbours merged, overlap removed, and cut
+    to RAG_CONTEXT_TOKENS.
+    """
+    if contexts and "chunk_idx" in contexts[0]:
+        contexts = pack_context(contexts, settings.RAG_CONTEXT_TOKENS, neighbours=settings.RAG_CONTEXT_NEIGHBOURS)
+    return complete(SYSTEM, build_prompt(question, city, contexts))
@@ -0,0 +1,108 @@
+"""
+Cross-request micro-batching for calls that accept a list of inputs.
+
+Callers run in threadpool workers (retrieve() is sync), so the batcher is
+thread-based: the first caller of a batch becomes its leader, waits up to
+`window` seconds (or until `max_batch` items are pending), then sends one
+upstream call for everyone and hands each waiter its result. Identical
+inputs within a batch are sent once.
+
+The shared call belongs to no single request: it runs outside the leader's
+request context (so the leader's budget or disconnect can't fail the
+others) with the latest deadline among the waiters, and each waiter stops
+waiting on its own budget.
+"""
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+from ..core import deadline as budget
+from ..core import metrics
+
+T = TypeVar("T")
+
+BATCH_SIZE = metrics.Histogram(
+    "microbatch_size", "Inputs per upstream call sent by a micro-batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCH_WAIT_SECONDS = metrics.Histogram(
+    "microbatch_wait_seconds", "Delay added by batching: caller arrival until its batch was sent",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+
+class _Batch(Generic[T]):
+    def __init__(self):
+        self.inputs: Dict[str, int] = {}  # distinct input -> position in the upstream call
+        self.budgets: List[Optional[budget.Budget]] = []  # one per waiter; None = no request budget
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.sent_at = 0.0
+        self.results: Optional[List[T]] = None
+        self.error: Optional[BaseException] = None
+
+    def deadline(self) -> Optional[float]:
+        """Latest deadline of the waiters still interested; None when one has no budget."""
+        live = [b for b in self.budgets if b is None or not b.cancelled]
+        if not live or any(b is None for b in live):
+            return None
+        return max(b.deadline for b in live)
+
+
+class MicroBatcher(Generic[T]):
+    """`fn(inputs, deadline)` makes the upstream call; `deadline` is absolute monotonic or None."""
+
+    def __init__(self, name: str, fn: Callable[[List[str], Optional[float]], List[T]], window: float,
+                 max_batch: int):
+        self.name = name
+        self.fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._open: Optional[_Batch[T]] = None
+
+    def submit(self, item: str) -> T:
+        if self.window <= 0 or self.max_batch <= 1:
+            return self.fn([item], None)[0]
+
+        t0 = time.perf_counter()
+        with self._lock:
+            batch, leader = self._open, False
+            if batch is None:
+                batch, leader = _Batch(), True
+                self._open = batch
+            pos = batch.inputs.setdefault(item, len(batch.inputs))
+            batch.budgets.append(budget.current())
+            if len(batch.inputs) >= self.max_batch:
+                self._open = None  # closed: later callers start a new batch
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+                inputs = list(batch.inputs)
+                call_deadline = batch.deadline()
+            batch.sent_at = time.perf_counter()
+            BATCH_SIZE.observe(len(inputs), batcher=self.name)
+            try:
+                batch.results = contextvars.Context().run(self.fn, inputs, call_deadline)
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            b = budget.current()
+            if b is None:
+                batch.done.wait()
+            else:
+                # slices: a disconnect only sets the budget's flag
+                while not batch.done.wait(max(0.0, min(b.left(), 0.5))):
+                    budget.check()
+
+        BATCH_WAIT_SECONDS.observe(max(0.0, batch.sent_at - t0), batcher=self.name)
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[pos]
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import text
+from ..core.config import settings
+from ..core.db import SessionLocal
+
+Entry = Tuple[str, str]  # city (normalized), title
+
+
+class _Snapshot:
+    """Immutable, title-sorted view of the catalogue with a trigram index over city + title."""
+
+    def __init__(self, entries: Iterable[Entry]):
+        self.entries: List[Entry] = sorted(set(entries), key=lambda e: (e[1], e[0]))
+        self.haystacks: List[str] = [f"{city}\x00{title.lower()}" for city, title in self.entries]
+        self.cities: FrozenSet[str] = frozenset(city for city, _ in self.entries)
+        self.trigrams: Dict[str, Set[int]] = {}
+        for pos, hay in enumerate(self.haystacks):
+            for i in range(len(hay) - 2):
+                self.trigrams.setdefault(hay[i:i + 3], set()).add(pos)
+
+    def _candidates(self, q: str) -> Iterable[int]:
+        if len(q) < 3:
+            return range(len(self.entries))
+        sets = []
+        for i in range(len(q) - 2):
+            s = self.trigrams.get(q[i:i + 3])
+            if not s:
+                return ()
+            sets.append(s)
+        sets.sort(key=len)
+        return sorted(set.intersection(*sets))
+
+    def page(self, q: Optional[str], limit: int, offset: int) -> Tuple[List[Entry], int]:
+        """Filter, count and slice in one pass over the matching positions."""
+        q = (q or "").lower()
+        items: List[Entry] = []
+        total = 0
+        for pos in self._candidates(q):
+            if q and q not in self.haystacks[pos]:
+                continue
+            if offset <= total < offset + limit:
+                items.append(self.entries[pos])
+            total += 1
+        return items, total
+
+
+class CityCatalogue:
+    """
+    In-memory copy of the distinct (city, title) pairs in `documents`.
+    Loaded once from Postgres, then kept current by `add()` from the ingest path.
+    `max_age` bounds staleness for ingests that ran in another process (CLI, other workers).
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._snapshot: Optional[_Snapshot] = None
+        self._loaded_at = 0.0
+        self._load_lock = asyncio.Lock()
+        self._write_lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return self._snapshot is not None and (time.monotonic() - self._loaded_at) < self.max_age
+
+    async def get(self) -> _Snapshot:
+        if self._fresh():
+            return self._snapshot
+        async with self._load_lock:
+            if not self._fresh():
+                await self._load()
+        return self._snapshot
+
+    async def _load(self) -> None:
+        sql = text("""
+            SELECT DISTINCT city, title
+            FROM documents
+            WHERE city IS NOT NULL AND title IS NOT NULL
+              AND TRIM(city) <> '' AND TRIM(title) <> ''
+        """)
+        async with SessionLocal() as session:
+            rows = (await session.execute(sql)).all()
+        snap = _Snapshot(((city or "").strip().lower(), (title or "").strip()) for city, title in rows)
+        with self._write_lock:
+            self._snapshot, self._loaded_at = snap, time.monotonic()
+
+    def add(self, city: str, title: str) -> None:
+        """Record a freshly ingested document; safe to call from worker threads."""
+        city, title = (city or "").strip().lower(), (title or "").strip()
+        if not city or not title:
+            return
+        with self._write_lock:
+            if self._snapshot is None:
+                return  # nothing loaded yet; the first read will pick it up
+            if (city, title) not in self._snapshot.entries:
+                self._snapshot = _Snapshot(self._snapshot.entries + [(city, title)])
+
+    def invalidate(self) -> None:
+        with self._write_lock:
+            self._snapshot = None
+
+
+city_catalogue = CityCatalogue(max_age=settings.CITY_CATALOGUE_MAX_AGE_SECONDS)
@@ -0,0 +1,138 @@
+"""
+Compact embedding storage for the first retrieval stage.
+
+Modes (EMBED_COMPACT_MODE):
+- "off":     exact search on chunks.embedding (1536 x float32)
+- "halfvec": Matryoshka-truncated, re-normalized vectors in chunks.embedding_short
+             (EMBED_COMPACT_DIMS x float16, HNSW index)
+- "binary":  binary_quantize(embedding) expression index (1536 bits, Hamming distance)
+
+In both compact modes `_pg_search` takes an EMBED_SHORTLIST-sized shortlist from the
+compact index and re-ranks it against the full-precision column.
+
+embedding_short is declared HALFVEC(512) in schema.sql / migrations/002; change both
+together with EMBED_COMPACT_DIMS.
+
+Only the index for the mode in use is built (write amplification and memory for an
+unused HNSW index buy nothing), by the backfill, with CREATE INDEX CONCURRENTLY:
+
+    python -m app.rag.compact --batch 2000                 # EMBED_COMPACT_MODE's index
+    python -m app.rag.compact --mode halfvec binary        # both, e.g. for bench_compact_search
+
+Switching modes later: run it again for the new mode, then drop the old index.
+"""
+import argparse
+import math
+import time
+from typing import List, Optional, Sequence
+import psycopg
+from pgvector import HalfVector
+from ..core.config import settings
+from ..core.db import sync_dsn
+from .db import get_conn
+
+MODES = ("off", "halfvec", "binary")
+
+
+def truncate(vec: Sequence[float], dims: int) -> List[float]:
+    """Matryoshka truncation: keep the leading dims and L2-normalize again."""
+    head = list(vec[:dims])
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
+
+def short_vector(vec: Sequence[float]) -> HalfVector:
+    return HalfVector(truncate(vec, settings.EMBED_COMPACT_DIMS))
+
+
+def first_stage_sql(mode: str) -> str:
+    """ORDER BY expression for the shortlist query; the query vector is %(q)s / %(qs)s."""
+    if mode == "halfvec":
+        return "embedding_short <=> %(qs)s::halfvec"
+    if mode == "binary":
+        return "binary_quantize(embedding)::bit(1536) <~> binary_quantize(%(q)s::vector)"
+    raise ValueError(f"no first stage for mode {mode!r}")
+
+
+_iterative_scan: Optional[bool] = None
+
+
+def tune_first_stage(conn, shortlist: int, filtered: bool) -> None:
+    """
+    Let the HNSW scan return the whole shortlist: hnsw.ef_search (default 40) caps how
+    many rows it yields, and a city filter is applied after the scan. pgvector >= 0.8
+    can also keep scanning until enough rows pass the filter (iterative_scan). Both are
+    SET LOCAL, i.e. for the current transaction only.
+    """
+    global _iterative_scan
+    conn.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(min(max(shortlist, 40), 1000)),))
+    if not filtered:
+        return
+    if _iterative_scan is None:
+        version = conn.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'").fetchone()
+        _iterative_scan = bool(version) and tuple(int(x) for x in version[0].split(".")[:2]) >= (0, 8)
+    if _iterative_scan:
+        # the shortlist is re-ranked on the full vector anyway, so relaxed ordering costs nothing
+        conn.execute("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+
+
+INDEXES = {
+    "halfvec": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_embedding_short_hnsw "
+               "ON chunks USING hnsw (embedding_short halfvec_cosine_ops)",
+    "binary": "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunks_embedding_bin_hnsw "
+              "ON chunks USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)",
+}
+
+
+def backfill(modes: Sequence[str], batch: int = 2000, pause: float = 0.0) -> int:
+    """Fill embedding_short for existing rows (halfvec) in id order and build the index of each mode."""
+    dims = settings.EMBED_COMPACT_DIMS
+    done, last_id = 0, 0
+    while "halfvec" in modes:
+        with get_conn() as conn:
+            rows = conn.execute(
+                """
+                UPDATE chunks c
+                SET embedding_short = l2_normalize(subvector(c.embedding, 1, %(dims)s))::halfvec
+                FROM (
+                    SELECT id FROM chunks
+                    WHERE id > %(last)s AND embedding_short IS NULL AND embedding IS NOT NULL
+                    ORDER BY id LIMIT %(batch)s
+                ) todo
+                WHERE c.id = todo.id
+                RETURNING c.id
+                """,
+                {"dims": dims, "last": last_id, "batch": batch},
+            ).fetchall()
+        if not rows:
+            break
+        done += len(rows)
+        last_id = max(r[0] for r in rows)
+        print(f"  backfilled {done} rows (last id {last_id})")
+        if pause:
+            time.sleep(pause)
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; use a private autocommit connection
+    with psycopg.connect(sync_dsn(), autocommit=True) as conn:
+        for mode in modes:
+            conn.execute(INDEXES[mode])
+        conn.execute("ANALYZE chunks")
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--batch", type=int, default=2000)
+    ap.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    ap.add_argument("--mode", nargs="+", choices=list(INDEXES), default=None,
+                    help="compact mode(s) to prepare (default: EMBED_COMPACT_MODE)")
+    args = ap.parse_args()
+    modes = args.mode or [settings.EMBED_COMPACT_MODE]
+    if "off" in modes:
+        raise SystemExit("EMBED_COMPACT_MODE is off; pass --mode halfvec and/or --mode binary")
+    n = backfill(modes, args.batch, args.pause)
+    print(f"Done: {n} rows backfilled; {', '.join(modes)} index ready.")
+
+
+if __name__ == "__main__":
+    main()
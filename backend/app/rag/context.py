@@ -0,0 +1,110 @@
+"""
+Context packing for synthesize_answer.
+
+Retrieved chunks that are neighbours in the same guide and section
+(consecutive chunk_idx) are merged into one passage with the splitter's overlap removed,
+optionally after pulling in the chunks just before/after each hit with one
+extra query. Passages are then added in relevance order until a token
+budget is spent.
+"""
+from typing import Dict, List, Sequence
+
+from .db import get_conn
+from .splitter import token_len
+from ..core.metrics import timed
+
+# The splitter carries whole trailing sentences into the next chunk, so a real overlap is
+# at least a short sentence and sits on word boundaries at both ends; shorter or mid-word
+# matches ("cities" + "sights") are coincidences.
+MIN_OVERLAP_CHARS = 20
+
+
+def _on_boundaries(a: str, b: str, n: int) -> bool:
+    start_ok = n == len(a) or a[-n - 1].isspace()
+    end_ok = n == len(b) or b[n].isspace() or b[n - 1] in ".!?"
+    return start_ok and end_ok
+
+
+def merge_overlap(a: str, b: str) -> str:
+    """Join two consecutive chunks, dropping the text `b` repeats from the end of `a`."""
+    # longest prefix of b that is also a suffix of a (KMP prefix function over b + sep + tail of a)
+    s = f"{b}\x00{a[-len(b):]}"
+    fail = [0] * len(s)
+    for i in range(1, len(s)):
+        j = fail[i - 1]
+        while j and s[i] != s[j]:
+            j = fail[j - 1]
+        if s[i] == s[j]:
+            j += 1
+        fail[i] = j
+    overlap = fail[-1]
+    # fall back through shorter borders until one is long enough and on word boundaries
+    while overlap >= MIN_OVERLAP_CHARS and not _on_boundaries(a, b, overlap):
+        overlap = fail[overlap - 1]
+    if overlap >= MIN_OVERLAP_CHARS:
+        return a + b[overlap:]
+    return f"{a} {b}"
+
+
+def fetch_neighbours(ids: Sequence[int]) -> List[dict]:
+    """Hits plus the chunks directly before/after each of them in the same section (one query)."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT DISTINCT n.id, n.city, n.section, n.chunk_idx, n.content, n.doc_id, n.tokens
+            FROM chunks h
+            JOIN chunks n
+              ON n.doc_id = h.doc_id
+             AND n.section IS NOT DISTINCT FROM h.section
+             AND n.chunk_idx BETWEEN h.chunk_idx - 1 AND h.chunk_idx + 1
+            WHERE h.id = ANY(%s)
+            """,
+            (list(ids),),
+        ).fetchall()
+    return [{"id": r[0], "city": r[1], "section": r[2], "chunk_idx": r[3], "content": r[4], "doc_id": r[5],
+             "tokens": r[6]} for r in rows]
+
+
+@timed("pack_context")
+def pack_context(chunks: List[dict], budget_tokens: int, neighbours: bool = False) -> List[Dict[str, str]]:
+    """
+    `chunks` are retrieved rows (id, city, section, chunk_idx, content, doc_id,
+    tokens) in relevance order; chunk_idx counts from 0 in every guide, so
+    runs are per doc_id and section. Chunks are admitted hits first, then neighbours, while
+    they fit in `budget_tokens`; the admitted ones are merged into passages
+    and returned as [{"section", "content"}], most relevant first.
+    """
+    rank = {c["id"]: i for i, c in enumerate(chunks)}
+    key = lambda c: (c["doc_id"], c["section"])
+    candidates = list(chunks)
+    if neighbours and chunks:
+        pos = {(key(c), c["chunk_idx"]): rank[c["id"]] for c in chunks}
+        extra = [n for n in fetch_neighbours(list(rank)) if n["id"] not in rank]
+        # a neighbour ranks with the best hit it touches, after all hits
+        extra.sort(key=lambda n: min(pos.get((key(n), n["chunk_idx"] + d), len(rank)) for d in (-1, 1)))
+        candidates += extra
+
+    picked, used = [], 0
+    for c in candidates:
+        n = c.get("tokens") or token_len(c["content"])  # stored at ingest; upper bound: merging only removes text
+        if used + n <= budget_tokens:
+            picked.append(c)
+            used += n
+
+    # runs of consecutive chunk_idx within one guide/section
+    runs: List[List[dict]] = []
+    for c in sorted(picked, key=lambda c: (c["doc_id"], c["section"] or "", c["chunk_idx"])):
+        prev = runs[-1][-1] if runs else None
+        if prev and key(prev) == key(c) and c["chunk_idx"] == prev["chunk_idx"] + 1:
+            runs[-1].append(c)
+        else:
+            runs.append([c])
+    runs.sort(key=lambda run: min(rank.get(c["id"], len(rank)) for c in run))
+
+    passages = []
+    for run in runs:
+        text = run[0]["content"]
+        for c in run[1:]:
+            text = merge_overlap(text, c["content"])
+        passages.append({"section": run[0]["section"], "content": text})
+    return passages
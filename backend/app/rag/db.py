@@ -1,9 +1,8 @@
-import psycopg
-from pgvector.psycopg import register_vector
-from ..core.config import settings
+from ..core.db import get_vector_pool
 
 def get_conn():
-    dsn = settings.DATABASE_URL.replace("+asyncpg", "")
-    conn = psycopg.connect(dsn, autocommit=True)
-    register_vector(conn)
-    return conn
+    """
+    Borrow a pgvector-enabled connection from the shared pool.
+    Use as `with get_conn() as conn:`; the block commits on success and rolls back on error.
+    """
+    return get_vector_pool().connection()
@@ -0,0 +1,148 @@
+"""
+Per-(guide, section) digests built at ingest time.
+
+Each template section of a guide is summarized once into a short digest
+stored in `section_digests` with its token count and a hash of the chunk
+hashes it was built from; a re-ingest only regenerates sections whose
+chunks changed. With several guides for a city, reads use the newest
+digest of the section. `/api/rag-search` serves section-level questions
+("overview of Lisbon", "getting around Rome") straight from the digest,
+skipping the query embedding, vector search and answer synthesis.
+"""
+import hashlib
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .answer import complete
+from .context import merge_overlap
+from .db import get_conn
+from .splitter import Chunk, normalize_city, token_len
+from ..core.config import settings
+from ..core.metrics import register_cache, timed
+from ..core.shared_cache import cache_for
+
+logger = logging.getLogger("app.rag.digests")
+
+DIGEST_SYSTEM = (
+    "You write compact travel-guide digests. Summarize the section for a traveler in at most "
+    "{words} words: keep concrete names (neighborhoods, lines, sights), drop filler. Plain prose, no headings."
+)
+SOURCE_TOKENS = 6000  # cap on section text sent for summarization
+
+# Section-level intents. A question qualifies only if it is, as a whole, one of these forms
+# optionally followed by the city ("getting around Rome?", "overview of Lisbon"); forms that
+# name {city} themselves need it. Anything more specific ("how much is a metro ticket?")
+# still goes through retrieval.
+SECTION_FORMS: List[Tuple[str, str]] = [
+    ("Overview", r"(an? )?(overview|introduction|intro)"),
+    ("Overview", r"(tell me about|what is|what's) {city}( like)?"),
+    ("History", r"(the )?history|(a )?brief history"),
+    ("Orientation", r"orientation|(the )?layout|(the )?lay of the land"),
+    ("Neighborhoods", r"(the )?(best |main )?(neighbou?rhoods|districts)|where to stay|best areas to stay"),
+    ("Climate", r"(the )?climate|(the )?best time to (visit|go)"),
+    ("Transportation", r"getting around|(how to )?get around|(the )?(public )?transport(ation)?"),
+    ("Things to See", r"(the )?(top |main )?(things to see|sights|sightseeing|landmarks)|must[- ]see( sights)?"),
+    ("Things to Do", r"(the )?(top )?(things to do|activities)|what to do"),
+    ("Practical information", r"practical (information|info|tips)"),
+]
+_LEAD = r"(?:(?:what are|what's|what is|show me|give me|tell me|list)(?: the)? )?"
+_CITY_TAIL = r"(?:\s+(?:in|of|to|for|around|about))?(?:\s+{city})?"
+
+# shared across workers (SHARED_CACHE_PATH), so the invalidation in refresh_digests reaches them all;
+# other workers' in-process fronts may serve the old entry for up to SHARED_CACHE_LOCAL_TTL_SECONDS
+_digest_cache = cache_for("section_digests", maxsize=2048, ttl=300)
+register_cache("section_digests", _digest_cache)
+
+
+def section_intent(question: str, city: str) -> Optional[str]:
+    """Template section a general question about `city` asks about, or None."""
+    q = " ".join(question.strip().rstrip("?.! ").split())
+    name = re.escape(" ".join(city.split()))
+    for section, form in SECTION_FORMS:
+        pattern = form.format(city=name) if "{city}" in form else f"(?:{form}){_CITY_TAIL.format(city=name)}"
+        if re.fullmatch(_LEAD + pattern, q, re.I):
+            return section
+    return None
+
+
+def get_digest(city: str, section: str) -> Optional[Dict[str, object]]:
+    key = (normalize_city(city), section)
+    hit = _digest_cache.get(key)
+    if hit is not None:
+        return hit or None
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT digest, tokens FROM section_digests WHERE city = %s AND section = %s "
+            "ORDER BY updated_at DESC LIMIT 1", key
+        ).fetchone()
+    value = {"section": section, "digest": row[0], "tokens": row[1]} if row else {}
+    _digest_cache.set(key, value)  # negative results are cached too
+    return value or None
+
+
+def _section_hash(hashes: Sequence[str]) -> str:
+    return hashlib.sha256("".join(hashes).encode()).hexdigest()
+
+
+@timed("digest_section")
+def summarize_section(city: str, section: str, text: str) -> str:
+    words = settings.DIGEST_MAX_WORDS
+    return complete(
+        DIGEST_SYSTEM.format(words=words),
+        f"City: {city}\nSection: {section}\n\n{text}",
+        max_output_tokens=words * 2,
+    )
+
+
+def refresh_digests(doc_id: int, city: str, chunks: List[Chunk], hashes: List[str]) -> Dict[str, int]:
+    """
+    Rebuild the digests of sections whose chunks changed since the last build,
+    drop digests of sections that disappeared. A failed summary leaves the old
+    digest and hash in place, so the next ingest retries it.
+    """
+    by_section: Dict[str, List[Tuple[Chunk, str]]] = {}
+    for c, h in zip(chunks, hashes):
+        by_section.setdefault(c[0], []).append((c, h))
+
+    with get_conn() as conn:
+        stored = dict(conn.execute(
+            "SELECT section, source_hash FROM section_digests WHERE doc_id = %s", (doc_id,)
+        ).fetchall())
+        gone = [s for s in stored if s not in by_section]
+        if gone:
+            conn.execute("DELETE FROM section_digests WHERE doc_id = %s AND section = ANY(%s)", (doc_id, gone))
+
+    built = failed = 0
+    for section, items in by_section.items():
+        source_hash = _section_hash([h for _, h in sorted(items, key=lambda it: it[0][1])])
+        if stored.get(section) == source_hash:
+            continue
+        text, used = "", 0
+        for (_s, _idx, content, tokens), _h in sorted(items, key=lambda it: it[0][1]):
+            if used + tokens > SOURCE_TOKENS:
+                break
+            text = merge_overlap(text, content) if text else content
+            used += tokens
+        try:
+            digest = summarize_section(city, section, text)
+        except Exception:
+            logger.warning("digest for %s/%s failed", city, section, exc_info=True)
+            failed += 1
+            continue
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO section_digests (city, section, doc_id, digest, tokens, source_hash, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, now())
+                ON CONFLICT (doc_id, section) DO UPDATE SET
+                    city = EXCLUDED.city, digest = EXCLUDED.digest, tokens = EXCLUDED.tokens,
+                    source_hash = EXCLUDED.source_hash, updated_at = now()
+                """,
+                (city, section, doc_id, digest, token_len(digest), source_hash),
+            )
+        _digest_cache.pop((city, section))
+        built += 1
+    for section in gone:
+        _digest_cache.pop((city, section))
+    return {"digests_built": built, "digests_failed": failed, "digests_removed": len(gone)}
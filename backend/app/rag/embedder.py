@@ -1,18 +1,76 @@
-import json, requests
-from tenacity import retry, wait_exponential, stop_after_attempt
+import json
+import threading
+from typing import Dict, Optional, Tuple
 from ..core.config import settings
+from ..core.metrics import register_cache, timed, record_tokens
+from ..core.shared_cache import cache_for
+from ..core.upstream import OPENAI
+from .batcher import MicroBatcher
 
-OPENAI_BASE = "https://api.openai.com/v1"
-EMBED_MODEL = "text-embedding-3-small"  # 1536-dim
+OPENAI_BASE = settings.OPENAI_BASE
+EMBED_MODEL = settings.EMBED_MODEL  # default; a finished migration (app/rag/reembed.py) overrides it
 
-@retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(6))
-def embed_texts(texts: list[str]) -> list[list[float]]:
+@timed("embed_texts")
+def embed_texts(texts: list[str], model: Optional[str] = None, dims: Optional[int] = None,
+                bulk: bool = False, deadline: Optional[float] = None) -> list[list[float]]:
+    """
+    `dims` asks a text-embedding-3 model for shortened vectors (chunks.embedding is VECTOR(1536)).
+    `bulk` batches (ingest, re-embedding, cache priming) are tracked apart from query embeddings and never hedged.
+    `deadline` is passed to the upstream call (absolute `time.monotonic()`).
+    """
+    model = model or EMBED_MODEL
     headers = {
         "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
         "Content-Type": "application/json",
     }
-    payload = {"model": EMBED_MODEL, "input": texts}
-    r = requests.post(f"{OPENAI_BASE}/embeddings", headers=headers, data=json.dumps(payload), timeout=60)
+    payload = {"model": model, "input": texts}
+    if dims:
+        payload["dimensions"] = dims
+    # query embeddings are idempotent and cheap: retried within budget and hedged past the observed p95
+    r = OPENAI.request("POST", f"{OPENAI_BASE}/embeddings", op="embeddings_bulk" if bulk else "embeddings",
+                       deadline=deadline, headers=headers, content=json.dumps(payload), hedge=not bulk)
     r.raise_for_status()
     data = r.json()
+    record_tokens("openai", model, prompt=(data.get("usage") or {}).get("prompt_tokens"))
     return [d["embedding"] for d in data["data"]]
+
+
+# Single query embeddings from concurrent requests share one upstream call (one batcher per model)
+_query_batchers: Dict[Tuple[str, Optional[int]], MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def _batcher(model: str, dims: Optional[int]) -> MicroBatcher:
+    b = _query_batchers.get((model, dims))
+    if b is None:
+        with _batchers_lock:
+            b = _query_batchers.setdefault((model, dims), MicroBatcher(
+                "embed_query", lambda texts, deadline: embed_texts(texts, model, dims, deadline=deadline),
+                window=settings.EMBED_BATCH_WINDOW_MS / 1000, max_batch=settings.EMBED_BATCH_MAX,
+            ))
+    return b
+
+
+_query_cache = cache_for("query_embeddings", maxsize=settings.EMBED_CACHE_SIZE, ttl=settings.EMBED_CACHE_TTL_SECONDS)
+register_cache("query_embeddings", _query_cache)
+
+
+def embed_query(text: str, model: Optional[str] = None, dims: Optional[int] = None) -> list[float]:
+    model = model or EMBED_MODEL
+    key = (model, dims, text.strip())
+    vec = _query_cache.get(key)
+    if vec is None:
+        vec = _batcher(model, dims).submit(text)
+        _query_cache.set(key, vec)
+    return vec
+
+
+def prime_queries(texts: list[str], model: Optional[str] = None, dims: Optional[int] = None) -> int:
+    """Embed the texts not already cached (in EMBED_BATCH_MAX batches); returns how many were embedded."""
+    model = model or EMBED_MODEL
+    missing = list(dict.fromkeys(t.strip() for t in texts if _query_cache.get((model, dims, t.strip())) is None))
+    for i in range(0, len(missing), settings.EMBED_BATCH_MAX):
+        batch = missing[i:i + settings.EMBED_BATCH_MAX]
+        for t, vec in zip(batch, embed_texts(batch, model, dims, bulk=True)):
+            _query_cache.set((model, dims, t), vec)
+    return len(missing)
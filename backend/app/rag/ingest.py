@@ -1,33 +1,110 @@
+import hashlib
 import os
+from collections import defaultdict
 from pathlib import Path
+from typing import Callable, Dict, List, Tuple
 from .db import get_conn
+from .catalogue import city_catalogue
 from .splitter import section_aware_split
 from .embedder import embed_texts
-import tiktoken
-
-enc = tiktoken.get_encoding("cl100k_base")
+from .compact import short_vector
+from .reembed import SHADOW, serving
+from .digests import refresh_digests
+from ..core.config import settings
 
 DATA_DIR = Path(__file__).parent / "data"  # ./rag/data/
 
-def token_len(t: str) -> int:
-    return len(enc.encode(t))
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _no_progress(stage: str) -> None:
+    pass
+
 
-def ingest_pdf(pdf_path: str):
-    """Ingest a single PDF file into the pgvector database."""
+def ingest_pdf(pdf_path: str, progress: Callable[[str], None] = _no_progress):
+    """
+    Ingest (or re-ingest) a single PDF file into the pgvector database.
+
+    Documents are keyed by normalized city + title, chunks by a hash of their
+    content: unchanged chunks keep their row and embedding, only new or edited
+    chunks are embedded, and chunks missing from the new version are deleted,
+    all in one transaction. Section digests are then rebuilt for sections whose
+    chunks changed. `progress` is called with "split", "write", "embed" and "digest".
+    """
+    progress("split")
     city, title, chunks = section_aware_split(pdf_path)
+    title = " ".join(title.split())
+    hashes = [content_hash(c[2]) for c in chunks]
+
+    progress("write")
     with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("INSERT INTO documents (city, title) VALUES (%s, %s) RETURNING id;", (city, title))
+        # upsert locks the document row, so concurrent re-ingests of one guide serialize here
+        cur.execute("""
+            INSERT INTO documents (city, title) VALUES (%s, %s)
+            ON CONFLICT (city, lower(title)) DO UPDATE SET title = EXCLUDED.title
+            RETURNING id;
+        """, (city, title))
         doc_id = cur.fetchone()[0]
 
-        contents = [c[2] for c in chunks]
-        embeddings = embed_texts(contents)
+        cur.execute("SELECT id, content_hash, section, chunk_idx FROM chunks WHERE doc_id = %s", (doc_id,))
+        existing: Dict[str, List[Tuple[int, str, int]]] = defaultdict(list)
+        for row_id, h, section, idx in cur.fetchall():
+            existing[h].append((row_id, section, idx))
+
+        moved, fresh = [], []
+        for chunk, h in zip(chunks, hashes):
+            section, idx, content, tokens = chunk
+            if existing.get(h):
+                row_id, old_section, old_idx = existing[h].pop(0)
+                if (old_section, old_idx) != (section, idx):
+                    moved.append((section, idx, row_id))
+            else:
+                fresh.append((chunk, h))
+        removed = [row_id for rows in existing.values() for row_id, _, _ in rows]
 
-        for (section, idx, content), emb in zip(chunks, embeddings):
-            cur.execute("""
-                INSERT INTO chunks (doc_id, city, section, chunk_idx, content, tokens, embedding)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (doc_id, city, section, idx, content, token_len(content), emb))
-    return {"doc_id": doc_id, "city": city, "title": title, "chunks": len(chunks)}
+        if removed:
+            cur.execute("DELETE FROM chunks WHERE id = ANY(%s)", (removed,))
+        if moved:
+            cur.executemany("UPDATE chunks SET section = %s, chunk_idx = %s WHERE id = %s", moved)
+        if fresh:
+            progress("embed")
+            texts = [c[2] for c, _ in fresh]
+            srv = serving()
+            # the live column stays in the old model's space until a migration is finalized
+            embeddings = embed_texts(texts, *srv.live, bulk=True)
+            compact = settings.EMBED_COMPACT_MODE == "halfvec"
+            cur.executemany("""
+                INSERT INTO chunks (doc_id, city, section, chunk_idx, content, content_hash, tokens,
+                                    embedding, embedding_short)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """, [
+                (doc_id, city, section, idx, content, h, tokens, emb, short_vector(emb) if compact else None)
+                for ((section, idx, content, tokens), h), emb in zip(fresh, embeddings)
+            ], returning=True)
+            m = srv.migration
+            if m is not None:
+                # an embedding-model migration is running: give the new chunks their new-model vector too
+                ids = []
+                while True:
+                    ids.append(cur.fetchone()[0])
+                    if not cur.nextset():
+                        break
+                same = (m.model, m.dims) == srv.live
+                shadow = embeddings if same else embed_texts(texts, m.model, m.dims, bulk=True)
+                cur.executemany(f"INSERT INTO {SHADOW} (chunk_id, embedding) VALUES (%s, %s)",
+                                list(zip(ids, shadow)))
+    city_catalogue.add(city, title)
+    res = {
+        "doc_id": doc_id, "city": city, "title": title, "chunks": len(chunks),
+        "reused": len(chunks) - len(fresh), "added": len(fresh), "removed": len(removed),
+    }
+    if settings.DIGESTS_ENABLED:
+        # after the commit: LLM calls must not hold the document lock
+        progress("digest")
+        res.update(refresh_digests(doc_id, city, chunks, hashes))
+    return res
 
 
 def ingest_all_pdfs(data_dir: Path = DATA_DIR):
@@ -44,7 +121,8 @@ def ingest_all_pdfs(data_dir: Path = DATA_DIR):
         try:
             res = ingest_pdf(str(pdf))
             summary.append(res)
-            print(f"   ✅ {res['city']} ({res['chunks']} chunks)")
+            print(f"   ✅ {res['city']} ({res['chunks']} chunks: {res['added']} new, "
+                  f"{res['reused']} reused, {res['removed']} removed)")
         except Exception as e:
             print(f"   ❌ Failed: {pdf.name} → {e}")
 
@@ -0,0 +1,215 @@
+"""
+In-process background queue for PDF ingestion.
+
+Uploads are streamed to a unique temp file and enqueued; INGEST_WORKERS
+coroutines pull jobs and run `ingest_pdf` in the threadpool, so at most that
+many guides are parsed/embedded at once.
+
+Each state change is written through to the `ingest_jobs` table so any
+uvicorn worker can answer a status poll; the process that owns a job also
+keeps it in a TTLCache. Finished rows are pruned after INGEST_JOB_TTL_SECONDS.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import UploadFile
+from psycopg.types.json import Jsonb
+from starlette.concurrency import run_in_threadpool
+
+from ..core import metrics
+from ..core.cache import TTLCache
+from ..core.config import settings
+from .db import get_conn
+from .ingest import ingest_pdf
+
+logger = logging.getLogger("app.rag.jobs")
+
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+INGEST_JOBS = metrics.Counter("ingest_jobs_total", "Finished ingest jobs by outcome")
+QUEUE_WAIT_SECONDS = metrics.Histogram("ingest_queue_wait_seconds", "Time ingest jobs spent queued")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class IngestJob:
+    id: str
+    filename: str
+    path: str
+    status: str = "queued"  # queued | running | done | failed
+    stage: Optional[str] = None  # split | write | embed | digest while running
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def public(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out.pop("path")
+        return out
+
+
+async def save_upload(file: UploadFile, max_bytes: int) -> str:
+    """Stream an upload to a unique temp file in fixed-size chunks; returns its path."""
+    fd, path = tempfile.mkstemp(prefix="ingest-", suffix=".pdf", dir=settings.INGEST_TMP_DIR)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(file.filename)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        _remove(path)
+        raise
+    return path
+
+
+def _persist(job: IngestJob) -> None:
+    try:
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO ingest_jobs (id, filename, status, stage, result, error, created_at, started_at, finished_at)
+                VALUES (%(id)s, %(filename)s, %(status)s, %(stage)s, %(result)s, %(error)s,
+                        to_timestamp(%(created_at)s), to_timestamp(%(started_at)s), to_timestamp(%(finished_at)s))
+                ON CONFLICT (id) DO UPDATE SET
+                    status = EXCLUDED.status, stage = EXCLUDED.stage, result = EXCLUDED.result,
+                    error = EXCLUDED.error, started_at = EXCLUDED.started_at, finished_at = EXCLUDED.finished_at
+                """,
+                {**asdict(job), "result": Jsonb(job.result) if job.result is not None else None},
+            )
+    except Exception:  # status reporting must never fail the ingest itself
+        logger.warning("could not persist ingest job %s", job.id, exc_info=True)
+
+
+def _load(job_id: str) -> Optional[Dict[str, Any]]:
+    with get_conn() as conn:
+        cur = conn.execute(
+            """
+            SELECT id, filename, status, stage, result, error, extract(epoch FROM created_at),
+                   extract(epoch FROM started_at), extract(epoch FROM finished_at)
+            FROM ingest_jobs WHERE id = %s
+            """,
+            (job_id,),
+        )
+        row = cur.fetchone()
+    if row is None:
+        return None
+    keys = ("id", "filename", "status", "stage", "result", "error", "created_at", "started_at", "finished_at")
+    return {k: float(v) if k.endswith("_at") and v is not None else v for k, v in zip(keys, row)}
+
+
+def _prune(ttl: float) -> None:
+    try:
+        with get_conn() as conn:
+            conn.execute("DELETE FROM ingest_jobs WHERE finished_at < now() - make_interval(secs => %s)", (ttl,))
+    except Exception:
+        logger.warning("could not prune ingest jobs", exc_info=True)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class IngestQueue:
+    def __init__(self, workers: int, maxsize: int, job_ttl: float):
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self._queue: "asyncio.Queue[IngestJob]" = asyncio.Queue(maxsize)
+        self._jobs = TTLCache(maxsize=10_000, ttl=job_ttl)
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while not self._queue.empty():
+            _remove(self._queue.get_nowait().path)
+
+    async def submit(self, filename: str, path: str) -> IngestJob:
+        if self._queue.full():
+            raise QueueFull(filename)
+        job = IngestJob(id=uuid.uuid4().hex, filename=filename, path=path)
+        # queued jobs never expire; the TTL starts counting once they finish
+        self._jobs.set(job.id, job, ttl=float("inf"))
+        await run_in_threadpool(_persist, job)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:  # filled up while the row was being written
+            job.status, job.error, job.finished_at = "failed", "queue full", time.time()
+            self._jobs.set(job.id, job)
+            await run_in_threadpool(_persist, job)
+            raise QueueFull(filename)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.public()
+        return await run_in_threadpool(_load, job_id)  # owned by another worker process, or expired here
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "workers": len(self._tasks)}
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status, job.started_at = "running", time.time()
+            QUEUE_WAIT_SECONDS.observe(job.started_at - job.created_at)
+
+            def progress(stage: str, job=job) -> None:
+                job.stage = stage
+                _persist(job)
+
+            try:
+                job.result = await run_in_threadpool(ingest_pdf, job.path, progress)
+                job.status = "done"
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "cancelled at shutdown"
+                raise
+            except Exception as e:  # keep the worker alive; surface the failure on the job
+                logger.exception("ingest job %s (%s) failed", job.id, job.filename)
+                job.status, job.error = "failed", str(e) or type(e).__name__
+            finally:
+                job.stage, job.finished_at = None, time.time()
+                _remove(job.path)
+                self._jobs.set(job.id, job)
+                await run_in_threadpool(_persist, job)
+                await run_in_threadpool(_prune, self.job_ttl)
+                INGEST_JOBS.inc(status=job.status)
+                self._queue.task_done()
+
+
+ingest_queue = IngestQueue(
+    workers=settings.INGEST_WORKERS,
+    maxsize=settings.INGEST_QUEUE_SIZE,
+    job_ttl=settings.INGEST_JOB_TTL_SECONDS,
+)
+metrics.GaugeCallback(
+    "ingest_queue_jobs", "Queued ingest jobs and running workers",
+    lambda: [({"state": k}, v) for k, v in ingest_queue.stats().items()],
+)
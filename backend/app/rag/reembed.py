@@ -0,0 +1,390 @@
+"""
+Switching the embedding model without re-ingesting or taking search down.
+
+A migration (row in `embedding_migrations`) moves through:
+
+    backfill -> ready -> cutover -> done        (or -> aborted at any point)
+
+- backfill: `run` embeds every chunk with the new model into the shadow table
+  `chunk_embeddings_next`, in id order, throttled to a token rate, recording
+  the last chunk id after each batch so an interrupted run resumes where it
+  stopped. Ingest writes new chunks into both the live column and the shadow
+  table while a migration is active. Once every chunk has a shadow vector the
+  shadow HNSW index is built and the migration becomes `ready`.
+- ready: search still serves the old model; a sample of searches
+  (EMBED_DUAL_READ_RATE) is repeated in the background on the shadow vectors
+  with the new model and compared (overlap of the top chunks, latency).
+- cutover: search embeds queries with the new model and reads the shadow
+  vectors; the sampled dual reads now run against the old model. The live
+  column keeps old-model vectors (ingest writes both models), so `abort`
+  is still safe here.
+- done: `finalize` copies the shadow vectors (and their halfvec prefix) into
+  chunks.embedding in one transaction; search reads the live column again.
+  One poll later it copies again for chunks ingested by workers that had not
+  seen the new state yet.
+
+Workers re-read the state every EMBED_MIGRATION_POLL_SECONDS. Each state
+names its query model and vector source together, so a worker that is a
+poll behind still pairs matching queries and vectors.
+
+    python -m app.rag.reembed start --model text-embedding-3-large
+    python -m app.rag.reembed run --tokens-per-minute 500000
+    python -m app.rag.reembed status
+    python -m app.rag.reembed cutover
+    python -m app.rag.reembed finalize
+    python -m app.rag.reembed cleanup        # empty the shadow table afterwards
+
+Vectors must fit chunks.embedding (VECTOR(1536)); text-embedding-3 models are
+asked for 1536 dimensions.
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import psycopg
+from pgvector import Vector
+
+from .db import get_conn
+from .embedder import embed_query, embed_texts
+from ..core import metrics
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.db import sync_dsn
+
+SHADOW = "chunk_embeddings_next"
+ACTIVE = ("backfill", "ready", "cutover")
+VECTOR_DIMS = 1536  # chunks.embedding / chunk_embeddings_next.embedding
+
+DUAL_READ_OVERLAP = metrics.Histogram(
+    "embed_dual_read_overlap", "Share of the served top chunks also returned by the other embedding model",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+DUAL_READ_SECONDS = metrics.Histogram("embed_dual_read_seconds", "Vector search latency per side of a dual read")
+
+
+@dataclass(frozen=True)
+class Migration:
+    id: int
+    model: str
+    dims: int
+    status: str
+    last_chunk_id: int
+    embedded: int
+
+
+@dataclass(frozen=True)
+class Serving:
+    model: str
+    dims: Optional[int]
+    shadow: bool                               # read vectors from chunk_embeddings_next
+    migration: Optional[Migration] = None      # one in progress, if any
+    previous: Optional[Tuple[str, Optional[int]]] = None  # model served before a cutover
+
+    @property
+    def live(self) -> Tuple[str, Optional[int]]:
+        """Model whose vectors chunks.embedding holds; the new one only once finalized."""
+        return self.previous if self.shadow and self.previous else (self.model, self.dims)
+
+    def other(self) -> Optional[Tuple[str, Optional[int], bool]]:
+        """(model, dims, shadow) a dual read compares against, or None."""
+        m = self.migration
+        if m is None:
+            return None
+        if m.status == "ready":
+            return m.model, m.dims, True
+        if m.status == "cutover" and self.previous:
+            return self.previous[0], self.previous[1], False
+        return None
+
+
+_COLUMNS = "id, model, dims, status, last_chunk_id, embedded"
+_serving_cache = TTLCache(maxsize=1, ttl=settings.EMBED_MIGRATION_POLL_SECONDS)
+
+
+def _resolve(rows: Sequence[Migration]) -> Serving:
+    base: Tuple[str, Optional[int]] = (settings.EMBED_MODEL, None)
+    for m in rows:
+        if m.status == "done":
+            base = (m.model, m.dims)
+    latest = rows[-1] if rows else None
+    if latest is None or latest.status not in ACTIVE:
+        return Serving(base[0], base[1], shadow=False)
+    if latest.status == "cutover":
+        return Serving(latest.model, latest.dims, shadow=True, migration=latest, previous=base)
+    return Serving(base[0], base[1], shadow=False, migration=latest)
+
+
+def serving() -> Serving:
+    """Model and vector source searches use right now (cached for EMBED_MIGRATION_POLL_SECONDS)."""
+    hit = _serving_cache.get("serving")
+    if hit is not None:
+        return hit
+    try:
+        with get_conn() as conn:
+            rows = [Migration(*r) for r in conn.execute(
+                f"SELECT {_COLUMNS} FROM embedding_migrations WHERE status <> 'aborted' ORDER BY id"
+            ).fetchall()]
+    except psycopg.errors.UndefinedTable:
+        rows = []  # migrations/006 not applied yet
+    value = _resolve(rows)
+    _serving_cache.set("serving", value)
+    return value
+
+
+# ---- dual reads
+
+_dual_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dual-read")
+_dual_lock = threading.Lock()
+_dual_stats: Dict[str, float] = {"n": 0, "overlap_sum": 0.0, "served_s": 0.0, "other_s": 0.0}
+
+Search = Callable[[Vector, bool], List[tuple]]
+
+
+def maybe_dual_read(srv: Serving, query: str, served: List[tuple], served_s: float, search: Search) -> None:
+    """With probability EMBED_DUAL_READ_RATE, repeat a search on the other model in the background."""
+    other = srv.other()
+    if other is None or not served or random.random() >= settings.EMBED_DUAL_READ_RATE:
+        return
+    _dual_pool.submit(_dual_read, other, query, [r[0] for r in served], served_s, search)
+
+
+def _dual_read(other, query: str, served_ids: List[int], served_s: float, search: Search) -> None:
+    model, dims, shadow = other
+    try:
+        qvec = Vector(embed_query(query, model, dims))
+        t0 = time.perf_counter()
+        rows = search(qvec, shadow)
+        other_s = time.perf_counter() - t0
+    except Exception:
+        return  # diagnostics only
+    overlap = len(set(served_ids) & {r[0] for r in rows[:len(served_ids)]}) / len(served_ids)
+    DUAL_READ_OVERLAP.observe(overlap, model=model)
+    DUAL_READ_SECONDS.observe(served_s, side="served")
+    DUAL_READ_SECONDS.observe(other_s, side="other")
+    with _dual_lock:
+        _dual_stats["n"] += 1
+        _dual_stats["overlap_sum"] += overlap
+        _dual_stats["served_s"] += served_s
+        _dual_stats["other_s"] += other_s
+
+
+def stats() -> Dict[str, object]:
+    srv = _serving_cache.get("serving")
+    with _dual_lock:
+        n = _dual_stats["n"]
+        dual = {
+            "samples": int(n),
+            "mean_overlap": round(_dual_stats["overlap_sum"] / n, 3) if n else None,
+            "served_ms_mean": round(_dual_stats["served_s"] / n * 1000, 1) if n else None,
+            "other_ms_mean": round(_dual_stats["other_s"] / n * 1000, 1) if n else None,
+        }
+    out: Dict[str, object] = {"dual_reads": dual}
+    if srv is not None:
+        out.update({"model": srv.model, "shadow": srv.shadow,
+                    "migration": srv.migration.status if srv.migration else None})
+    return out
+
+
+# ---- the job
+
+def _latest() -> Optional[Migration]:
+    with get_conn() as conn:
+        row = conn.execute(f"SELECT {_COLUMNS} FROM embedding_migrations ORDER BY id DESC LIMIT 1").fetchone()
+    return Migration(*row) if row else None
+
+
+def _require(*statuses: str) -> Migration:
+    m = _latest()
+    if m is None or m.status not in statuses:
+        raise SystemExit(f"no migration in state {'/'.join(statuses)} (latest: {m.status if m else 'none'})")
+    return m
+
+
+def _set_status(m: Migration, status: str) -> None:
+    with get_conn() as conn:
+        conn.execute("UPDATE embedding_migrations SET status = %s, updated_at = now() WHERE id = %s", (status, m.id))
+    _serving_cache.clear()
+
+
+class _Throttle:
+    """Keeps the average embedding rate under `tokens_per_minute`."""
+
+    def __init__(self, tokens_per_minute: float):
+        self.rate = tokens_per_minute / 60
+        self.t0 = time.monotonic()
+        self.tokens = 0
+
+    def spent(self, tokens: int) -> None:
+        self.tokens += tokens
+        if self.rate > 0:
+            ahead = self.tokens / self.rate - (time.monotonic() - self.t0)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def _embed_into_shadow(m: Migration, rows: List[tuple], throttle: _Throttle, advance: bool) -> None:
+    """rows: (id, content, tokens); writes their new-model vectors and, if `advance`, the resume point."""
+    vectors = embed_texts([r[1] for r in rows], m.model, m.dims, bulk=True)
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.executemany(
+            f"INSERT INTO {SHADOW} (chunk_id, embedding) VALUES (%s, %s) "
+            "ON CONFLICT (chunk_id) DO UPDATE SET embedding = EXCLUDED.embedding",
+            [(r[0], Vector(v)) for r, v in zip(rows, vectors)],
+        )
+        cur.execute(
+            "UPDATE embedding_migrations SET embedded = embedded + %s, updated_at = now(),"
+            " last_chunk_id = CASE WHEN %s THEN %s ELSE last_chunk_id END WHERE id = %s",
+            (len(rows), advance, rows[-1][0], m.id),
+        )
+    throttle.spent(sum(r[2] or len(r[1]) // 4 for r in rows))
+
+
+def _fill_gaps(m: Migration, batch: int, throttle: _Throttle) -> int:
+    """Embed chunks that have no shadow vector yet (ingested since the backfill passed them)."""
+    done = 0
+    while True:
+        with get_conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT c.id, c.content, c.tokens FROM chunks c
+                LEFT JOIN {SHADOW} n ON n.chunk_id = c.id
+                WHERE n.chunk_id IS NULL
+                ORDER BY c.id LIMIT %s
+                """,
+                (batch,),
+            ).fetchall()
+        if not rows:
+            return done
+        _embed_into_shadow(m, rows, throttle, advance=False)
+        done += len(rows)
+
+
+def start(model: str, dims: int = VECTOR_DIMS) -> Migration:
+    if dims != VECTOR_DIMS:
+        raise SystemExit(f"chunks.embedding is VECTOR({VECTOR_DIMS}); --dims must be {VECTOR_DIMS}")
+    m = _latest()
+    if m is not None and m.status in ACTIVE:
+        raise SystemExit(f"migration {m.id} to {m.model} is already {m.status}")
+    with get_conn() as conn:
+        conn.execute(f"TRUNCATE {SHADOW}")
+        row = conn.execute(
+            f"INSERT INTO embedding_migrations (model, dims, status) VALUES (%s, %s, 'backfill') RETURNING {_COLUMNS}",
+            (model, dims),
+        ).fetchone()
+    _serving_cache.clear()
+    return Migration(*row)
+
+
+def run(batch: int = 256, tokens_per_minute: float = 500_000) -> Migration:
+    """Backfill (resumable), fill gaps, build the shadow index, mark the migration ready."""
+    m = _require("backfill")
+    throttle = _Throttle(tokens_per_minute)
+    last_id = m.last_chunk_id
+    while True:
+        with get_conn() as conn:
+            rows = conn.execute(
+                "SELECT id, content, tokens FROM chunks WHERE id > %s ORDER BY id LIMIT %s", (last_id, batch)
+            ).fetchall()
+        if not rows:
+            break
+        _embed_into_shadow(m, rows, throttle, advance=True)
+        last_id = rows[-1][0]
+        print(f"  embedded up to chunk {last_id}")
+    gaps = _fill_gaps(m, batch, throttle)
+    if gaps:
+        print(f"  filled {gaps} chunks ingested during the backfill")
+    # building HNSW after the bulk load is much faster than maintaining it row by row
+    with psycopg.connect(sync_dsn(), autocommit=True) as conn:
+        conn.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{SHADOW}_hnsw "
+            f"ON {SHADOW} USING hnsw (embedding vector_cosine_ops)"
+        )
+        conn.execute(f"ANALYZE {SHADOW}")
+    _set_status(m, "ready")
+    return _require("ready")
+
+
+def cutover(batch: int = 256) -> None:
+    m = _require("ready")
+    _fill_gaps(m, batch, _Throttle(0))
+    _set_status(m, "cutover")
+    # chunks written by workers that hadn't seen the new state yet
+    time.sleep(settings.EMBED_MIGRATION_POLL_SECONDS)
+    _fill_gaps(m, batch, _Throttle(0))
+
+
+_COPY_SHADOW = f"""
+    UPDATE chunks c
+    SET embedding = n.embedding,
+        embedding_short = l2_normalize(subvector(n.embedding, 1, %s))::halfvec
+    FROM {SHADOW} n
+    WHERE c.id = n.chunk_id AND c.embedding IS DISTINCT FROM n.embedding
+"""
+
+
+def finalize(batch: int = 256) -> None:
+    m = _require("cutover")
+    _fill_gaps(m, batch, _Throttle(0))
+    with get_conn() as conn:
+        conn.execute(_COPY_SHADOW, (settings.EMBED_COMPACT_DIMS,))
+        conn.execute("UPDATE embedding_migrations SET status = 'done', updated_at = now() WHERE id = %s", (m.id,))
+    _serving_cache.clear()
+    # workers still on `cutover` write old-model vectors to the live column (and new ones to the shadow table)
+    time.sleep(settings.EMBED_MIGRATION_POLL_SECONDS)
+    with get_conn() as conn:
+        conn.execute(_COPY_SHADOW, (settings.EMBED_COMPACT_DIMS,))
+
+
+def abort() -> None:
+    m = _require(*ACTIVE)
+    _set_status(m, "aborted")
+    print(f"migration {m.id} aborted; run `cleanup` once workers have picked it up")
+
+
+def cleanup() -> None:
+    m = _latest()
+    if m is not None and m.status in ACTIVE:
+        raise SystemExit(f"migration {m.id} is {m.status}; finalize or abort it first")
+    with get_conn() as conn:
+        conn.execute(f"TRUNCATE {SHADOW}")
+
+
+def status() -> Dict[str, object]:
+    m = _latest()
+    with get_conn() as conn:
+        chunks = conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+        shadow = conn.execute(f"SELECT count(*) FROM {SHADOW}").fetchone()[0]
+    return {"migration": m.__dict__ if m else None, "chunks": chunks, "shadow_vectors": shadow,
+            "serving": serving().model}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("start")
+    p.add_argument("--model", required=True)
+    p.add_argument("--dims", type=int, default=VECTOR_DIMS)
+    p = sub.add_parser("run")
+    p.add_argument("--batch", type=int, default=256)
+    p.add_argument("--tokens-per-minute", type=float, default=500_000)
+    for name in ("status", "cutover", "finalize", "abort", "cleanup"):
+        sub.add_parser(name)
+    args = ap.parse_args()
+
+    if args.cmd == "start":
+        print(start(args.model, args.dims))
+    elif args.cmd == "run":
+        print(run(args.batch, args.tokens_per_minute))
+    elif args.cmd == "status":
+        print(status())
+    else:
+        globals()[args.cmd]()
+        print(f"{args.cmd}: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,88 @@
-from typing import List, Tuple, Optional
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 from pgvector import Vector
 from .db import get_conn
-from .embedder import embed_texts
+from .embedder import embed_query
 from .splitter import normalize_city
+from .compact import MODES, first_stage_sql, short_vector, tune_first_stage
+from .reembed import SHADOW, maybe_dual_read, serving
+from ..core.config import settings
+from ..core.metrics import timed
 
-Row = Tuple[int, str, str, int, str, float]  # id, city, section, chunk_idx, content, distance
+Row = Tuple[int, str, str, int, str, int, Optional[int], float]  # id, city, section, chunk_idx, content, doc_id, tokens, distance
 
-def _pg_search(query_vec, city: Optional[str], top_n=12) -> List[Row]:
-    sql = """
-    SELECT id, city, section, chunk_idx, content,
-           (embedding <=> %s::vector) AS distance
-    FROM chunks
-    {where}
-    ORDER BY embedding <=> %s::vector
-    LIMIT %s;
+# During an embedding-model cutover the vectors come from the shadow table (app/rag/reembed.py)
+_SHADOW_SOURCE = f"""(
+            SELECT c.id, c.city, c.section, c.chunk_idx, c.content, c.doc_id, c.tokens, n.embedding
+            FROM chunks c JOIN {SHADOW} n ON n.chunk_id = c.id
+        ) chunks"""
+
+
+def _search_sql(mode: str, where: str, shadow: bool = False) -> str:
+    """Nearest-chunk query for one filter; compact modes shortlist first and re-rank on the full vector."""
+    if mode == "off":
+        return f"""
+        SELECT id, city, section, chunk_idx, content, doc_id, tokens,
+               (embedding <=> %(q)s::vector) AS distance
+        FROM {_SHADOW_SOURCE if shadow else "chunks"}
+        {where}
+        ORDER BY embedding <=> %(q)s::vector
+        LIMIT %(top_n)s
+        """
+    return f"""
+        SELECT id, city, section, chunk_idx, content, doc_id, tokens,
+               (embedding <=> %(q)s::vector) AS distance
+        FROM (
+            SELECT id, city, section, chunk_idx, content, doc_id, tokens, embedding
+            FROM chunks
+            {where}
+            ORDER BY {first_stage_sql(mode)}
+            LIMIT %(shortlist)s
+        ) shortlist
+        ORDER BY distance
+        LIMIT %(top_n)s
+        """
+
+
+@timed("pg_search")
+def _pg_search(query_vec, city: Optional[str], top_n=12, mode: Optional[str] = None,
+               cities: Optional[Sequence[str]] = None, shadow: bool = False) -> List[Row]:
     """
-    where = "WHERE city = %s" if city else ""
+    Nearest chunks by cosine distance. With a compact mode, a shortlist is taken
+    from the compact index first and re-ranked on the full-precision embedding.
+    With `cities`, the top_n per city come back from one statement (LATERAL per city).
+    `shadow` searches the next model's vectors (full vectors; the compact columns still hold the old model).
+    """
+    mode = "off" if shadow else (mode or settings.EMBED_COMPACT_MODE)
+    if mode not in MODES:
+        raise ValueError(f"EMBED_COMPACT_MODE must be one of {MODES}, got {mode!r}")
+    params = {"q": query_vec, "top_n": top_n}
+    if mode != "off":
+        params["qs"] = short_vector(query_vec.to_list())
+        params["shortlist"] = max(settings.EMBED_SHORTLIST, top_n)
+
+    if cities:
+        params["cities"] = list(dict.fromkeys(normalize_city(c) for c in cities))
+        sql = f"""
+        SELECT hit.*
+        FROM unnest(%(cities)s::text[]) AS wanted(city)
+        CROSS JOIN LATERAL ({_search_sql(mode, "WHERE city = wanted.city", shadow)}) hit
+        ORDER BY hit.distance;
+        """
+    else:
+        params["city"] = normalize_city(city) if city else None
+        sql = _search_sql(mode, "WHERE city = %(city)s" if city else "", shadow) + ";"
     with get_conn() as conn, conn.cursor() as cur:
-        if city:
-            cur.execute(sql.format(where=where), (query_vec, normalize_city(city), query_vec, top_n))
-        else:
-            cur.execute(sql.format(where=where), (query_vec, query_vec, top_n))
+        if mode != "off":
+            tune_first_stage(conn, params["shortlist"], filtered=bool(city or cities))
+        cur.execute(sql, params)
         return cur.fetchall()
 
-def mmr(candidates: List[Row], k=4, lambda_mult=0.5) -> List[Row]:
-    if len(candidates) <= k:
+@timed("mmr")
+def mmr(candidates: List[Row], k=4, lambda_mult=0.5, reorder=False) -> List[Row]:
+    """Pick k rows trading relevance against section/neighbour overlap; `reorder` ranks even when all fit."""
+    k = min(k, len(candidates))
+    if len(candidates) <= k and not reorder:
         return candidates
     selected: List[Row] = []
     while len(selected) < k:
@@ -44,7 +102,24 @@ def mmr(candidates: List[Row], k=4, lambda_mult=0.5) -> List[Row]:
         selected.append(best)
     return selected
 
-def retrieve(query: str, city: Optional[str] = None, k=4) -> List[Row]:
-    qvec = Vector(embed_texts([query])[0])
-    cands = _pg_search(qvec, city, top_n=12)
-    return mmr(cands, k=k)
+def retrieve(query: str, city: Optional[str] = None, k=4, cities: Optional[Sequence[str]] = None,
+             k_total: Optional[int] = None) -> List[Row]:
+    """
+    Top-k diverse chunks for `query`. With `cities`, the query is embedded once,
+    k chunks are picked per city with MMR, then MMR over the union orders them
+    (and keeps `k_total` if given).
+    """
+    srv = serving()
+    qvec = Vector(embed_query(query, srv.model, srv.dims))
+    t0 = time.perf_counter()
+    cands = _pg_search(qvec, city, top_n=12, cities=cities, shadow=srv.shadow)
+    # during a model migration a sample of searches is replayed on the other model and compared
+    maybe_dual_read(srv, query, cands, time.perf_counter() - t0,
+                    lambda v, shadow: _pg_search(v, city, top_n=12, cities=cities, shadow=shadow))
+    if not cities:
+        return mmr(cands, k=k)
+    per_city: Dict[str, List[Row]] = {}
+    for row in cands:
+        per_city.setdefault(row[1], []).append(row)
+    picked = [r for rows in per_city.values() for r in mmr(rows, k=k)]
+    return mmr(picked, k=k_total or len(picked), reorder=True)
@@ -15,17 +15,72 @@ CREATE TABLE IF NOT EXISTS chunks (
   section      TEXT,
   chunk_idx    INT NOT NULL,
   content      TEXT NOT NULL,
+  content_hash TEXT,               -- sha256 of content; lets re-ingest reuse unchanged chunks
   tokens       INT,
-  embedding    VECTOR(1536)        -- matches text-embedding-3-small
+  embedding    VECTOR(1536),       -- matches text-embedding-3-small
+  embedding_short HALFVEC(512)     -- truncated + re-normalized copy (EMBED_COMPACT_MODE=halfvec)
 );
 
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS embedding_short HALFVEC(512);
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- A guide is identified by city + title; re-ingesting it updates it in place
+CREATE UNIQUE INDEX IF NOT EXISTS uq_documents_city_title ON documents(city, lower(title));
+
 CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id);
 CREATE INDEX IF NOT EXISTS idx_chunks_city ON chunks(city);
 
+-- One LLM-written digest per (city, section); source_hash covers the chunks it was built from
+CREATE TABLE IF NOT EXISTS section_digests (
+  city         TEXT NOT NULL,
+  section      TEXT NOT NULL,
+  doc_id       INT NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+  digest       TEXT NOT NULL,
+  tokens       INT NOT NULL,
+  source_hash  TEXT NOT NULL,
+  updated_at   TIMESTAMPTZ DEFAULT now(),
+  PRIMARY KEY (doc_id, section)
+);
+CREATE INDEX IF NOT EXISTS idx_section_digests_city ON section_digests (city, section, updated_at DESC);
+
+-- Background ingest jobs (app/rag/jobs.py); shared by all API workers
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+  id           TEXT PRIMARY KEY,
+  filename     TEXT NOT NULL,
+  status       TEXT NOT NULL,      -- queued | running | done | failed
+  stage        TEXT,
+  result       JSONB,
+  error        TEXT,
+  created_at   TIMESTAMPTZ NOT NULL,
+  started_at   TIMESTAMPTZ,
+  finished_at  TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_finished ON ingest_jobs(finished_at);
+
+-- Embedding-model migrations (app/rag/reembed.py): state plus shadow vectors for the next model
+CREATE TABLE IF NOT EXISTS embedding_migrations (
+  id            SERIAL PRIMARY KEY,
+  model         TEXT NOT NULL,
+  dims          INT NOT NULL,
+  status        TEXT NOT NULL,     -- backfill | ready | cutover | done | aborted
+  last_chunk_id BIGINT NOT NULL DEFAULT 0,
+  embedded      BIGINT NOT NULL DEFAULT 0,
+  started_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS chunk_embeddings_next (
+  chunk_id     BIGINT PRIMARY KEY REFERENCES chunks(id) ON DELETE CASCADE,
+  embedding    VECTOR(1536) NOT NULL
+);
+
 -- pgvector IVFFlat for cosine
 CREATE INDEX IF NOT EXISTS idx_chunks_embedding_ivfflat
 ON chunks
 USING ivfflat (embedding vector_cosine_ops)
 WITH (lists = 100);
 
+-- The compact modes' HNSW index is built only for the mode in use: python -m app.rag.compact
+
 ANALYZE chunks;
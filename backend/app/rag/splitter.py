@@ -1,6 +1,7 @@
-from pypdf import PdfReader
 import re
 from pathlib import Path
+from typing import Iterable, List, Tuple
+from ..core.lazy import Lazy
 
 TEMPLATE_SECTIONS = [
     "Overview", "History", "Orientation", "Neighborhoods",
@@ -8,44 +9,161 @@ TEMPLATE_SECTIONS = [
     "Practical information", "Practical Information"
 ]
 
+def _load_encoding():
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
+
+encoding = Lazy(_load_encoding)  # loaded on first split, not at import
+
+# One heading per line; compiled once instead of per document
+SECTION_RE = re.compile(r"^(?P<head>{})(?:\s*[:\-])?\s*$".format("|".join(re.escape(s) for s in TEMPLATE_SECTIONS)))
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"'’”)\]]*\s+")
+
+Chunk = Tuple[str, int, str, int]  # section, chunk_idx, content, tokens
+
+
 def normalize_city(name: str) -> str:
     # lowercase, remove spaces & non-alphanumerics (matches your need)
     name = name.strip().lower()
     return re.sub(r'[^a-z0-9]', '', name)
 
-def section_aware_split(pdf_path: str, max_chunk_chars=900, overlap=120):
-    reader = PdfReader(pdf_path)
-    full = "\n".join(page.extract_text() or "" for page in reader.pages)
 
-    title = next((l.strip() for l in full.splitlines() if l.strip()), "Unknown City")
-    stem = Path(pdf_path).stem
-    raw_city = title or stem
-    city = normalize_city(raw_city)
+def token_len(t: str) -> int:
+    return len(encoding.get().encode(t))
 
-    escaped = [re.escape(s) for s in TEMPLATE_SECTIONS]
-    pat = r"(?m)^(?P<head>{})(?:\s*[:\-])?\s*$".format("|".join(escaped))
-    parts, last, current = [], 0, "Overview"
 
-    for m in re.finditer(pat, full):
-        head = m.group("head")
-        if m.start() > 0:
-            parts.append((current, full[last:m.start()].strip()))
-        current = "Practical information" if head.lower().startswith("practical") else head
-        last = m.end()
+class _Chunker:
+    """
+    Packs sentences into chunks of at most `max_tokens`, carrying whole
+    trailing sentences (up to `overlap_tokens`) into the next chunk.
+    Token counts are taken per sentence, so no chunk is ever encoded twice.
+    """
 
-    parts.append((current, full[last:].strip()))
+    def __init__(self, max_tokens: int, overlap_tokens: int):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.section = "Overview"
+        self.chunks: List[Chunk] = []
+        self._sents: List[Tuple[str, int]] = []
+        self._tokens = 0
+        self._fresh = 0  # sentences not yet emitted in any chunk
 
-    chunks, idx = [], 0
-    for sec, text in parts:
-        text = re.sub(r"\n{2,}", "\n", text).strip()
+    def add_sentence(self, text: str) -> None:
+        enc = encoding.get()
+        toks = enc.encode(text)
+        if len(toks) > self.max_tokens:
+            # a single run-on "sentence" (tables, lists): cut it on token windows
+            for i in range(0, len(toks), self.max_tokens):
+                window = toks[i:i + self.max_tokens]
+                self._add(enc.decode(window).strip(), len(window))
+            return
+        self._add(text, len(toks))
+
+    def add_run_on(self, text: str) -> str:
+        """Add the full token windows of an unfinished run-on sentence; returns the rest, still pending."""
+        enc = encoding.get()
+        toks = enc.encode(text)
+        full = len(toks) - len(toks) % self.max_tokens
+        for i in range(0, full, self.max_tokens):
+            window = toks[i:i + self.max_tokens]
+            self._add(enc.decode(window).strip(), len(window))
+        return enc.decode(toks[full:]).lstrip()
+
+    def _add(self, text: str, n: int) -> None:
         if not text:
+            return
+        if self._fresh and self._tokens + n > self.max_tokens:
+            self._emit(keep_overlap=True)
+        while self._sents and self._tokens + n > self.max_tokens:
+            # overlap carried from the previous chunk doesn't fit next to this sentence
+            self._tokens -= self._sents.pop(0)[1]
+        self._sents.append((text, n))
+        self._tokens += n
+        self._fresh += 1
+
+    def _emit(self, keep_overlap: bool) -> None:
+        content = " ".join(s for s, _ in self._sents)
+        self.chunks.append((self.section, len(self.chunks), content, self._tokens))
+        kept: List[Tuple[str, int]] = []
+        if keep_overlap:
+            budget = self.overlap_tokens
+            for s, n in reversed(self._sents):
+                if n > budget:
+                    break
+                kept.insert(0, (s, n))
+                budget -= n
+        self._sents, self._tokens, self._fresh = kept, sum(n for _, n in kept), 0
+
+    def set_section(self, section: str) -> None:
+        self.flush()
+        self.section = section
+
+    def flush(self) -> None:
+        if self._fresh:
+            self._emit(keep_overlap=False)
+        self._sents, self._tokens, self._fresh = [], 0, 0
+
+
+# ~4 characters per token: a pending sentence this long spans about two chunks
+_MAX_PENDING_CHARS_PER_TOKEN = 8
+
+
+def _page_lines(reader) -> Iterable[str]:
+    for page in reader.pages:  # pages are parsed lazily, one at a time
+        yield from (page.extract_text() or "").splitlines()
+
+
+def section_aware_split(pdf_path: str, max_tokens: int = 220, overlap_tokens: int = 30):
+    """
+    Stream a city-guide PDF page by page and cut it into section-tagged chunks
+    in a single pass: heading detection, sentence segmentation and token-budget
+    packing all happen per line. Returns (city, title, [(section, idx, content, tokens)]).
+
+    Text without sentence ends (lists, tables) is handed to the chunker in full
+    token windows once it passes a few chunks' worth of characters, so the
+    pending sentence -- re-scanned after every line -- stays bounded and the
+    pass stays linear.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    chunker = _Chunker(max_tokens, overlap_tokens)
+    title = None
+    buf = ""
+    max_pending = max_tokens * _MAX_PENDING_CHARS_PER_TOKEN
+
+    def drain(final: bool) -> str:
+        parts = SENTENCE_END_RE.split(buf)
+        rest = "" if final else parts.pop()
+        for s in parts:
+            s = s.strip()
+            if s:
+                chunker.add_sentence(s)
+        return rest
+
+    for raw in _page_lines(reader):
+        line = raw.strip()
+        if title is None and line:
+            title = line
+        m = SECTION_RE.match(line)
+        if m:
+            buf = drain(final=True)
+            head = m.group("head")
+            chunker.set_section("Practical information" if head.lower().startswith("practical") else head)
             continue
-        start = 0
-        while start < len(text):
-            end = min(start + max_chunk_chars, len(text))
-            chunks.append((sec, idx, text[start:end]))
-            idx += 1
-            if end == len(text): break
-            start = max(0, end - overlap)
-
-    return city, title, chunks
+        if not line:
+            buf = drain(final=True)  # paragraph break also ends a sentence
+            continue
+        buf = f"{buf} {line}" if buf else line
+        buf = drain(final=False)
+        if len(buf) > max_pending:
+            buf = chunker.add_run_on(buf)  # cut on token windows, as add_sentence would at the end
+
+    buf = drain(final=True)
+    chunker.flush()
+
+    title = title or Path(pdf_path).stem or "Unknown City"
+    city = normalize_city(title)
+    return city, title, chunker.chunks
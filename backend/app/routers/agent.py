@@ -1,10 +1,13 @@
 from __future__ import annotations
 import json
 from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from langchain_core.messages import HumanMessage
 from ..agent.graph import app_graph
+from ..core import deadline
+from ..core.admission import admit
+from ..dependencies.auth import request_key
+from ..schemas.agent import AgentAnswer
 
 router = APIRouter(prefix="/api/agent", tags=["agent"])
 
@@ -13,8 +16,8 @@ class AgentQuery(BaseModel):
     city: Optional[str] = None
     days: int = 3  # optional hint for itinerary length
 
-@router.post("/query")
-async def agent_query(payload: AgentQuery) -> Dict[str, Any]:
+@router.post("/query", response_model=AgentAnswer, response_model_exclude_unset=True)
+async def agent_query(payload: AgentQuery, request: Request) -> Dict[str, Any]:
     """
     Orchestrated agent call.
     Returns a structured JSON object {city, recommendations[], forecast?, itinerary?, sources{}}.
@@ -27,8 +30,13 @@ async def agent_query(payload: AgentQuery) -> Dict[str, Any]:
         f"If an itinerary is relevant, make it {payload.days} day(s)."
     )
 
+    from langchain_core.messages import HumanMessage
+
     state = {"messages": [HumanMessage(content=ask)]}
-    result = app_graph.invoke(state)
+    async with admit("agent", request_key(request)):
+        # model and tool steps run in worker threads; the run is cancelled when the client leaves or the
+        # request budget (X-Request-Timeout / REQUEST_TIMEOUT_SECONDS) is spent
+        result = await deadline.until_disconnect(request, app_graph.get().ainvoke(state))
     last = result["messages"][-1]
     text = getattr(last, "content", "")
 
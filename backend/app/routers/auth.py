@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..core.security import get_password_hash, verify_password, create_access_token
-from ..dependencies.auth import get_db
+from ..dependencies.auth import get_current_user, get_db
 from ..models import User
 from ..schemas.auth import SignupRequest, LoginRequest, TokenResponse
 from ..schemas.user import UserOut
@@ -28,7 +28,7 @@ async def signup(payload: SignupRequest, db: AsyncSession = Depends(get_db)):
     await db.refresh(user)
 
     # Return an access token
-    token = create_access_token(subject=str(user.id))
+    token = create_access_token(subject=str(user.id), claims={"name": user.name, "email": user.email})
     return TokenResponse(access_token=token)
 
 
@@ -40,5 +40,11 @@ async def login(payload: LoginRequest, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
 
 
-    token = create_access_token(subject=user.id)
-    return TokenResponse(access_token=token)
\ No newline at end of file
+    token = create_access_token(subject=user.id, claims={"name": user.name, "email": user.email})
+    return TokenResponse(access_token=token)
+
+
+@router.get("/me", response_model=UserOut)
+async def me(user: User = Depends(get_current_user)):
+    """The signed-in user's profile, from the user cache when it is warm."""
+    return user
@@ -0,0 +1,30 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..core import profiling
+
+router = APIRouter(prefix="/api/debug/profiles", tags=["debug"], include_in_schema=False)
+
+
+def require_profile_token(x_debug_profile: Optional[str] = Header(None)) -> None:
+    # Same secret that turns profiling on for a request; without PROFILE_TOKEN the endpoints don't exist
+    if not profiling.authorized(x_debug_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("", summary="Recently captured request profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles(limit: int = Query(50, ge=1, le=500)) -> Dict[str, List[Dict[str, Any]]]:
+    return {"items": await run_in_threadpool(profiling.store.recent, limit)}
+
+
+@router.get("/{profile_id}", summary="Download a profile (folded stacks, or its metadata with ?format=json)",
+            dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str, format: str = Query("folded", pattern="^(folded|json)$")):
+    path = profiling.store.path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media = "application/json" if format == "json" else "text/plain"
+    return FileResponse(path, media_type=media, filename=f"{profile_id}.{format}")
@@ -1,50 +1,97 @@
 from __future__ import annotations
 
+import logging
 import os
 from pydantic import BaseModel
 from typing import Any, Dict, Optional, List
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
 from starlette.concurrency import run_in_threadpool
 
-from ..rag.ingest import ingest_pdf
+from ..core import deadline
+from ..core.admission import admit
+from ..core.config import settings
+from ..core.warmer import record_city
+from ..dependencies.auth import request_key
+from ..rag.jobs import IngestJob, QueueFull, UploadTooLarge, ingest_queue, save_upload
 from ..rag.retrieve import retrieve
 from ..rag.answer import synthesize_answer
+from ..rag.catalogue import city_catalogue
+from ..rag.digests import get_digest, section_intent
 from ..rag.splitter import normalize_city
+from ..schemas.rag import RAGSearchOut
 
 router = APIRouter(prefix="/api", tags=["rag"])
+logger = logging.getLogger("app.routers.rag")
 
-@router.post("/rag-ingest")
+async def _enqueue(file: UploadFile) -> IngestJob:
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail=f"Please upload a PDF file ({file.filename}).")
+    try:
+        path = await save_upload(file, settings.INGEST_MAX_UPLOAD_MB * 1024 * 1024)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"{file.filename} exceeds {settings.INGEST_MAX_UPLOAD_MB} MB.")
+    try:
+        return await ingest_queue.submit(file.filename, path)
+    except QueueFull:
+        os.remove(path)
+        raise HTTPException(status_code=503, detail="Ingest queue is full, retry later.", headers={"Retry-After": "30"})
+
+
+@router.post("/rag-ingest", status_code=202)
 async def rag_ingest(file: UploadFile = File(...)) -> Dict[str, Any]:
     """
-    Ingest a single PDF city guide:
+    Queue a single PDF city guide for ingestion and return its job id right away:
     - Splits by template sections, chunks with overlap
+    - Re-uploads of the same city/title only embed new or changed chunks
+      and drop removed ones (reported as reused / added / removed)
     - Embeds via OpenAI (text-embedding-3-small)
-    - Inserts into Postgres + pgvector
+    - Upserts into Postgres + pgvector
+    Poll GET /api/rag-ingest/jobs/{job_id} for progress and the result.
     """
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Please upload a PDF file.")
-    tmp_path = f"/tmp/{file.filename}"
-    # save
-    with open(tmp_path, "wb") as f:
-        f.write(await file.read())
-    try:
-        res = await run_in_threadpool(ingest_pdf, tmp_path)
-        return {"status": "ok", **res}
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+    job = await _enqueue(file)
+    return {"status": job.status, "job_id": job.id}
+
+
+@router.post("/rag-ingest/batch", status_code=202)
+async def rag_ingest_batch(files: List[UploadFile] = File(...)) -> Dict[str, Any]:
+    """Queue several PDFs at once; each gets its own job."""
+    bad = [f.filename for f in files if not (f.filename or "").lower().endswith(".pdf")]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Please upload PDF files only ({', '.join(map(str, bad))}).")
+    jobs = [await _enqueue(f) for f in files]
+    return {"jobs": [{"filename": j.filename, "job_id": j.id, "status": j.status} for j in jobs]}
+
+
+@router.get("/rag-ingest/jobs/{job_id}")
+async def rag_ingest_job(job_id: str) -> Dict[str, Any]:
+    job = await ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 class RAGSearchRequest(BaseModel):
     question: str
     city: Optional[str] = None
+    cities: Optional[List[str]] = None  # multi-stop trips: k chunks per city from one query
     k: int = 4
     with_answer: bool = True
+    use_digest: bool = True  # with_answer: answer general section questions ("getting around X") from the digest
+
+async def _record_cities(cities: List[Optional[str]]) -> None:
+    """Count guide cities for the warmer; free-text values would otherwise crowd its top list."""
+    try:
+        known = (await city_catalogue.get()).cities
+    except Exception:  # bookkeeping only: a search never fails on it
+        logger.warning("city catalogue unavailable; not recording cities", exc_info=True)
+        return
+    for city in cities:
+        if city and normalize_city(city) in known:
+            record_city(city)
+
 
-@router.post("/rag-search")
-async def rag_search(req: RAGSearchRequest) -> Dict[str, Any]:
+@router.post("/rag-search", response_model=RAGSearchOut, response_model_exclude_unset=True)
+async def rag_search(req: RAGSearchRequest, request: Request) -> Dict[str, Any]:
     """
     JSON-based RAG search endpoint.
     Example JSON:
@@ -54,9 +101,26 @@ async def rag_search(req: RAGSearchRequest) -> Dict[str, Any]:
       "k": 4,
       "with_answer": true
     }
+    or, for several cities at once, "cities": ["rome", "florence", "venice"] instead of "city".
     """
+    await _record_cities(req.cities or [req.city])
+    # only answers come from a digest; callers asking for chunks (the agent's rag_search tool) always get them
+    if req.with_answer and req.use_digest and settings.DIGESTS_ENABLED and req.city and not req.cities:
+        section = section_intent(req.question, req.city)
+        digest = await run_in_threadpool(get_digest, req.city, section) if section else None
+        if digest:
+            return {"chunks": [], "digest": digest, "answer": digest["digest"]}
+
+    if req.with_answer:
+        # answers hold an LLM call for seconds; queue them fairly and shed load early
+        async with admit("rag_answer", request_key(request)):
+            return await deadline.until_disconnect(request, _rag_search(req))
+    return await _rag_search(req)
+
+
+async def _rag_search(req: RAGSearchRequest) -> Dict[str, Any]:
     city_norm = normalize_city(req.city) if req.city else None
-    rows = await run_in_threadpool(retrieve, req.question, city_norm, req.k)
+    rows = await run_in_threadpool(retrieve, req.question, city_norm, req.k, req.cities)
     chunks = [
         {
             "id": r[0],
@@ -64,7 +128,9 @@ async def rag_search(req: RAGSearchRequest) -> Dict[str, Any]:
             "section": r[2],
             "chunk_idx": r[3],
             "content": r[4],
-            "distance": float(r[5]),
+            "doc_id": r[5],  # doc_id and tokens are for context packing; the response model drops them
+            "tokens": r[6],
+            "distance": float(r[7]),
         }
         for r in rows
     ]
@@ -72,8 +138,8 @@ async def rag_search(req: RAGSearchRequest) -> Dict[str, Any]:
     out: Dict[str, Any] = {"chunks": chunks}
 
     if req.with_answer and chunks:
-        contexts = [{"section": c["section"], "content": c["content"]} for c in chunks]
-        ans = await run_in_threadpool(synthesize_answer, req.question, req.city, contexts)
+        city_label = ", ".join(req.cities) if req.cities else req.city
+        ans = await run_in_threadpool(synthesize_answer, req.question, city_label, chunks)
         out["answer"] = ans
 
     return out
@@ -1,36 +1,138 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from ..dependencies.auth import get_db, get_current_user
+from sqlalchemy import select, delete, insert, tuple_
+from sqlalchemy.orm import undefer
+from ..core.db import SessionLocal
+from ..dependencies.auth import get_db, get_token_claims
 from ..models import SavedTrip
-from ..schemas.trip import SaveTripIn, TripOut
+from ..models.saved_trip import make_preview
+from ..schemas.trip import SaveTripIn, SaveTripsBulkIn, BulkSaveOut, TripOut, TripPage
 
 
 router = APIRouter(prefix="/api", tags=["trips"])
 
 
+def _encode_cursor(created_at: datetime, trip_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{trip_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, trip_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(trip_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.post("/save-trip", response_model=TripOut, status_code=201)
-async def save_trip(payload: SaveTripIn, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
-    trip = SavedTrip(user_id=user.id, city=payload.city, recommendation=payload.recommendation)
+async def save_trip(payload: SaveTripIn, db: AsyncSession = Depends(get_db), user=Depends(get_token_claims)):
+    trip = SavedTrip(
+        user_id=user.id,
+        city=payload.city,
+        preview=make_preview(payload.recommendation),
+        recommendation=payload.recommendation,
+    )
     db.add(trip)
     await db.commit()
-    await db.refresh(trip)
+    await db.refresh(trip, ["created_at"])
     return trip
 
 
-@router.get("/saved-trips", response_model=list[TripOut])
-async def list_trips(db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
-    result = await db.execute(select(SavedTrip).where(SavedTrip.user_id == user.id).order_by(SavedTrip.created_at.desc()))
-    trips = result.scalars().all()
-    return trips
+@router.post("/save-trips/bulk", response_model=BulkSaveOut, status_code=201)
+async def save_trips_bulk(payload: SaveTripsBulkIn, db: AsyncSession = Depends(get_db), user=Depends(get_token_claims)):
+    """Insert many trips with a single multi-row INSERT ... RETURNING in one transaction."""
+    rows = [
+        {
+            "user_id": user.id,
+            "city": t.city,
+            "preview": make_preview(t.recommendation),
+            "recommendation": t.recommendation,
+        }
+        for t in payload.trips
+    ]
+    # insertmanyvalues batches the rows; sort_by_parameter_order keeps the ids in payload order
+    result = await db.execute(insert(SavedTrip).returning(SavedTrip.id, sort_by_parameter_order=True), rows)
+    ids = list(result.scalars().all())
+    await db.commit()
+    return {"inserted": len(ids), "ids": ids}
+
+
+@router.get("/saved-trips/export", summary="Export all saved trips as NDJSON")
+async def export_trips(user=Depends(get_token_claims)):
+    """
+    Streams one JSON object per line from a server-side cursor, so memory
+    stays flat regardless of how many trips the user has.
+    """
+    user_id = user.id
+
+    async def rows():
+        # Own session: request-scoped dependencies are closed before the body is streamed.
+        async with SessionLocal() as session:
+            stmt = (
+                select(SavedTrip.id, SavedTrip.city, SavedTrip.recommendation, SavedTrip.created_at)
+                .where(SavedTrip.user_id == user_id)
+                .order_by(SavedTrip.created_at.desc(), SavedTrip.id.desc())
+                .execution_options(yield_per=500)
+            )
+            result = await session.stream(stmt)
+            async for row in result.mappings():
+                yield json.dumps({**row, "created_at": row["created_at"].isoformat()}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="saved-trips.ndjson"'},
+    )
+
+
+@router.get("/saved-trips", response_model=TripPage)
+async def list_trips(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_token_claims),
+):
+    """Newest first, keyset-paginated on (created_at, id); summaries only."""
+    stmt = select(SavedTrip.id, SavedTrip.city, SavedTrip.preview, SavedTrip.created_at).where(SavedTrip.user_id == user.id)
+    if cursor:
+        created_at, trip_id = _decode_cursor(cursor)
+        stmt = stmt.where(tuple_(SavedTrip.created_at, SavedTrip.id) < tuple_(created_at, trip_id))
+    stmt = stmt.order_by(SavedTrip.created_at.desc(), SavedTrip.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+@router.get("/saved-trips/{trip_id}", response_model=TripOut)
+async def get_trip(trip_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_token_claims)):
+    result = await db.execute(
+        select(SavedTrip)
+        .options(undefer(SavedTrip.recommendation))
+        .where(SavedTrip.id == trip_id, SavedTrip.user_id == user.id)
+    )
+    trip = result.scalar_one_or_none()
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return trip
 
 
 @router.delete("/saved-trips/{trip_id}", status_code=204)
-async def delete_trip(trip_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
-    result = await db.execute(select(SavedTrip).where(SavedTrip.id == trip_id, SavedTrip.user_id == user.id))
+async def delete_trip(trip_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_token_claims)):
+    result = await db.execute(select(SavedTrip.id).where(SavedTrip.id == trip_id, SavedTrip.user_id == user.id))
     trip = result.scalar_one_or_none()
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     await db.execute(delete(SavedTrip).where(SavedTrip.id == trip_id))
     await db.commit()
-    return
\ No newline at end of file
+    return
@@ -7,14 +7,21 @@ from typing import Any, Dict, Optional, List
 import httpx
 from fastapi import APIRouter, HTTPException, Query
 
+from ..core.shared_cache import Cache, aget, aset, cache_for
+from ..core.config import settings
+from ..core.metrics import register_cache, timed
+from ..core.warmer import record_city
+from ..core.upstream import OPEN_METEO
+from ..schemas.weather import WeatherOut
+
 router = APIRouter(prefix="/api", tags=["weather"])
 
 # ---- Open-Meteo endpoints
-GEOCODING_BASE = "https://geocoding-api.open-meteo.com/v1"
-FORECAST_BASE  = "https://api.open-meteo.com/v1/forecast"
-AIR_BASE       = "https://air-quality-api.open-meteo.com/v1/air-quality"
-MARINE_BASE    = "https://marine-api.open-meteo.com/v1/marine"
-ELEVATION_URL  = "https://api.open-meteo.com/v1/elevation"
+GEOCODING_BASE = settings.GEOCODING_BASE
+FORECAST_BASE  = settings.FORECAST_BASE
+AIR_BASE       = settings.AIR_BASE
+MARINE_BASE    = settings.MARINE_BASE
+ELEVATION_URL  = settings.ELEVATION_URL
 
 UA = {"User-Agent": "ai-travel-planner/1.0 (+https://example.com/)"}
 
@@ -71,24 +78,45 @@ def beach_outlook(max_wave_m: Optional[float]) -> str:
     if max_wave_m < 2.5: return "Rough — exercise caution"
     return "High surf — not ideal for swimming"
 
-async def _get(client: httpx.AsyncClient, url: str, params: dict) -> dict:
-    r = await client.get(url, params=params, headers=UA, timeout=30)
+# Parsed Open-Meteo responses; the warmer (app/core/warmer.py) refreshes popular cities before they expire
+_geo_cache = cache_for("weather_geocode", maxsize=4096, ttl=settings.GEOCODE_CACHE_TTL_SECONDS)
+_weather_cache = cache_for("weather_data", maxsize=4096, ttl=settings.WEATHER_CACHE_TTL_SECONDS)
+register_cache("weather_geocode", _geo_cache)
+register_cache("weather_data", _weather_cache)
+
+
+async def _get(client: httpx.AsyncClient, url: str, params: dict,
+               cache: Optional[Cache] = None, refresh: bool = False) -> dict:
+    key = (url, tuple(sorted((k, str(v)) for k, v in params.items() if k != "_ts")))
+    if cache is not None and not refresh:
+        hit = await aget(cache, key)
+        if hit is not None:
+            return hit
+    r = await OPEN_METEO.arequest(client, "GET", url, op=httpx.URL(url).path, params=params, headers=UA, hedge=True)
     if r.status_code >= 400:
         try:
             reason = r.json()
         except Exception:
             reason = r.text
         raise HTTPException(status_code=r.status_code, detail={"url": str(r.url), "error": reason})
-    return r.json()
+    data = r.json()
+    if cache is not None:
+        await aset(cache, key, data)
+    return data
 
-async def geocode_city(client: httpx.AsyncClient, city: str, count: int = 1, language: str = "en") -> dict:
-    data = await _get(client, f"{GEOCODING_BASE}/search", {"name": city, "count": count, "language": language})
+@timed("weather.geocode_city")
+async def geocode_city(client: httpx.AsyncClient, city: str, count: int = 1, language: str = "en",
+                       refresh: bool = False) -> dict:
+    params = {"name": city.strip().lower(), "count": count, "language": language}
+    data = await _get(client, f"{GEOCODING_BASE}/search", params, cache=_geo_cache, refresh=refresh)
     results = data.get("results") or []
     if not results:
         raise HTTPException(status_code=404, detail=f"No geocoding match for city={city!r}")
     return results[0]
 
-async def fetch_forecast(client: httpx.AsyncClient, lat: float, lon: float, tz: str, forecast_days: int) -> dict:
+@timed("weather.fetch_forecast")
+async def fetch_forecast(client: httpx.AsyncClient, lat: float, lon: float, tz: str, forecast_days: int,
+                         refresh: bool = False) -> dict:
     params = {
         "latitude": lat, "longitude": lon, "timezone": tz, "timeformat": "unixtime",
         "forecast_days": max(1, min(forecast_days, 16)),
@@ -107,9 +135,10 @@ async def fetch_forecast(client: httpx.AsyncClient, lat: float, lon: float, tz:
             "precipitation","cloud_cover","weathercode","uv_index"
         ]),
     }
-    return await _get(client, FORECAST_BASE, params)
+    return await _get(client, FORECAST_BASE, params, cache=_weather_cache, refresh=refresh)
 
-async def fetch_air(client: httpx.AsyncClient, lat: float, lon: float, tz: str) -> dict:
+@timed("weather.fetch_air")
+async def fetch_air(client: httpx.AsyncClient, lat: float, lon: float, tz: str, refresh: bool = False) -> dict:
     now = datetime.now(timezone.utc)
     params = {
         "latitude": lat, "longitude": lon, "timezone": tz, "timeformat": "unixtime",
@@ -117,9 +146,11 @@ async def fetch_air(client: httpx.AsyncClient, lat: float, lon: float, tz: str)
         "current": ",".join(["us_aqi","pm2_5","pm10"]),
         "_ts": int(now.timestamp()),
     }
-    return await _get(client, AIR_BASE, params)
+    return await _get(client, AIR_BASE, params, cache=_weather_cache, refresh=refresh)
 
-async def fetch_marine(client: httpx.AsyncClient, lat: float, lon: float, tz: str, forecast_days: int) -> dict:
+@timed("weather.fetch_marine")
+async def fetch_marine(client: httpx.AsyncClient, lat: float, lon: float, tz: str, forecast_days: int,
+                       refresh: bool = False) -> dict:
     now = datetime.now(timezone.utc)
     params = {
         "latitude": lat, "longitude": lon, "timezone": tz, "timeformat": "unixtime",
@@ -128,11 +159,13 @@ async def fetch_marine(client: httpx.AsyncClient, lat: float, lon: float, tz: st
         "daily": "wave_height_max,sea_surface_temperature_max,sea_surface_temperature_min",
         "_ts": int(now.timestamp()),
     }
-    return await _get(client, MARINE_BASE, params)
+    return await _get(client, MARINE_BASE, params, cache=_weather_cache, refresh=refresh)
 
+@timed("weather.fetch_elev")
 async def fetch_elev(client: httpx.AsyncClient, lat: float, lon: float) -> dict:
     now = datetime.now(timezone.utc)
-    return await _get(client, ELEVATION_URL, {"latitude": lat, "longitude": lon, "_ts": int(now.timestamp())})
+    params = {"latitude": lat, "longitude": lon, "_ts": int(now.timestamp())}
+    return await _get(client, ELEVATION_URL, params, cache=_geo_cache)  # elevation doesn't change
 
 def summarize_forecast(raw: dict, days: int) -> dict:
     """Turn Open-Meteo forecast into human-friendly blocks."""
@@ -250,7 +283,7 @@ def summarize_marine(raw: Optional[dict]) -> Optional[dict]:
         })
     return {"next_days": out}
 
-@router.get("/weather")
+@router.get("/weather", response_model=WeatherOut, response_model_exclude_unset=True)
 async def weather(
     city: str = Query(..., description="City name, e.g., 'Barcelona'"),
     forecast_days: int = Query(7, ge=1, le=16, description="Number of forecast days (1–16)"),
@@ -276,6 +309,7 @@ async def weather(
     async with httpx.AsyncClient() as client:
         # 1) Geocode
         place = await geocode_city(client, city=city, count=1, language=language)
+        record_city(city)  # only names that resolve are worth warming
         lat, lon = place["latitude"], place["longitude"]
         tz = place.get("timezone", "auto")
         out["meta"] = {
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Optional
+
+
+class AgentAnswer(BaseModel):
+    """Shape the system prompt asks for; the model's output is passed through loosely (extra keys kept)."""
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+    city: Any = None
+    recommendations: Any = None
+    forecast: Any = None
+    itinerary: Any = None
+    sources: Any = None
+    note: Optional[str] = Field(default=None, alias="_note")
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class RAGChunk(BaseModel):
+    id: int
+    city: Optional[str] = None
+    section: Optional[str] = None
+    chunk_idx: int
+    content: str
+    distance: float
+
+
+class SectionDigest(BaseModel):
+    section: str
+    digest: str
+    tokens: Optional[int] = None
+
+
+class RAGSearchOut(BaseModel):
+    chunks: List[RAGChunk]
+    answer: Optional[str] = None
+    digest: Optional[SectionDigest] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Any
+from pydantic import BaseModel, Field
+from typing import Any, Optional
 
 
 class SaveTripIn(BaseModel):
@@ -7,6 +7,15 @@ class SaveTripIn(BaseModel):
     recommendation: str
 
 
+class SaveTripsBulkIn(BaseModel):
+    trips: list[SaveTripIn] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkSaveOut(BaseModel):
+    inserted: int
+    ids: list[int]
+
+
 class TripOut(BaseModel):
     id: int
     city: str
@@ -14,5 +23,17 @@ class TripOut(BaseModel):
     created_at: Any
 
 
+class TripSummary(BaseModel):
+    id: int
+    city: str
+    preview: str
+    created_at: Any
+
+
+class TripPage(BaseModel):
+    items: list[TripSummary]
+    next_cursor: Optional[str] = None
+
+
 class Config:
-    from_attributes = True
\ No newline at end of file
+    from_attributes = True
@@ -0,0 +1,82 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Union
+
+Number = Union[int, float]
+
+
+class WeatherMatch(BaseModel):
+    name: Optional[str] = None
+    country: Optional[str] = None
+    admin1: Optional[str] = None
+    latitude: Number
+    longitude: Number
+    timezone: Optional[str] = None
+
+
+class WeatherMeta(BaseModel):
+    requested_at: str
+    city_query: str
+    match: WeatherMatch
+
+
+class CurrentWeather(BaseModel):
+    summary: str
+    temp_c: Optional[Number] = None
+    feels_like_c: Optional[Number] = None
+    humidity_pct: Optional[Number] = None
+    wind_ms: Optional[Number] = None
+    wind_text: Optional[str] = None
+    uv_index: Optional[Number] = None
+    precip_mm: Optional[Number] = None
+
+
+class DailyWeather(BaseModel):
+    date: str
+    summary: str
+    max_c: Optional[Number] = None
+    min_c: Optional[Number] = None
+    precip_probability: Optional[Number] = None
+    precip_mm: Optional[Number] = None
+    uv_index_max: Optional[Number] = None
+    wind_max_ms: Optional[Number] = None
+    wind_gust_ms: Optional[Number] = None
+    sunrise: Optional[str] = None
+    sunset: Optional[str] = None
+    wind_text: Optional[str] = None
+    tips: List[str] = []
+
+
+class ForecastOut(BaseModel):
+    current: CurrentWeather
+    daily: List[DailyWeather]
+    advisories: List[str]
+
+
+class AirQualityOut(BaseModel):
+    us_aqi: Optional[Number] = None
+    category: Optional[str] = None
+    primary_pollutant: Optional[str] = None
+    pm2_5: Optional[Number] = None
+    pm10: Optional[Number] = None
+    tips: List[str] = []
+
+
+class MarineDay(BaseModel):
+    date: str
+    wave_height_max_m: Optional[Number] = None
+    sea_surface_temp_c_max: Optional[Number] = None
+    sea_surface_temp_c_min: Optional[Number] = None
+    beach_outlook: Optional[str] = None
+
+
+class MarineOut(BaseModel):
+    next_days: List[MarineDay]
+
+
+class WeatherOut(BaseModel):
+    meta: WeatherMeta
+    forecast: Optional[ForecastOut] = None
+    air_quality: Optional[AirQualityOut] = None
+    marine: Optional[MarineOut] = None
+    elevation_m: Optional[Number] = None
+    errors: Dict[str, Any] = {}
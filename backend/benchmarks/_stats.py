@@ -0,0 +1,36 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def pct(xs: List[float], p: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty sample."""
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def summarize_ms(xs: Iterable[float]) -> Dict[str, float]:
+    xs = list(xs)
+    return {
+        "n": len(xs),
+        "p50_ms": round(pct(xs, 50), 2),
+        "p95_ms": round(pct(xs, 95), 2),
+        "p99_ms": round(pct(xs, 99), 2),
+        "max_ms": round(max(xs), 2) if xs else 0.0,
+    }
+
+
+def append_result(name: str, record: dict) -> Path:
+    """Append one JSON line to benchmarks/results/<name>.jsonl."""
+    path = RESULTS_DIR / f"{name}.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {**record, "ts": record.get("ts", time.time())}
+    with path.open("a") as f:
+        f.write(json.dumps(record) + "\n")
+    return path
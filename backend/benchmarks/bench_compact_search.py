@@ -0,0 +1,109 @@
+# backend/benchmarks/bench_compact_search.py
+"""
+Compact first-stage retrieval vs. the current search on real chunks:
+recall@k against an exact (sequential-scan) ground truth, `_pg_search`
+latency per EMBED_COMPACT_MODE, and the on-disk size of each column/index.
+
+    cd backend
+    python -m app.rag.compact --mode halfvec binary   # backfill embedding_short + build both indexes first
+    python -m benchmarks.bench_compact_search --queries 200 --k 12
+    python -m benchmarks.bench_compact_search --source-city   # filtered, as /api/rag-search with a city
+
+Query vectors are stored chunk embeddings with a little Gaussian noise, so no
+embedding API is called. --source-city filters each query to the city of
+the chunk it was made from (the filtered case the HNSW ef_search / iterative
+scan settings in app/rag/compact.py are for). Results are appended to benchmarks/results/compact_search.jsonl.
+"""
+import argparse
+import json
+import math
+import random
+import time
+from typing import List, Optional, Set, Tuple
+
+from pgvector import Vector
+
+from app.rag.compact import MODES
+from app.rag.db import get_conn
+from app.rag.retrieve import _pg_search
+from app.rag.splitter import normalize_city
+from ._stats import append_result, summarize_ms
+
+SIZES_SQL = """
+SELECT
+  pg_total_relation_size('chunks')                                    AS table_total,
+  (SELECT sum(pg_column_size(embedding)) FROM chunks)                 AS embedding_bytes,
+  (SELECT sum(pg_column_size(embedding_short)) FROM chunks)           AS embedding_short_bytes,
+  pg_relation_size(to_regclass('idx_chunks_embedding_ivfflat'))       AS ivfflat_index,
+  pg_relation_size(to_regclass('idx_chunks_embedding_short_hnsw'))    AS halfvec_index,
+  pg_relation_size(to_regclass('idx_chunks_embedding_bin_hnsw'))      AS binary_index
+"""
+
+
+def sample_queries(n: int, noise: float, seed: int) -> List[Tuple[List[float], str]]:
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT embedding, city FROM chunks WHERE embedding IS NOT NULL ORDER BY random() LIMIT %s", (n,)
+        ).fetchall()
+    rnd = random.Random(seed)
+    out = []
+    for emb, city in rows:
+        v = [x + rnd.gauss(0, noise) for x in emb.to_list()]
+        norm = math.sqrt(sum(x * x for x in v)) or 1.0
+        out.append(([x / norm for x in v], city))
+    return out
+
+
+def exact_ids(q: Vector, city: Optional[str], k: int) -> Set[int]:
+    where = "WHERE city = %(city)s" if city else ""
+    with get_conn() as conn:
+        conn.execute("SET LOCAL enable_indexscan = off")  # force a sequential scan = true neighbours
+        rows = conn.execute(
+            f"SELECT id FROM chunks {where} ORDER BY embedding <=> %(q)s::vector LIMIT %(k)s",
+            {"q": q, "city": normalize_city(city) if city else None, "k": k},
+        ).fetchall()
+    return {r[0] for r in rows}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=12)
+    ap.add_argument("--noise", type=float, default=0.02)
+    ap.add_argument("--city", default=None)
+    ap.add_argument("--source-city", action="store_true", help="filter each query to its source chunk's city")
+    ap.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    sampled = sample_queries(args.queries, args.noise, args.seed)
+    queries = [Vector(q) for q, _ in sampled]
+    cities = [city if args.source_city else args.city for _, city in sampled]
+    truth = [exact_ids(q, city, args.k) for q, city in zip(queries, cities)]
+
+    res = {"label": args.label, "queries": len(queries), "k": args.k,
+           "filter": "source_city" if args.source_city else args.city, "modes": {}}
+    for mode in args.modes:
+        _pg_search(queries[0], cities[0], args.k, mode=mode)  # warm the index pages
+        lat, recall = [], []
+        for q, city, want in zip(queries, cities, truth):
+            t0 = time.perf_counter()
+            rows = _pg_search(q, city, args.k, mode=mode)
+            lat.append((time.perf_counter() - t0) * 1000)
+            recall.append(len({r[0] for r in rows} & want) / max(1, len(want)))
+        res["modes"][mode] = {
+            "recall_at_k": round(sum(recall) / max(1, len(recall)), 4),
+            **summarize_ms(lat),
+        }
+
+    with get_conn() as conn:
+        cur = conn.execute(SIZES_SQL)
+        res["bytes"] = {d.name: int(v or 0) for d, v in zip(cur.description, cur.fetchone())}
+
+    print(json.dumps(res, indent=2))
+    append_result("compact_search", res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/benchmarks/bench_context_packing.py
+"""
+Prompt tokens sent by synthesize_answer with and without context packing.
+
+Chunks come from a synthetic guide run through the real splitter; retrieval
+is simulated with word-overlap scores followed by the real `mmr`, and the
+neighbour query is served from memory, so no database or API is needed.
+
+    python -m benchmarks.bench_context_packing --queries 200 --k 4 8 12
+
+Results are appended to benchmarks/results/context_packing.jsonl.
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+from collections import Counter
+from typing import Dict, List
+
+from app.rag import context
+from app.rag.answer import build_prompt
+from app.rag.retrieve import mmr
+from app.rag.splitter import section_aware_split, token_len
+from ._stats import append_result
+from .pdfgen import _WORDS, make_guide
+
+
+def _rows(chunks, city: str) -> List[dict]:
+    return [{"id": i, "city": city, "section": s, "chunk_idx": idx, "content": c, "doc_id": 1, "tokens": t}
+            for i, (s, idx, c, t) in enumerate(chunks)]
+
+
+def _search(rows: List[dict], query: List[str], top_n: int = 12):
+    q = Counter(query)
+    scored = []
+    for r in rows:
+        words = Counter(r["content"].lower().replace(".", "").split())
+        overlap = sum(min(n, words[w]) for w, n in q.items())
+        scored.append((r["id"], r["city"], r["section"], r["chunk_idx"], r["content"], r["doc_id"], r["tokens"],
+                       1.0 / (1 + overlap)))
+    scored.sort(key=lambda t: t[-1])
+    return scored[:top_n]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, nargs="+", default=[4, 8, 12])
+    ap.add_argument("--budget", type=int, default=1500)
+    ap.add_argument("--paragraphs", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        city, _title, chunks = section_aware_split(make_guide("Benchmarkville", f"{tmp}/g.pdf", args.paragraphs))
+    rows = _rows(chunks, city)
+    by_pos = {(r["section"], r["chunk_idx"]): r for r in rows}
+
+    def neighbours(ids):  # in-memory stand-in for context.fetch_neighbours
+        out = {}
+        for i in ids:
+            r = rows[i]
+            for d in (-1, 0, 1):
+                n = by_pos.get((r["section"], r["chunk_idx"] + d))
+                if n:
+                    out[n["id"]] = n
+        return list(out.values())
+
+    context.fetch_neighbours = neighbours
+    rnd = random.Random(args.seed)
+    queries = [[rnd.choice(_WORDS) for _ in range(rnd.randint(3, 6))] for _ in range(args.queries)]
+
+    res: Dict = {"label": args.label, "chunks": len(rows), "budget": args.budget, "k": {}}
+    for k in args.k:
+        naive, merged, packed, packed_nb = [], [], [], []
+        for q in queries:
+            hits = [{"id": h[0], "city": h[1], "section": h[2], "chunk_idx": h[3], "content": h[4], "doc_id": h[5],
+                     "tokens": h[6]}
+                    for h in mmr(_search(rows, q, top_n=max(12, k)), k=k)]
+            question = " ".join(q)
+            naive.append(token_len(build_prompt(question, city, hits)))
+            merged.append(token_len(build_prompt(question, city, context.pack_context(hits, 10 ** 9))))
+            packed.append(token_len(build_prompt(question, city, context.pack_context(hits, args.budget))))
+            packed_nb.append(token_len(build_prompt(question, city, context.pack_context(hits, args.budget, neighbours=True))))
+        mean_naive = statistics.mean(naive)
+        res["k"][str(k)] = {
+            "naive_tokens_mean": round(mean_naive, 1),
+            "merged_tokens_mean": round(statistics.mean(merged), 1),  # overlap removal only, no budget
+            "packed_tokens_mean": round(statistics.mean(packed), 1),
+            "saved_tokens_mean": round(mean_naive - statistics.mean(packed), 1),
+            "saved_pct": round(100 * (1 - statistics.mean(packed) / mean_naive), 1),
+            "with_neighbours_tokens_mean": round(statistics.mean(packed_nb), 1),
+        }
+    print(json.dumps(res, indent=2))
+    append_result("context_packing", res)
+
+
+if __name__ == "__main__":
+    main()
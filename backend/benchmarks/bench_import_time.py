@@ -0,0 +1,88 @@
+# backend/benchmarks/bench_import_time.py
+"""
+Cold-start profile of `import app.main` using `python -X importtime`.
+
+    python -m benchmarks.bench_import_time --top 15
+    python -m benchmarks.bench_import_time --baseline benchmarks/results/import_time-main.json
+
+Runs the import in fresh interpreters (best of --repeat), reports the total
+and the slowest top-level packages by cumulative time, saves
+benchmarks/results/import_time-<label>.json, and exits non-zero when the
+total grows more than --max-regression over the baseline or when a module
+listed in HEAVY is imported eagerly.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ._stats import RESULTS_DIR
+
+# Must only load on first use / warm-up, never at import time
+HEAVY = ("langgraph", "langchain_core", "langchain_openai", "langchain_ollama", "pypdf")
+
+
+def profile_once(target: str) -> Tuple[float, Dict[str, float]]:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=env, cwd=Path(__file__).resolve().parent.parent,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    cumulative: Dict[str, float] = {}
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _self_us, cum_us, name = line[len("import time:"):].split("|")
+        module = name.strip()
+        cum_ms = int(cum_us) / 1000
+        if module == target:
+            total = cum_ms  # includes everything the target pulled in
+        top = module.split(".")[0]
+        cumulative[top] = max(cumulative.get(top, 0.0), cum_ms)
+    return total, cumulative
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--target", default="app.main")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--label", default="current")
+    ap.add_argument("--baseline", type=Path)
+    ap.add_argument("--max-regression", type=float, default=0.25)
+    args = ap.parse_args()
+
+    runs = [profile_once(args.target) for _ in range(args.repeat)]
+    total, modules = min(runs, key=lambda r: r[0])
+    slowest: List[Tuple[str, float]] = sorted(modules.items(), key=lambda kv: -kv[1])[: args.top]
+    eager_heavy = [m for m in HEAVY if m in modules]
+
+    report = {
+        "label": args.label,
+        "target": args.target,
+        "total_ms": round(total, 1),
+        "slowest": [{"module": m, "cumulative_ms": round(ms, 1)} for m, ms in slowest],
+        "eager_heavy_imports": eager_heavy,
+    }
+    print(json.dumps(report, indent=2))
+    out = RESULTS_DIR / f"import_time-{args.label}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+
+    ok = not eager_heavy
+    if args.baseline:
+        base = json.loads(args.baseline.read_text())
+        delta = (total - base["total_ms"]) / base["total_ms"]
+        print(f"total {base['total_ms']:.1f} -> {total:.1f} ms ({delta:+.0%})")
+        ok &= delta <= args.max_regression
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_local_llm.py
+"""
+Throughput and latency of local-model chat calls at different
+OLLAMA_MAX_CONCURRENCY caps, against the fake Ollama in benchmarks.fakes
+(started in-process; it slows down once more than its slots are busy).
+
+Each of --clients threads sends chat requests through a LocalScheduler with
+the given cap; cap 0 sends them unscheduled. The model is preloaded first
+unless --cold is given.
+
+    python -m benchmarks.bench_local_llm --clients 16 --requests 64 --caps 0 1 2 4 8
+
+Results are appended to benchmarks/results/local_llm.jsonl.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import httpx
+import uvicorn
+
+from app.agent.local_llm import LocalScheduler
+from . import fakes
+from ._stats import append_result, summarize_ms
+
+
+def _serve(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(fakes.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def run(base: str, cap: int, clients: int, requests: int) -> dict:
+    sched = LocalScheduler(cap, timeout=600) if cap else None
+    body = {"model": "llama3.1:8b-instruct", "stream": False, "keep_alive": "30m",
+            "messages": [{"role": "user", "content": "City: Lisbon\nUser question: three days?"}]}
+    latencies, waits = [], []
+
+    def one(_):
+        t0 = time.perf_counter()
+        with (sched.slot() if sched else nullcontext()):
+            waits.append((time.perf_counter() - t0) * 1000)
+            httpx.post(f"{base}/api/chat", json=body, timeout=600).raise_for_status()
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    return {"cap": cap or "unbounded", "throughput_rps": round(requests / wall, 2), "wall_s": round(wall, 2),
+            "latency": summarize_ms(latencies), "queue_wait": summarize_ms(waits)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=64)
+    ap.add_argument("--caps", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    ap.add_argument("--ollama-ms", type=float, default=fakes.LATENCY_MS["ollama"])
+    ap.add_argument("--slots", type=int, default=fakes.OLLAMA_SLOTS, help="parallel generations the fake model sustains")
+    ap.add_argument("--cold", action="store_true", help="skip the preload; the first request pays the model load")
+    ap.add_argument("--port", type=int, default=9101)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    fakes.LATENCY_MS["ollama"] = args.ollama_ms
+    fakes.OLLAMA_SLOTS = args.slots
+    server = _serve(args.port)
+    base = f"http://127.0.0.1:{args.port}/ollama"
+    try:
+        if not args.cold:
+            httpx.post(f"{base}/api/generate", json={"model": "llama3.1:8b-instruct", "keep_alive": "30m"},
+                       timeout=600).raise_for_status()
+        res = {"label": args.label, "clients": args.clients, "requests": args.requests, "slots": args.slots,
+               "ollama_ms": args.ollama_ms, "cold": args.cold,
+               "runs": [run(base, cap, args.clients, args.requests) for cap in args.caps]}
+    finally:
+        server.should_exit = True
+    print(json.dumps(res, indent=2))
+    append_result("local_llm", res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# backend/benchmarks/bench_saved_trips.py
+"""
+Requests/sec on GET /api/saved-trips against a running API.
+
+    cd backend
+    uvicorn app.main:app --port 8000 --workers 1
+    python -m benchmarks.bench_saved_trips --label jwt-fast-path
+
+Run it once on the previous commit and once on this one with different
+labels; results are appended to benchmarks/results/saved_trips.jsonl.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from ._stats import append_result
+
+
+async def _token(client: httpx.AsyncClient) -> str:
+    email = f"bench-{uuid.uuid4().hex[:10]}@example.com"
+    r = await client.post("/api/auth/signup", json={"name": "bench", "email": email, "password": "bench-pass"})
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+async def run(base_url: str, concurrency: int, duration: float) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        token = await _token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post("/api/save-trip", json={"city": "rome", "recommendation": "{}"}, headers=headers)
+
+        done, errors = 0, 0
+        stop_at = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal done, errors
+            while time.perf_counter() < stop_at:
+                r = await client.get("/api/saved-trips", headers=headers)
+                if r.status_code == 200:
+                    done += 1
+                else:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return {"requests": done, "errors": errors, "seconds": round(elapsed, 3), "rps": round(done / elapsed, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    res = asyncio.run(run(args.base_url, args.concurrency, args.duration))
+    res.update({"label": args.label, "concurrency": args.concurrency})
+    print(json.dumps(res))
+    append_result("saved_trips", res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# backend/benchmarks/bench_serialization.py
+"""
+Serialization CPU and bytes on the wire for the large JSON responses:
+/api/weather (16-day forecast with air and marine), /api/rag-search
+(k chunks plus an answer) and /api/agent/query (a multi-day itinerary).
+
+"stdlib" is FastAPI's old path for these routes (jsonable_encoder +
+JSONResponse); "orjson" is the response model's pydantic serializer +
+ORJSONResponse. Sizes are reported raw, gzip 6 and brotli 4 (when the
+`brotli` package is installed). Offline: payloads are built from
+benchmarks.fakes data run through the real summarizers.
+
+    python -m benchmarks.bench_serialization --iterations 2000 --k 12
+
+Results are appended to benchmarks/results/serialization.jsonl.
+"""
+import argparse
+import asyncio
+import json
+import time
+import zlib
+from typing import Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.routers import weather
+from app.schemas.agent import AgentAnswer
+from app.schemas.rag import RAGSearchOut
+from app.schemas.weather import WeatherOut
+from . import fakes
+from ._stats import append_result
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def weather_payload(days: int) -> dict:
+    fakes.LATENCY_MS["meteo"] = 0
+    raw_fc = asyncio.run(fakes.forecast(days))
+    raw_fc["daily"]["sunrise"] = [d + 6 * 3600 for d in raw_fc["daily"]["time"]]
+    return {
+        "meta": {"requested_at": "2025-01-01T00:00:00+00:00", "city_query": "Lisbon",
+                 "match": {"name": "Lisbon", "country": "Portugal", "admin1": "Lisbon", "latitude": 38.72,
+                           "longitude": -9.13, "timezone": "Europe/Lisbon"}},
+        "forecast": weather.summarize_forecast(raw_fc, days),
+        "air_quality": weather.summarize_air(asyncio.run(fakes.air())),
+        "marine": weather.summarize_marine(asyncio.run(fakes.marine(days))),
+        "errors": {},
+    }
+
+
+def rag_payload(k: int) -> dict:
+    text = "Alfama is the oldest district of Lisbon, a maze of steep lanes and stairways. " * 12
+    return {
+        "chunks": [{"id": 1000 + i, "city": "lisbon", "section": "Neighborhoods", "chunk_idx": i,
+                    "content": text, "distance": 0.2 + i / 100} for i in range(k)],
+        "answer": "Stay in Baixa or Chiado for first visits; Alfama for atmosphere. " * 4,
+    }
+
+
+def agent_payload(days: int) -> dict:
+    return {
+        "city": "lisbon",
+        "recommendations": [f"Tip {i}: ride tram 28 early, then walk down through Alfama." for i in range(8)],
+        "forecast": {"summary": "Mild and sunny", "advisories": ["High UV midday"], "pack_tips": ["Sunscreen"]},
+        "itinerary": [{"day": d, "morning": "Castelo de São Jorge", "afternoon": "Belém tower and pastéis",
+                       "evening": "Fado in Alfama"} for d in range(1, days + 1)],
+        "sources": {"rag": ["Neighborhoods", "Things to See"], "weather": ["Forecast"], "web": []},
+    }
+
+
+def stdlib(payload: dict, _model) -> bytes:
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def fast(payload: dict, model) -> bytes:
+    return ORJSONResponse(model.model_validate(payload).model_dump(mode="json", by_alias=True, exclude_unset=True)).body
+
+
+def _time_us(fn: Callable[[], bytes], iterations: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--iterations", type=int, default=2000)
+    ap.add_argument("--k", type=int, default=12)
+    ap.add_argument("--days", type=int, default=16)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    cases = {
+        "weather": (weather_payload(args.days), WeatherOut),
+        "rag_search": (rag_payload(args.k), RAGSearchOut),
+        "agent": (agent_payload(min(args.days, 7)), AgentAnswer),
+    }
+    res: Dict = {"label": args.label, "iterations": args.iterations, "routes": {}}
+    for name, (payload, model) in cases.items():
+        assert json.loads(stdlib(payload, model)) == json.loads(fast(payload, model)), name
+        body = fast(payload, model)
+        gz = zlib.compressobj(6, zlib.DEFLATED, 31)
+        row = {
+            "stdlib_us": round(_time_us(lambda: stdlib(payload, model), args.iterations), 1),
+            "orjson_us": round(_time_us(lambda: fast(payload, model), args.iterations), 1),
+            "bytes_raw": len(body),
+            "bytes_gzip": len(gz.compress(body) + gz.flush()),
+            "gzip_us": round(_time_us(lambda: zlib.compress(body, 6), args.iterations), 1),
+        }
+        if brotli is not None:
+            row["bytes_br"] = len(brotli.compress(body, quality=4))
+            row["br_us"] = round(_time_us(lambda: brotli.compress(body, quality=4), args.iterations), 1)
+        res["routes"][name] = row
+    print(json.dumps(res, indent=2))
+    append_result("serialization", res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# backend/benchmarks/bench_shared_cache.py
+"""
+Per-process TTLCache vs the shared SQLite tier (app/core/shared_cache.py)
+with 1, 4 and 8 worker processes.
+
+One Zipf-distributed stream of cache lookups -- forecast-sized JSON
+payloads and 1536-float query embeddings -- is dealt round-robin to the
+workers, as uvicorn's workers share incoming requests. A miss counts as an
+upstream call and stores the payload. Reported per run: overall hit rate,
+upstream calls, lookup latency, private memory each worker gained
+(Private_Clean + Private_Dirty from /proc/self/smaps_rollup, so the shared
+database pages are not counted per worker) and the database file size.
+Offline; Linux for the memory figures.
+
+    python -m benchmarks.bench_shared_cache --workers 1 4 8 --lookups 40000
+
+Results are appended to benchmarks/results/shared_cache.jsonl.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.shared_cache import SharedCache
+from ._stats import append_result, summarize_ms
+
+
+def _private_kb() -> Optional[int]:
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    return sum(int(fields[k].split()[0]) for k in ("Private_Clean", "Private_Dirty") if k in fields)
+
+
+def _payload(kind: str, i: int):
+    rnd = random.Random(i)
+    if kind == "embed":
+        return [rnd.uniform(-0.1, 0.1) for _ in range(1536)]
+    days = [f"2025-06-{d + 1:02d}" for d in range(16)]
+    return {"latitude": 38.7, "longitude": -9.1, "daily": {
+        "time": days, **{v: [round(rnd.uniform(0, 30), 1) for _ in days] for v in (
+            "temperature_2m_max", "temperature_2m_min", "precipitation_sum", "wind_speed_10m_max", "uv_index_max")}},
+        "hourly": {"time": [f"{d}T{h:02d}:00" for d in days for h in range(24)],
+                   "temperature_2m": [round(rnd.uniform(0, 30), 1) for _ in range(16 * 24)]}}
+
+
+def _stream(lookups: int, weather_keys: int, embed_keys: int, seed: int) -> List[tuple]:
+    rnd = random.Random(seed)
+    # Zipf-like popularity: a few cities and questions get most of the traffic
+    w_weights = [1 / (r + 1) ** 1.1 for r in range(weather_keys)]
+    e_weights = [1 / (r + 1) ** 1.1 for r in range(embed_keys)]
+    out = []
+    for _ in range(lookups):
+        if rnd.random() < 0.5:
+            out.append(("weather", rnd.choices(range(weather_keys), w_weights)[0]))
+        else:
+            out.append(("embed", rnd.choices(range(embed_keys), e_weights)[0]))
+    return out
+
+
+def _worker(mode: str, path: str, keys: List[tuple], maxsize: int, local_size: int, out) -> None:
+    before = _private_kb()
+    if mode == "shared":
+        caches = {kind: SharedCache(path, kind, maxsize=maxsize, ttl=3600, local_size=local_size)
+                  for kind in ("weather", "embed")}
+    else:
+        caches = {kind: TTLCache(maxsize=maxsize, ttl=3600) for kind in ("weather", "embed")}
+    upstream, lat = 0, []
+    for kind, i in keys:
+        t0 = time.perf_counter()
+        hit = caches[kind].get((kind, i))
+        lat.append((time.perf_counter() - t0) * 1000)
+        if hit is None:
+            upstream += 1
+            caches[kind].set((kind, i), _payload(kind, i))
+    after = _private_kb()
+    out.put({"upstream": upstream, "lookups": len(keys), "lat": lat,
+             "private_mb": round((after - before) / 1024, 1) if before is not None and after is not None else None})
+
+
+def run(mode: str, workers: int, stream: List[tuple], maxsize: int, local_size: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        ctx = mp.get_context("spawn")  # like uvicorn --workers
+        q = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(mode, path, stream[w::workers], maxsize, local_size, q))
+                 for w in range(workers)]
+        t0 = time.perf_counter()
+        for p in procs:
+            p.start()
+        results = [q.get() for _ in procs]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - t0
+        db_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 2 ** 20 if mode == "shared" else 0
+    upstream = sum(r["upstream"] for r in results)
+    private = [r["private_mb"] for r in results if r["private_mb"] is not None]
+    return {
+        "mode": mode, "workers": workers, "lookups": len(stream), "upstream_calls": upstream,
+        "hit_rate": round(1 - upstream / len(stream), 4), "wall_s": round(wall, 2),
+        "get": summarize_ms(x for r in results for x in r["lat"]),
+        "private_mb_per_worker": round(sum(private) / len(private), 1) if private else None,
+        "private_mb_total": round(sum(private), 1) if private else None,
+        "db_mb": round(db_mb, 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    ap.add_argument("--lookups", type=int, default=40000)
+    ap.add_argument("--weather-keys", type=int, default=2000)
+    ap.add_argument("--embed-keys", type=int, default=5000)
+    ap.add_argument("--maxsize", type=int, default=4096, help="entries per cache and kind")
+    ap.add_argument("--local-size", type=int, default=256, help="shared tier's per-process front")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    stream = _stream(args.lookups, args.weather_keys, args.embed_keys, args.seed)
+    res = {"label": args.label, "runs": []}
+    for workers in args.workers:
+        for mode in ("per_process", "shared"):
+            row = run(mode, workers, stream, args.maxsize, args.local_size)
+            print(json.dumps(row))
+            res["runs"].append(row)
+    append_result("shared_cache", res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_splitter.py
+"""
+Splitter throughput on large synthetic guides: the streaming token-aware
+`section_aware_split` vs. the previous join-everything/fixed-900-char
+splitter (reproduced below), including the per-chunk re-tokenization the
+old ingest path needed.
+
+    python -m benchmarks.bench_splitter --paragraphs 200 --repeat 3
+"""
+import argparse
+import json
+import re
+import statistics
+import tempfile
+import time
+
+from pypdf import PdfReader
+
+from app.rag.splitter import TEMPLATE_SECTIONS, encoding, normalize_city, section_aware_split
+from ._stats import append_result
+from .pdfgen import make_guide
+
+
+def legacy_split(pdf_path: str, max_chunk_chars=900, overlap=120):
+    reader = PdfReader(pdf_path)
+    full = "\n".join(page.extract_text() or "" for page in reader.pages)
+    title = next((l.strip() for l in full.splitlines() if l.strip()), "Unknown City")
+    city = normalize_city(title)
+    pat = r"(?m)^(?P<head>{})(?:\s*[:\-])?\s*$".format("|".join(re.escape(s) for s in TEMPLATE_SECTIONS))
+    parts, last, current = [], 0, "Overview"
+    for m in re.finditer(pat, full):
+        if m.start() > 0:
+            parts.append((current, full[last:m.start()].strip()))
+        head = m.group("head")
+        current = "Practical information" if head.lower().startswith("practical") else head
+        last = m.end()
+    parts.append((current, full[last:].strip()))
+    chunks, idx = [], 0
+    for sec, text in parts:
+        text = re.sub(r"\n{2,}", "\n", text).strip()
+        start = 0
+        while text and start < len(text):
+            end = min(start + max_chunk_chars, len(text))
+            chunks.append((sec, idx, text[start:end]))
+            idx += 1
+            if end == len(text):
+                break
+            start = max(0, end - overlap)
+    # the old ingest path encoded every chunk again to fill `tokens`
+    enc = encoding.get()
+    return city, title, [(s, i, c, len(enc.encode(c))) for s, i, c in chunks]
+
+
+def _measure(fn, path: str, repeat: int, pages: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _, _, chunks = fn(path)
+        times.append(time.perf_counter() - t0)
+    toks = [c[3] for c in chunks]
+    best = min(times)
+    return {
+        "seconds": round(best, 4),
+        "pages_per_s": round(pages / best, 1),
+        "chunks": len(chunks),
+        "tokens_mean": round(statistics.mean(toks), 1),
+        "tokens_stdev": round(statistics.pstdev(toks), 1),
+        "tokens_max": max(toks),
+        "split_words": sum(1 for c in chunks if c[2] and c[2][-1].isalpha()),  # chunk ends mid-word/sentence
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--paragraphs", type=int, default=200, help="paragraphs per section in the synthetic guide")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_guide("Benchmarkville", f"{tmp}/guide.pdf", args.paragraphs)
+        pages = len(PdfReader(path).pages)
+        res = {
+            "label": args.label,
+            "pages": pages,
+            "streaming": _measure(section_aware_split, path, args.repeat, pages),
+            "legacy": _measure(legacy_split, path, args.repeat, pages),
+        }
+    print(json.dumps(res, indent=2))
+    append_result("splitter", res)
+
+
+if __name__ == "__main__":
+    main()
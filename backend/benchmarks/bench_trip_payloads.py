@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_trip_payloads.py
+"""
+Payload size and latency of the saved-trips list vs. on-demand detail fetches,
+plus the on-disk zstd ratio of the recommendation column.
+
+    cd backend
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.bench_trip_payloads --trips 300
+
+Results are appended to benchmarks/results/trip_payloads.jsonl.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+import zstandard
+
+from ._stats import pct, append_result
+
+
+def sample_recommendation(i: int) -> str:
+    """Roughly the size/shape of a real agent answer."""
+    return json.dumps({
+        "city": "barcelona",
+        "recommendations": [f"Tip {j} for trip {i}: stay in Gràcia, take the L3 metro early." for j in range(7)],
+        "forecast": {"summary": "Mild and sunny", "advisories": ["High UV midday"], "pack_tips": ["Sunscreen", "Light layer"]},
+        "itinerary": [
+            {"day": d, "morning": "Sagrada Família (book ahead)", "afternoon": "Park Güell and Gràcia squares",
+             "evening": "Tapas crawl in El Born"} for d in range(1, 6)
+        ],
+        "sources": {"rag": ["Neighborhoods", "Things to See"], "weather": ["Packing advice"], "web": []},
+    }, ensure_ascii=False)
+
+
+async def run(base_url: str, n_trips: int, page_size: int) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        email = f"bench-{uuid.uuid4().hex[:10]}@example.com"
+        r = await client.post("/api/auth/signup", json={"name": "bench", "email": email, "password": "bench-pass"})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for i in range(n_trips):
+            await client.post("/api/save-trip", json={"city": "barcelona", "recommendation": sample_recommendation(i)}, headers=headers)
+
+        # walk every page with the cursor
+        page_ms, page_bytes, cursor, pages = [], 0, None, 0
+        while True:
+            params = {"limit": page_size, **({"cursor": cursor} if cursor else {})}
+            t0 = time.perf_counter()
+            r = await client.get("/api/saved-trips", params=params, headers=headers)
+            page_ms.append((time.perf_counter() - t0) * 1000)
+            page_bytes += len(r.content)
+            pages += 1
+            body = r.json()
+            cursor = body.get("next_cursor")
+            if not cursor:
+                break
+
+        first = (await client.get("/api/saved-trips", params={"limit": page_size}, headers=headers)).json()["items"]
+        detail_ms, detail_bytes = [], 0
+        for item in first:
+            t0 = time.perf_counter()
+            r = await client.get(f"/api/saved-trips/{item['id']}", headers=headers)
+            detail_ms.append((time.perf_counter() - t0) * 1000)
+            detail_bytes += len(r.content)
+
+    raw = sample_recommendation(0).encode()
+    return {
+        "trips": n_trips,
+        "pages": pages,
+        "list_bytes_total": page_bytes,
+        "list_bytes_per_trip": round(page_bytes / max(1, n_trips), 1),
+        "list_p50_ms": round(statistics.median(page_ms), 2),
+        "list_p95_ms": round(pct(page_ms, 95), 2),
+        "detail_bytes_avg": round(detail_bytes / max(1, len(detail_ms)), 1),
+        "detail_p50_ms": round(statistics.median(detail_ms), 2) if detail_ms else None,
+        "recommendation_raw_bytes": len(raw),
+        "recommendation_zstd_bytes": len(zstandard.ZstdCompressor(level=3).compress(raw)),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--trips", type=int, default=300)
+    ap.add_argument("--page-size", type=int, default=20)
+    ap.add_argument("--label", default="current")
+    args = ap.parse_args()
+
+    res = asyncio.run(run(args.base_url, args.trips, args.page_size))
+    res["label"] = args.label
+    print(json.dumps(res, indent=2))
+    append_result("trip_payloads", res)
+
+
+if __name__ == "__main__":
+    main()
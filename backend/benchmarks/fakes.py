@@ -0,0 +1,306 @@
+# backend/benchmarks/fakes.py
+"""
+Local stand-ins for every paid/external upstream the API talks to:
+OpenAI (embeddings, responses, chat completions with tool calls), a local
+Ollama server, Jina search/read and the Open-Meteo geocoding/forecast/air/marine/elevation APIs.
+
+Responses are deterministic (embeddings are seeded from the input text) and
+each upstream has a configurable latency, so load tests are repeatable and free.
+
+    python -m benchmarks.fakes --port 9100 --embed-ms 40 --llm-ms 600
+
+Point the API at it with the variables from `fake_env()`.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+LATENCY_MS: Dict[str, float] = {"embed": 30.0, "llm": 500.0, "jina": 150.0, "meteo": 60.0, "ollama": 800.0}
+EMBED_DIMS = 1536
+
+app = FastAPI(title="offline upstream fakes")
+
+
+def fake_env(base: str = "http://127.0.0.1:9100") -> Dict[str, str]:
+    """Environment overrides that route the API's upstream calls to this server."""
+    return {
+        "OPENAI_API_KEY": "sk-fake",
+        "JINA_API_KEY": "jina-fake",
+        "OPENAI_BASE": f"{base}/openai/v1",
+        "OLLAMA_BASE": f"{base}/ollama",
+        "JINA_SEARCH_BASE": f"{base}/jina/search",
+        "JINA_READ_BASE": f"{base}/jina/read",
+        "GEOCODING_BASE": f"{base}/meteo/geocoding/v1",
+        "FORECAST_BASE": f"{base}/meteo/v1/forecast",
+        "AIR_BASE": f"{base}/meteo/air-quality",
+        "MARINE_BASE": f"{base}/meteo/marine",
+        "ELEVATION_URL": f"{base}/meteo/v1/elevation",
+    }
+
+
+async def _sleep(kind: str) -> None:
+    ms = LATENCY_MS.get(kind, 0.0)
+    if ms > 0:
+        # +/-20% jitter keeps percentiles from collapsing into a single value
+        await asyncio.sleep(ms * random.uniform(0.8, 1.2) / 1000)
+
+
+def fake_vector(text: str, dims: int = EMBED_DIMS) -> list:
+    rnd = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    v = [rnd.gauss(0.0, 1.0) for _ in range(dims)]
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# ---- OpenAI
+
+@app.post("/openai/v1/embeddings")
+async def embeddings(req: Request):
+    body = await req.json()
+    inputs = body.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    dims = int(body.get("dimensions") or EMBED_DIMS)
+    await _sleep("embed")
+    data = [{"object": "embedding", "index": i, "embedding": fake_vector(t, dims)} for i, t in enumerate(inputs)]
+    n = sum(_tokens(t) for t in inputs)
+    return {"object": "list", "data": data, "model": body.get("model"), "usage": {"prompt_tokens": n, "total_tokens": n}}
+
+
+@app.post("/openai/v1/responses")
+async def responses(req: Request):
+    body = await req.json()
+    prompt = json.dumps(body.get("input", ""))
+    await _sleep("llm")
+    text = "Stay central, use the metro, and book popular sights ahead. (offline fake answer)"
+    return {
+        "id": "resp_fake",
+        "output": [{"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": text}]}],
+        "usage": {"input_tokens": _tokens(prompt), "output_tokens": _tokens(text)},
+    }
+
+
+def _city_from(messages) -> str:
+    for m in reversed(messages):
+        content = m.get("content") or ""
+        if isinstance(content, str) and "City:" in content:
+            city = content.split("City:", 1)[1].splitlines()[0].strip()
+            if city and not city.startswith("("):
+                return city
+    return "Barcelona"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(req: Request):
+    """First turn asks for rag_search + city_weather; once tool results are present, answers in JSON."""
+    body = await req.json()
+    messages = body.get("messages") or []
+    city = _city_from(messages)
+    await _sleep("llm")
+    if any(m.get("role") == "tool" for m in messages) or not body.get("tools"):
+        answer = {
+            "city": city.lower(),
+            "recommendations": ["Base yourself centrally", "Use public transit", "Book top sights ahead"],
+            "forecast": {"summary": "Mild", "advisories": [], "pack_tips": ["Light layer"]},
+            "itinerary": [{"day": 1, "morning": "Old town walk", "afternoon": "Museum", "evening": "Local dinner"}],
+            "sources": {"rag": ["Neighborhoods"], "weather": ["Forecast"], "web": []},
+        }
+        message = {"role": "assistant", "content": json.dumps(answer)}
+        finish = "stop"
+    else:
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": "call_rag", "type": "function",
+                 "function": {"name": "rag_search", "arguments": json.dumps({"question": "neighborhoods", "city": city, "k": 4})}},
+                {"id": "call_wx", "type": "function",
+                 "function": {"name": "city_weather", "arguments": json.dumps({"city": city})}},
+            ],
+        }
+        finish = "tool_calls"
+    prompt_tokens = _tokens(json.dumps(messages))
+    completion_tokens = _tokens(json.dumps(message))
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+# ---- Ollama
+# Mimics a local model on a small box: OLLAMA_SLOTS generations share the
+# hardware, each one beyond that also slows everyone down (memory pressure),
+# and the first call after the model went idle pays OLLAMA_LOAD_MS.
+
+OLLAMA_SLOTS = 2
+OLLAMA_LOAD_MS = 3000.0
+_ollama = {"inflight": 0, "loaded_until": 0.0}
+
+
+def _keep_alive_s(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value or "5m")
+    units = {"s": 1, "m": 60, "h": 3600}
+    return float(value[:-1]) * units[value[-1]] if value[-1] in units else float(value)
+
+
+async def _ollama_generate(keep_alive) -> None:
+    now = time.monotonic()
+    if _ollama["loaded_until"] < now:
+        await asyncio.sleep(OLLAMA_LOAD_MS / 1000)
+    _ollama["inflight"] += 1
+    try:
+        n = _ollama["inflight"]
+        slowdown = max(1.0, n / OLLAMA_SLOTS) * (1 + 0.15 * max(0, n - OLLAMA_SLOTS))
+        await asyncio.sleep(LATENCY_MS["ollama"] * slowdown * random.uniform(0.9, 1.1) / 1000)
+    finally:
+        _ollama["inflight"] -= 1
+        _ollama["loaded_until"] = time.monotonic() + _keep_alive_s(keep_alive)
+
+
+@app.post("/ollama/api/generate")
+async def ollama_generate(req: Request):
+    body = await req.json()
+    if not body.get("prompt"):  # empty prompt: load the model only
+        if _ollama["loaded_until"] < time.monotonic():
+            await asyncio.sleep(OLLAMA_LOAD_MS / 1000)
+        _ollama["loaded_until"] = time.monotonic() + _keep_alive_s(body.get("keep_alive"))
+        return {"model": body.get("model"), "response": "", "done": True, "done_reason": "load"}
+    await _ollama_generate(body.get("keep_alive"))
+    return {"model": body.get("model"), "response": "Offline fake answer.", "done": True}
+
+
+@app.post("/ollama/api/chat")
+async def ollama_chat(req: Request):
+    body = await req.json()
+    messages = body.get("messages") or []
+    await _ollama_generate(body.get("keep_alive"))
+    text = json.dumps({"city": _city_from(messages).lower(), "recommendations": ["Use public transit"],
+                       "forecast": None, "itinerary": [], "sources": {"rag": [], "weather": [], "web": []}})
+    out = {
+        "model": body.get("model"), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "message": {"role": "assistant", "content": text}, "done": True, "done_reason": "stop",
+        "prompt_eval_count": _tokens(json.dumps(messages)), "eval_count": _tokens(text),
+    }
+    if body.get("stream", True):  # Ollama streams NDJSON unless told otherwise
+        return PlainTextResponse(json.dumps(out) + "\n", media_type="application/x-ndjson")
+    return out
+
+
+# ---- Jina
+
+@app.get("/jina/search/")
+async def jina_search(q: str = ""):
+    await _sleep("jina")
+    return {"data": [
+        {"title": f"{q} — result {i}", "url": f"https://example.com/{i}", "description": f"About {q}, item {i}.",
+         "date": "2025-01-01"}
+        for i in range(1, 6)
+    ]}
+
+
+@app.get("/jina/read/{target:path}")
+async def jina_read(target: str):
+    await _sleep("jina")
+    return PlainTextResponse(f"# {target}\n\n" + "Offline page body. " * 200)
+
+
+# ---- Open-Meteo
+
+@app.get("/meteo/geocoding/v1/search")
+async def geocode(name: str, count: int = 1, language: str = "en"):
+    await _sleep("meteo")
+    rnd = random.Random(name.lower())
+    return {"results": [{
+        "name": name.title(), "country": "Fakeland", "admin1": "Region",
+        "latitude": round(rnd.uniform(-60, 60), 4), "longitude": round(rnd.uniform(-170, 170), 4),
+        "timezone": "UTC",
+    }]}
+
+
+def _days(n: int):
+    start = int(time.time()) // 86400 * 86400
+    return [start + i * 86400 for i in range(n)]
+
+
+@app.get("/meteo/v1/forecast")
+async def forecast(forecast_days: int = 7):
+    await _sleep("meteo")
+    days = _days(forecast_days)
+    return {
+        "current": {"temperature_2m": 21.0, "relative_humidity_2m": 55, "wind_speed_10m": 4.2,
+                    "precipitation": 0.0, "cloud_cover": 20, "weathercode": 1, "uv_index": 5},
+        "daily": {
+            "time": days,
+            "weathercode": [1 + i % 3 for i in range(len(days))],
+            "temperature_2m_max": [24 + i % 3 for i in range(len(days))],
+            "temperature_2m_min": [14 + i % 2 for i in range(len(days))],
+            "uv_index_max": [6 + i % 3 for i in range(len(days))],
+            "precipitation_sum": [0.2 * (i % 4) for i in range(len(days))],
+            "precipitation_probability_max": [15 * (i % 5) for i in range(len(days))],
+            "wind_speed_10m_max": [6 + i % 5 for i in range(len(days))],
+            "wind_gusts_10m_max": [10 + i % 5 for i in range(len(days))],
+            "sunrise": [d + 6 * 3600 for d in days],
+            "sunset": [d + 19 * 3600 for d in days],
+        },
+    }
+
+
+@app.get("/meteo/air-quality")
+async def air():
+    await _sleep("meteo")
+    return {"current": {"us_aqi": 42, "pm2_5": 8.1, "pm10": 14.3}}
+
+
+@app.get("/meteo/marine")
+async def marine(forecast_days: int = 7):
+    await _sleep("meteo")
+    days = _days(forecast_days)
+    return {"daily": {
+        "time": days,
+        "wave_height_max": [0.4 + 0.3 * (i % 3) for i in range(len(days))],
+        "sea_surface_temperature_max": [22.0] * len(days),
+        "sea_surface_temperature_min": [20.5] * len(days),
+    }}
+
+
+@app.get("/meteo/v1/elevation")
+async def elevation():
+    await _sleep("meteo")
+    return {"elevation": [12.0]}
+
+
+def main(argv: Optional[list] = None):
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9100)
+    for kind, ms in LATENCY_MS.items():
+        ap.add_argument(f"--{kind}-ms", type=float, default=ms, help=f"latency of {kind} calls (default {ms})")
+    args = ap.parse_args(argv)
+    for kind in LATENCY_MS:
+        LATENCY_MS[kind] = getattr(args, f"{kind}_ms")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
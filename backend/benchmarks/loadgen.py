@@ -0,0 +1,172 @@
+# backend/benchmarks/loadgen.py
+"""
+Closed-loop load generator for the main endpoints.
+
+    python -m benchmarks.loadgen --scenarios rag,weather,agent,ingest \
+        --concurrency 8 --requests 200 --label my-change \
+        --baseline benchmarks/results/loadgen-main.json
+
+Reports throughput and p50/p95/p99 per scenario, writes
+benchmarks/results/loadgen-<label>.json and, with --baseline, prints the
+delta and exits non-zero when a p95 regresses by more than --max-regression.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from ._stats import RESULTS_DIR, summarize_ms
+from .pdfgen import make_guide
+
+CITIES = ["Barcelona", "Lisbon", "Rome", "Paris", "Tokyo", "Istanbul"]
+QUESTIONS = [
+    "Best neighborhoods to stay in?",
+    "How do I get around?",
+    "What should I see on a first visit?",
+    "Is it safe at night?",
+]
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def _rag(client: httpx.AsyncClient, i: int):
+    return client.post("/api/rag-search", json={
+        "question": QUESTIONS[i % len(QUESTIONS)], "city": CITIES[i % len(CITIES)], "k": 4, "with_answer": True,
+    })
+
+
+def _weather(client: httpx.AsyncClient, i: int):
+    return client.get("/api/weather", params={"city": CITIES[i % len(CITIES)], "include_marine": "true"})
+
+
+def _agent(client: httpx.AsyncClient, i: int):
+    return client.post("/api/agent/query", json={
+        "question": QUESTIONS[i % len(QUESTIONS)], "city": CITIES[i % len(CITIES)], "days": 2,
+    })
+
+
+def _ingest_factory(tmpdir: str) -> Scenario:
+    pdfs = [make_guide(c, f"{tmpdir}/{c.lower()}.pdf") for c in CITIES]
+
+    async def _ingest(client: httpx.AsyncClient, i: int):
+        # end-to-end: upload, then poll the job until it finishes
+        path = pdfs[i % len(pdfs)]
+        with open(path, "rb") as f:
+            r = await client.post("/api/rag-ingest", files={"file": (Path(path).name, f.read(), "application/pdf")})
+        if r.status_code >= 400:
+            return r
+        job_id = r.json()["job_id"]
+        while True:
+            r = await client.get(f"/api/rag-ingest/jobs/{job_id}")
+            if r.status_code >= 400:
+                return r
+            status = r.json()["status"]
+            if status == "failed":
+                return httpx.Response(500, request=r.request)
+            if status == "done":
+                return r
+            await asyncio.sleep(0.2)
+    return _ingest
+
+
+async def run_scenario(base_url: str, name: str, fn: Scenario, concurrency: int, total: int, timeout: float) -> Dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            while (i := next(counter)) < total:
+                t0 = time.perf_counter()
+                try:
+                    r = await fn(client, i)
+                    ok = r.status_code < 400
+                    key = str(r.status_code)
+                except httpx.HTTPError as e:
+                    ok, key = False, type(e).__name__
+                dt = (time.perf_counter() - t0) * 1000
+                if ok:
+                    latencies.append(dt)
+                else:
+                    errors[key] = errors.get(key, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        **summarize_ms(latencies),
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> bool:
+    """Print p95/throughput deltas; return False if any p95 regressed beyond the threshold."""
+    ok = True
+    base = {r["scenario"]: r for r in baseline.get("results", [])}
+    for r in current["results"]:
+        b = base.get(r["scenario"])
+        if not b or not b.get("p95_ms"):
+            continue
+        d95 = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"]
+        drps = (r["throughput_rps"] - b["throughput_rps"]) / b["throughput_rps"] if b["throughput_rps"] else 0.0
+        flag = "REGRESSION" if d95 > max_regression else "ok"
+        ok &= d95 <= max_regression
+        print(f"{r['scenario']:8} p95 {b['p95_ms']:8.1f} -> {r['p95_ms']:8.1f} ms ({d95:+.0%})  "
+              f"rps {b['throughput_rps']:7.2f} -> {r['throughput_rps']:7.2f} ({drps:+.0%})  {flag}")
+    return ok
+
+
+async def main_async(args) -> Dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        scenarios: Dict[str, Scenario] = {"rag": _rag, "weather": _weather, "agent": _agent}
+        if "ingest" in args.scenarios:
+            scenarios["ingest"] = _ingest_factory(tmpdir)
+        results = []
+        for name in args.scenarios:
+            n = args.ingest_requests if name == "ingest" else args.requests
+            res = await run_scenario(args.base_url, name, scenarios[name], args.concurrency, n, args.timeout)
+            print(json.dumps(res))
+            results.append(res)
+    return {"label": args.label, "ts": time.time(), "base_url": args.base_url, "results": results}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--scenarios", default="rag,weather,agent,ingest", type=lambda s: [x for x in s.split(",") if x])
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--ingest-requests", type=int, default=12)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--label", default="current")
+    ap.add_argument("--baseline", type=Path, help="previous loadgen-*.json to compare against")
+    ap.add_argument("--max-regression", type=float, default=0.2, help="allowed relative p95 increase")
+    args = ap.parse_args(argv)
+
+    report = asyncio.run(main_async(args))
+    out = RESULTS_DIR / f"loadgen-{args.label}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"saved {out}")
+
+    if args.baseline:
+        return 0 if compare(report, json.loads(args.baseline.read_text()), args.max_regression) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
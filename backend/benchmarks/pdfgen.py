@@ -0,0 +1,104 @@
+# backend/benchmarks/pdfgen.py
+"""
+Synthetic city-guide PDFs for ingestion benchmarks.
+
+Writes a plain PDF (Helvetica, one text line per row) whose layout matches
+what `section_aware_split` expects: the city name on the first line, then
+the template section headings on their own lines followed by prose.
+
+    python -m benchmarks.pdfgen --city Lisbon --paragraphs 40 -o /tmp/lisbon.pdf
+"""
+import argparse
+import random
+import textwrap
+from typing import List
+
+SECTIONS = [
+    "Overview", "History", "Orientation", "Neighborhoods", "Climate",
+    "Transportation", "Things to See", "Things to Do", "Practical information",
+]
+
+_WORDS = (
+    "old town harbour market tram metro museum cathedral square viewpoint river bridge "
+    "quarter boulevard tapas cafe gallery park beach castle ferry station ticket pass "
+    "evening morning season crowds local walk bus night food wine history architecture"
+).split()
+
+
+def _sentence(rnd: random.Random) -> str:
+    n = rnd.randint(8, 22)
+    words = [rnd.choice(_WORDS) for _ in range(n)]
+    return " ".join(words).capitalize() + "."
+
+
+def guide_lines(city: str, paragraphs_per_section: int, seed: int = 0, width: int = 95) -> List[str]:
+    rnd = random.Random(f"{city}-{seed}")
+    lines = [city, ""]
+    for sec in SECTIONS:
+        lines.append(sec)
+        for _ in range(paragraphs_per_section):
+            para = " ".join(_sentence(rnd) for _ in range(rnd.randint(3, 7)))
+            lines.extend(textwrap.wrap(para, width))
+            lines.append("")
+    return lines
+
+
+def _esc(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(lines: List[str], path: str, lines_per_page: int = 60) -> None:
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objs: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objs.append(body)
+        return len(objs)
+
+    catalog = add(b"")  # placeholder, filled once the page tree id is known
+    pages_id = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for page_lines in pages:
+        text = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_esc(l)}) Tj T*" for l in page_lines) + " ET"
+        stream = text.encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content, font)
+        ))
+    objs[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objs[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_guide(city: str, path: str, paragraphs_per_section: int = 6, seed: int = 0) -> str:
+    write_pdf(guide_lines(city, paragraphs_per_section, seed), path)
+    return path
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--city", default="Barcelona")
+    ap.add_argument("--paragraphs", type=int, default=6, help="paragraphs per section")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--output", required=True)
+    args = ap.parse_args()
+    print(make_guide(args.city, args.output, args.paragraphs, args.seed))
+
+
+if __name__ == "__main__":
+    main()
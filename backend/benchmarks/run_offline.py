@@ -0,0 +1,77 @@
+# backend/benchmarks/run_offline.py
+"""
+End-to-end offline benchmark: starts the upstream fakes and the API with its
+upstream base URLs pointed at them, runs the load generator, then stops both.
+No paid API is called. Postgres (with pgvector and the schema from
+`python -m app.core.db`) must be reachable via DATABASE_URL.
+
+    cd backend
+    python -m benchmarks.run_offline --llm-ms 800 -- --concurrency 8 --label main
+
+Arguments after `--` are passed to benchmarks.loadgen.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from . import loadgen
+from .fakes import LATENCY_MS, fake_env
+
+
+def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    passthrough = []
+    if "--" in argv:
+        i = argv.index("--")
+        argv, passthrough = argv[:i], argv[i + 1:]
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--fake-port", type=int, default=9100)
+    ap.add_argument("--api-port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=1)
+    for kind, ms in LATENCY_MS.items():
+        ap.add_argument(f"--{kind}-ms", type=float, default=ms)
+    args = ap.parse_args(argv)
+
+    fake_base = f"http://127.0.0.1:{args.fake_port}"
+    api_base = f"http://127.0.0.1:{args.api_port}"
+    latency_args = [a for kind in LATENCY_MS for a in (f"--{kind}-ms", str(getattr(args, f"{kind}_ms")))]
+
+    env = {**os.environ, **fake_env(fake_base), "SELF_BASE_URL": api_base}
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.fakes", "--port", str(args.fake_port), *latency_args]),
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.api_port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            env=env,
+        ),
+    ]
+    try:
+        _wait_ready(f"{fake_base}/docs")
+        _wait_ready(f"{api_base}/api/health")
+        return loadgen.main(["--base-url", api_base, *passthrough])
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=15)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
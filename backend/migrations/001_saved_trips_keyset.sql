@@ -0,0 +1,18 @@
+-- Keyset pagination + compressed recommendation for saved_trips.
+-- Only needed for databases created before this change; fresh databases get
+-- the same layout from Base.metadata.create_all.
+
+ALTER TABLE saved_trips ADD COLUMN IF NOT EXISTS preview VARCHAR(161) NOT NULL DEFAULT '';
+
+UPDATE saved_trips
+SET preview = CASE WHEN char_length(btrim(recommendation)) > 160
+                   THEN left(btrim(recommendation), 160) || '…'
+                   ELSE btrim(recommendation) END
+WHERE preview = '';
+
+-- Existing rows become plain UTF-8 bytes; new rows are zstd-compressed by the app.
+ALTER TABLE saved_trips
+  ALTER COLUMN recommendation TYPE BYTEA USING convert_to(recommendation, 'UTF8');
+
+CREATE INDEX IF NOT EXISTS ix_saved_trips_user_created_id
+  ON saved_trips (user_id, created_at, id);
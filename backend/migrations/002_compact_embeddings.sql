@@ -0,0 +1,7 @@
+-- Compact first-stage embeddings for RAG retrieval (EMBED_COMPACT_MODE).
+-- Adds the column only; fill it and build the HNSW index of EMBED_COMPACT_MODE
+-- without blocking writes with:
+--     python -m app.rag.compact --batch 2000
+-- The halfvec dimension must match EMBED_COMPACT_DIMS.
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS embedding_short HALFVEC(512);
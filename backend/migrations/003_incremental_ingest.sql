@@ -0,0 +1,17 @@
+-- Idempotent re-ingest: documents keyed by (city, lower(title)), chunks by content hash.
+
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+UPDATE chunks
+SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+WHERE content_hash IS NULL;
+
+-- Earlier uploads of the same guide created duplicate documents; keep the newest
+-- one (its chunks cascade with the rest) before adding the unique key.
+DELETE FROM documents d
+USING documents newer
+WHERE d.city = newer.city
+  AND lower(d.title) = lower(newer.title)
+  AND d.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_documents_city_title ON documents(city, lower(title));
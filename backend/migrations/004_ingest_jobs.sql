@@ -0,0 +1,15 @@
+-- Status table for the background ingest queue (POST /api/rag-ingest returns a job id).
+
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+  id           TEXT PRIMARY KEY,
+  filename     TEXT NOT NULL,
+  status       TEXT NOT NULL,      -- queued | running | done | failed
+  stage        TEXT,
+  result       JSONB,
+  error        TEXT,
+  created_at   TIMESTAMPTZ NOT NULL,
+  started_at   TIMESTAMPTZ,
+  finished_at  TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_finished ON ingest_jobs(finished_at);
@@ -0,0 +1,13 @@
+-- Section digests built at ingest time (DIGESTS_ENABLED). Existing guides get
+-- theirs on the next re-ingest: `python -m app.rag.ingest`.
+
+CREATE TABLE IF NOT EXISTS section_digests (
+  city         TEXT NOT NULL,
+  section      TEXT NOT NULL,
+  doc_id       INT REFERENCES documents(id) ON DELETE CASCADE,
+  digest       TEXT NOT NULL,
+  tokens       INT NOT NULL,
+  source_hash  TEXT NOT NULL,
+  updated_at   TIMESTAMPTZ DEFAULT now(),
+  PRIMARY KEY (city, section)
+);
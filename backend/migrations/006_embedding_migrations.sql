@@ -0,0 +1,18 @@
+-- Embedding-model migrations (app/rag/reembed.py): state per migration plus the shadow vectors
+-- written by the backfill. The shadow HNSW index is built by `python -m app.rag.reembed run`.
+
+CREATE TABLE IF NOT EXISTS embedding_migrations (
+  id            SERIAL PRIMARY KEY,
+  model         TEXT NOT NULL,
+  dims          INT NOT NULL,
+  status        TEXT NOT NULL,     -- backfill | ready | cutover | done | aborted
+  last_chunk_id BIGINT NOT NULL DEFAULT 0,
+  embedded      BIGINT NOT NULL DEFAULT 0,
+  started_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS chunk_embeddings_next (
+  chunk_id     BIGINT PRIMARY KEY REFERENCES chunks(id) ON DELETE CASCADE,
+  embedding    VECTOR(1536) NOT NULL
+);
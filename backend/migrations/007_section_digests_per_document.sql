@@ -0,0 +1,9 @@
+-- Section digests are kept per document: a second guide for the same city no
+-- longer overwrites or deletes the first one's digests. Reads take the newest
+-- digest for (city, section).
+
+DELETE FROM section_digests WHERE doc_id IS NULL;
+ALTER TABLE section_digests ALTER COLUMN doc_id SET NOT NULL;
+ALTER TABLE section_digests DROP CONSTRAINT IF EXISTS section_digests_pkey;
+ALTER TABLE section_digests ADD PRIMARY KEY (doc_id, section);
+CREATE INDEX IF NOT EXISTS idx_section_digests_city ON section_digests (city, section, updated_at DESC);
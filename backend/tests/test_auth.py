@@ -0,0 +1,35 @@
+import contextvars
+
+from starlette.requests import Request
+
+from app.dependencies import auth
+
+
+def make_request(headers=None, host="127.0.0.1") -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/api/rag-search", "client": (host, 1234),
+                    "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]})
+
+
+def in_context(fn):
+    """Run `fn` in a fresh copy of the context, as each request gets its own."""
+    return contextvars.copy_context().run(fn)
+
+
+def test_loopback_call_is_keyed_to_the_original_caller():
+    def caller():
+        assert auth.request_key(make_request(host="203.0.113.7")) == "addr:203.0.113.7"
+        return auth.forward_key_headers()
+    headers = in_context(caller)
+    assert in_context(lambda: auth.request_key(make_request(headers))) == "addr:203.0.113.7"
+
+
+def test_unsigned_or_tampered_key_is_ignored():
+    forged = {auth.CLIENT_KEY_HEADER: "user:1.deadbeef"}
+    assert in_context(lambda: auth.request_key(make_request(forged))) == "addr:127.0.0.1"
+    good = in_context(lambda: (auth.request_key(make_request(host="198.51.100.2")), auth.forward_key_headers())[1])
+    tampered = {auth.CLIENT_KEY_HEADER: good[auth.CLIENT_KEY_HEADER].replace("198.51.100.2", "198.51.100.3")}
+    assert in_context(lambda: auth.request_key(make_request(tampered))) == "addr:127.0.0.1"
+
+
+def test_no_key_outside_a_request():
+    assert in_context(auth.forward_key_headers) == {}
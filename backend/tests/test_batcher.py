@@ -0,0 +1,84 @@
+import threading
+import time
+
+from app.core import deadline as budget
+from app.rag.batcher import MicroBatcher
+
+
+def run_in_thread(fn, request_budget):
+    """Call `fn()` in a thread whose request context carries `request_budget`; returns (result, error)."""
+    out = {}
+
+    def target():
+        budget._budget.set(request_budget)
+        try:
+            out["result"] = fn()
+        except BaseException as e:
+            out["error"] = e
+    t = threading.Thread(target=target)
+    t.start()
+    return t, out
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    calls = []
+
+    def fn(inputs, deadline):
+        budget.check()  # would raise if the leader's context leaked into the shared call
+        calls.append((list(inputs), deadline))
+        return [[float(len(s))] for s in inputs]
+    batcher = MicroBatcher("test", fn, window=0.2, max_batch=8)
+
+    leader_budget, follower_budget = budget.Budget(30), budget.Budget(30)
+    leader_budget.cancelled = "client disconnected"
+    leader, leader_out = run_in_thread(lambda: batcher.submit("a"), leader_budget)
+    time.sleep(0.05)
+    follower, follower_out = run_in_thread(lambda: batcher.submit("bbb"), follower_budget)
+    leader.join(5)
+    follower.join(5)
+
+    assert follower_out == {"result": [3.0]}
+    assert calls == [(["a", "bbb"], follower_budget.deadline)]  # the cancelled leader's deadline is ignored
+
+
+def test_follower_stops_on_its_own_budget():
+    release = threading.Event()
+
+    def fn(inputs, deadline):
+        release.wait(5)
+        return [[0.0] for _ in inputs]
+    batcher = MicroBatcher("test", fn, window=0.01, max_batch=8)
+
+    leader, _ = run_in_thread(lambda: batcher.submit("a"), None)
+    time.sleep(0.005)
+    t0 = time.monotonic()
+    follower, follower_out = run_in_thread(lambda: batcher.submit("b"), budget.Budget(0.2))
+    follower.join(5)
+    release.set()
+    leader.join(5)
+
+    assert isinstance(follower_out.get("error"), budget.DeadlineExceeded)
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_latest_deadline_and_no_budget():
+    seen = []
+
+    def fn(inputs, deadline):
+        seen.append(deadline)
+        return [[0.0] for _ in inputs]
+    batcher = MicroBatcher("test", fn, window=0.1, max_batch=8)
+    short, long_ = budget.Budget(5), budget.Budget(20)
+    threads = [run_in_thread(lambda: batcher.submit("a"), short)[0]]
+    time.sleep(0.02)
+    threads.append(run_in_thread(lambda: batcher.submit("b"), long_)[0])
+    for t in threads:
+        t.join(5)
+    assert seen == [long_.deadline]
+
+    threads = [run_in_thread(lambda: batcher.submit("c"), short)[0]]
+    time.sleep(0.02)
+    threads.append(run_in_thread(lambda: batcher.submit("d"), None)[0])
+    for t in threads:
+        t.join(5)
+    assert seen[-1] is None  # a caller without a budget: the upstream's own timeout applies
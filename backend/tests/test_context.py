@@ -0,0 +1,27 @@
+from app.rag.context import pack_context
+
+
+def chunk(id, doc_id, idx, content, section="Overview", tokens=10):
+    return {"id": id, "city": "lisbon", "section": section, "chunk_idx": idx, "content": content,
+            "doc_id": doc_id, "tokens": tokens}
+
+
+def test_runs_do_not_cross_guides():
+    a = chunk(1, doc_id=10, idx=1, content="Guide A talks about trams.")
+    b = chunk(2, doc_id=20, idx=2, content="Guide B talks about ferries.")
+    passages = pack_context([a, b], budget_tokens=1000)
+    assert [p["content"] for p in passages] == [a["content"], b["content"]]
+
+
+def test_consecutive_chunks_of_one_guide_merge():
+    a = chunk(1, doc_id=10, idx=1, content="Take tram 28 early. The queue is shorter before nine in the morning.")
+    b = chunk(2, doc_id=10, idx=2, content="The queue is shorter before nine in the morning. Ferries leave Cais do Sodré.")
+    passages = pack_context([b, a], budget_tokens=1000)
+    assert passages == [{"section": "Overview", "content": "Take tram 28 early. The queue is shorter before nine "
+                                                           "in the morning. Ferries leave Cais do Sodré."}]
+
+
+def test_budget_uses_stored_token_counts():
+    a = chunk(1, doc_id=10, idx=1, content="short", tokens=60)
+    b = chunk(2, doc_id=10, idx=5, content="short too", tokens=50)
+    assert [p["content"] for p in pack_context([a, b], budget_tokens=100)] == ["short"]
@@ -0,0 +1,15 @@
+import time
+
+from app.core.shared_cache import acquire_lease, release_lease
+
+
+def test_lease_has_one_holder_until_it_expires_or_is_released(tmp_path):
+    path = str(tmp_path / "cache.db")
+    assert acquire_lease(path, "job", "a", ttl=60)
+    assert not acquire_lease(path, "job", "b", ttl=60)
+    assert acquire_lease(path, "job", "a", ttl=0.05)  # renewal
+    time.sleep(0.06)
+    assert acquire_lease(path, "job", "b", ttl=60)  # expired: taken over
+    assert not acquire_lease(path, "job", "a", ttl=60)
+    release_lease(path, "job", "b")
+    assert acquire_lease(path, "job", "a", ttl=60)
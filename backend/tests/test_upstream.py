@@ -0,0 +1,271 @@
+import asyncio
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.core import deadline as budget
+from app.core.upstream import MIN_SAMPLES_FOR_HEDGE, Upstream, UpstreamUnavailable
+
+
+def make_upstream(handler, **kw) -> Upstream:
+    up = Upstream("test", **{"timeout": 5.0, **kw})
+    up._client = httpx.Client(transport=httpx.MockTransport(handler))
+    up._hedge_pool = ThreadPoolExecutor(max_workers=4)
+    return up
+
+
+def counting(*statuses):
+    """Handler answering with `statuses` in turn (the last one repeats) and counting calls."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(statuses[min(len(calls), len(statuses)) - 1], json={})
+    return handler, calls
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(Upstream, "_backoff", staticmethod(lambda attempt: 0.0))
+
+
+@pytest.fixture
+def request_budget():
+    tokens = []
+
+    def start(seconds: float) -> budget.Budget:
+        b = budget.Budget(seconds)
+        tokens.append(budget._budget.set(b))
+        return b
+    yield start
+    for token in reversed(tokens):
+        budget._budget.reset(token)
+
+
+@pytest.fixture
+def hung_server():
+    """A listening socket that accepts connections and never answers."""
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+    held, stop = [], threading.Event()
+
+    def accept():
+        srv.settimeout(0.05)
+        while not stop.is_set():
+            try:
+                held.append(srv.accept()[0])
+            except OSError:
+                continue
+    t = threading.Thread(target=accept, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.getsockname()[1]}/"
+    stop.set()
+    t.join()
+    for c in held:
+        c.close()
+    srv.close()
+
+
+# ---- breaker
+
+def test_breaker_opens_after_consecutive_failures():
+    handler, calls = counting(503)
+    up = make_upstream(handler, max_attempts=1, breaker_failures=3, breaker_cooldown=60)
+    for _ in range(3):
+        assert up.request("GET", "http://x/").status_code == 503
+    assert up.breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable) as exc:
+        up.request("GET", "http://x/")
+    assert exc.value.status_code == 503 and exc.value.headers["Retry-After"] == "60"
+    assert len(calls) == 3
+
+
+def test_half_open_lets_one_probe_through():
+    handler, calls = counting(503, 503, 200)
+    up = make_upstream(handler, max_attempts=1, breaker_failures=2, breaker_cooldown=0.05)
+    up.request("GET", "http://x/")
+    up.request("GET", "http://x/")
+    time.sleep(0.06)
+    assert up.breaker.state == "half_open"
+    up.breaker.before("test")  # a probe is in flight
+    with pytest.raises(UpstreamUnavailable):
+        up.request("GET", "http://x/")
+    up.breaker.abandon()
+    assert up.request("GET", "http://x/").status_code == 200
+    assert up.breaker.state == "closed"
+
+
+def test_failed_probe_reopens_breaker():
+    handler, _ = counting(503)
+    up = make_upstream(handler, max_attempts=1, breaker_failures=1, breaker_cooldown=0.05)
+    up.request("GET", "http://x/")
+    time.sleep(0.06)
+    up.request("GET", "http://x/")
+    assert up.breaker.state == "open"
+
+
+def test_cancelled_probe_releases_half_open():
+    async def handler(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+    up = Upstream("test", timeout=5.0, max_attempts=1, breaker_failures=1, breaker_cooldown=0.05)
+    up.breaker.record("test", ok=False)
+    time.sleep(0.06)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            probe = asyncio.ensure_future(up.arequest(client, "GET", "http://x/"))
+            await asyncio.sleep(0.05)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+    asyncio.run(run())
+    up.breaker.before("test")  # the next caller may probe; no 503
+
+
+def test_probe_failing_with_other_errors_releases_half_open():
+    def handler(request):
+        raise RuntimeError("hedge pool shut down")
+    up = make_upstream(handler, max_attempts=1, breaker_failures=1, breaker_cooldown=0.05)
+    up.breaker.record("test", ok=False)
+    time.sleep(0.06)
+    with pytest.raises(RuntimeError):
+        up.request("GET", "http://x/")
+    up.breaker.before("test")
+
+
+def test_client_errors_do_not_count():
+    handler, _ = counting(404)
+    up = make_upstream(handler, max_attempts=1, breaker_failures=1)
+    for _ in range(3):
+        assert up.request("GET", "http://x/").status_code == 404
+    assert up.breaker.state == "closed"
+
+
+# ---- retries
+
+def test_retries_until_success():
+    handler, calls = counting(502, 429, 200)
+    up = make_upstream(handler, max_attempts=3)
+    assert up.request("GET", "http://x/").status_code == 200
+    assert len(calls) == 3
+
+
+def test_last_retryable_response_is_returned():
+    handler, calls = counting(503)
+    up = make_upstream(handler, max_attempts=3, breaker_failures=100)
+    assert up.request("GET", "http://x/").status_code == 503
+    assert len(calls) == 3
+
+
+def test_retry_budget_bounds_retries():
+    handler, calls = counting(503)
+    up = make_upstream(handler, max_attempts=3, breaker_failures=1000)
+    up.budget._tokens = 1.0  # the deposit of the first call tops it up to 1.2
+    up.request("GET", "http://x/")
+    assert len(calls) == 2  # one retry, then the bucket is empty
+    calls.clear()
+    up.request("GET", "http://x/")
+    assert len(calls) == 1
+
+
+# ---- hedging
+
+def prime(up: Upstream, op: str, seconds: float) -> None:
+    for _ in range(MIN_SAMPLES_FOR_HEDGE):
+        up.latency(op).observe(seconds)
+
+
+def test_hedge_sends_duplicate_after_p95():
+    calls = []
+
+    def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            time.sleep(0.5)  # the first attempt stalls
+        return httpx.Response(200, json={"n": len(calls)})
+    up = make_upstream(handler)
+    prime(up, "search", 0.05)
+    t0 = time.monotonic()
+    r = up.request("GET", "http://x/", op="search", hedge=True)
+    assert r.json() == {"n": 2}
+    assert time.monotonic() - t0 < 0.4
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.04
+
+
+def test_no_hedge_without_enough_samples_or_when_disabled():
+    handler, calls = counting(200)
+    up = make_upstream(handler)
+    up.request("GET", "http://x/", op="search", hedge=True)
+    prime(up, "other", 0.0)
+    up.request("GET", "http://x/", op="other", hedge=False)
+    assert len(calls) == 2
+
+
+def test_latency_is_tracked_per_operation():
+    handler, _ = counting(200)
+    up = make_upstream(handler)
+    for _ in range(MIN_SAMPLES_FOR_HEDGE):
+        up.request("GET", "http://x/", op="embeddings")
+    assert up.latency("embeddings").quantile(0.5) is not None
+    assert up.latency("responses").quantile(0.5) is None
+    assert set(up.stats()["latency"]) == {"embeddings", "responses"}
+
+
+# ---- deadlines
+
+def test_deadline_is_clamped_to_request_budget(request_budget):
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions["timeout"]["read"])
+        return httpx.Response(200)
+    up = make_upstream(handler, timeout=60)
+    request_budget(0.5)
+    up.request("GET", "http://x/")
+    assert 0 < seen[0] <= 0.5
+
+
+def test_spent_budget_fails_without_calling_upstream(request_budget):
+    handler, calls = counting(200)
+    up = make_upstream(handler)
+    b = request_budget(10)
+    b.deadline = time.monotonic() - 1
+    with pytest.raises(budget.DeadlineExceeded):
+        up.request("GET", "http://x/")
+    assert calls == []
+
+
+def test_hung_upstream_counts_against_breaker(hung_server, request_budget):
+    up = Upstream("hung", timeout=0.2, max_attempts=1, breaker_failures=2, breaker_cooldown=60)
+    request_budget(30)
+    for _ in range(2):
+        with pytest.raises(httpx.ReadTimeout):
+            up.request("GET", hung_server)
+    assert up.breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable):
+        up.request("GET", hung_server)
+
+
+def test_budget_running_out_does_not_count_against_breaker(hung_server, request_budget):
+    up = Upstream("hung", timeout=30, max_attempts=1, breaker_failures=1, breaker_cooldown=60)
+    request_budget(0.2)
+    with pytest.raises(budget.DeadlineExceeded):
+        up.request("GET", hung_server)
+    assert up.breaker.state == "closed"
+
+
+def test_async_hung_upstream_counts_against_breaker(hung_server):
+    up = Upstream("hung", timeout=0.2, max_attempts=1, breaker_failures=1, breaker_cooldown=60)
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            with pytest.raises(httpx.ReadTimeout):
+                await up.arequest(client, "GET", hung_server)
+    asyncio.run(run())
+    assert up.breaker.state == "open"
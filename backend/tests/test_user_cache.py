@@ -0,0 +1,24 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.dependencies import auth
+from app.models import User
+
+
+def test_orm_update_and_delete_invalidate_cached_user():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    with Session(engine) as db:
+        user = User(name="Ana", email="ana@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        auth._user_cache.set(user.id, "cached row")
+
+        user.name = "Ana Maria"
+        db.commit()
+        assert auth._user_cache.get(user.id) is None
+
+        auth._user_cache.set(user.id, "cached row")
+        db.delete(user)
+        db.commit()
+        assert auth._user_cache.get(user.id) is None
@@ -6,14 +6,16 @@ export function useSavedTrips() {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setErr] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const refetch = useCallback(async () => {
     setLoading(true);
     setErr(null);
     try {
-      // Backend returns an array
+      // Backend returns { items: [{ id, city, preview, created_at }], next_cursor }
       const res = await API.get("/saved-trips");
-      setData(res.data || []);
+      setData(res.data?.items || []);
+      setNextCursor(res.data?.next_cursor || null);
     } catch (e) {
       setErr(e);
     } finally {
@@ -21,7 +23,24 @@ export function useSavedTrips() {
     }
   }, []);
 
-  return { data, setData, loading, error, refetch };
+  const loadMore = useCallback(async () => {
+    if (!nextCursor) return;
+    try {
+      const res = await API.get("/saved-trips", { params: { cursor: nextCursor } });
+      setData((prev) => [...(prev || []), ...(res.data?.items || [])]);
+      setNextCursor(res.data?.next_cursor || null);
+    } catch (e) {
+      setErr(e);
+    }
+  }, [nextCursor]);
+
+  return { data, setData, loading, error, refetch, loadMore, hasMore: !!nextCursor };
+}
+
+// Full recommendation is only fetched when a trip is opened
+export async function fetchTrip(id) {
+  const res = await API.get(`/saved-trips/${id}`);
+  return res.data;
 }
 
 export function useDeleteTrip() {
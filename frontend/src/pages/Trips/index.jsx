@@ -7,13 +7,10 @@ import {
 import DeleteIcon from "@mui/icons-material/Delete";
 import VisibilityIcon from "@mui/icons-material/Visibility";
 import dayjs from "dayjs";
-import { useSavedTrips, useDeleteTrip } from "../../hooks/Trips";
+import { useSavedTrips, useDeleteTrip, fetchTrip } from "../../hooks/Trips";
 
 function TripCard({ trip, onView, onDelete }) {
-  const snippet =
-    (trip.recommendation || "").length > 160
-      ? trip.recommendation.slice(0, 160) + "…"
-      : trip.recommendation || "";
+  const snippet = trip.preview || "";
 
   return (
     <Card variant="outlined">
@@ -41,7 +38,7 @@ function TripCard({ trip, onView, onDelete }) {
 }
 
 export default function Trips() {
-  const { data, loading, error, refetch, setData } = useSavedTrips();
+  const { data, loading, error, refetch, setData, loadMore, hasMore } = useSavedTrips();
   const { del, loading: deleting } = useDeleteTrip();
 
   const [toast, setToast] = useState({ open: false, message: "", severity: "success" });
@@ -50,6 +47,15 @@ export default function Trips() {
 
   useEffect(() => { refetch(); }, [refetch]);
 
+  const handleView = useCallback(async (trip) => {
+    setViewTrip(trip);
+    try {
+      setViewTrip(await fetchTrip(trip.id));
+    } catch (e) {
+      setToast({ open: true, message: "Failed to load trip.", severity: "error" });
+    }
+  }, []);
+
   const handleConfirmDelete = useCallback(async () => {
     if (!confirmTrip) return;
     const id = confirmTrip.id;
@@ -98,7 +104,7 @@ export default function Trips() {
             <Grid item xs={12} sm={6} md={4} key={trip.id}>
               <TripCard
                 trip={trip}
-                onView={setViewTrip}
+                onView={handleView}
                 onDelete={setConfirmTrip}
               />
             </Grid>
@@ -106,6 +112,12 @@ export default function Trips() {
         </Grid>
       )}
 
+      {!loading && !error && hasMore && (
+        <Box sx={{ display: "flex", justifyContent: "center", mt: 2 }}>
+          <Button onClick={loadMore}>Load more</Button>
+        </Box>
+      )}
+
       {/* View dialog */}
       <Dialog open={!!viewTrip} onClose={() => setViewTrip(null)} maxWidth="md" fullWidth>
         <DialogTitle>
@@ -113,7 +125,7 @@ export default function Trips() {
         </DialogTitle>
         <DialogContent dividers>
           <Typography variant="body1" sx={{ whiteSpace: "pre-line" }}>
-            {viewTrip?.recommendation || ""}
+            {viewTrip?.recommendation ?? viewTrip?.preview ?? ""}
           </Typography>
         </DialogContent>
         <DialogActions>